@@ -4,18 +4,38 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config import Config
+from app.utils.database import RoutingSession
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
-def create_app():
+def _dispose_engines_after_fork(app):
+    """Dengan gunicorn --preload, koneksi pool milik master tidak boleh dipakai worker"""
+    from app.utils.lazy import after_fork
+
+    def dispose():
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    after_fork(dispose)
+
+def create_app(overrides=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if overrides:
+        app.config.update(overrides)
     
     # Initialize extensions
+    from app.utils.database import configure_engines, install_statement_timeout
+    configure_engines(app)
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_statement_timeout(engine, app.config.get('DB_STATEMENT_TIMEOUT_MS'))
+    _dispose_engines_after_fork(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app)
@@ -24,8 +44,40 @@ def create_app():
     from app.utils.logger import logger
     logger.init_app(app)
     
-
+    from app.utils.query_stats import query_instrumentation
+    query_instrumentation.init_app(app)
+    
+    # Register models and background services
+    from app import models  # noqa: F401
+    from app.services import (
+        detection_worker, inference_engine, detection_coalescer, notification_dispatcher, location_tracker,
+        spatial_index, stats_aggregator, token_revocation, camera_health_monitor, upload_pipeline,
+        event_gateway, retention_manager,
+    )
+    detection_worker.init_app(app)
+    inference_engine.init_app(app)
+    detection_coalescer.init_app(app)
+    notification_dispatcher.init_app(app)
+    location_tracker.init_app(app)
+    spatial_index.init_app(app)
+    stats_aggregator.init_app(app)
+    token_revocation.init_app(app)
+    camera_health_monitor.init_app(app)
+    upload_pipeline.init_app(app)
+    event_gateway.init_app(app)
+    retention_manager.init_app(app)
+    
+    from app.routes import register_blueprints
+    register_blueprints(app)
+    
+    from app.utils.metrics import metrics
+    metrics.init_app(app)
+    
+    from app.utils.cache import lookup_cache
+    lookup_cache.init_app(app)
     
+    from app.commands import register_commands
+    register_commands(app)
 
     app.logger.info('Application initialization complete')
     return app
\ No newline at end of file
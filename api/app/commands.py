@@ -0,0 +1,184 @@
+import click
+from flask.cli import AppGroup
+
+from app.services import (
+    camera_health_monitor, detection_worker, retention_manager, stats_aggregator, token_revocation,
+)
+
+detection_cli = AppGroup('detection', help='ML weapon detection worker')
+stats_cli = AppGroup('stats', help='Dashboard rollups')
+tokens_cli = AppGroup('tokens', help='Revoked token maintenance')
+cameras_cli = AppGroup('cameras', help='Camera health monitoring')
+retention_cli = AppGroup('retention', help='Table partitioning and data retention')
+reports_cli = AppGroup('reports', help='Report exports')
+uploads_cli = AppGroup('uploads', help='Evidence and detection image uploads')
+
+
+@detection_cli.command('run')
+def run_detection():
+    """Run the detection pipeline over all ONLINE cameras"""
+    click.echo('Starting detection worker (Ctrl+C to stop)')
+    try:
+        detection_worker.run()
+    except KeyboardInterrupt:
+        detection_worker.stop()
+
+
+@stats_cli.command('backfill')
+def backfill_stats():
+    """Rebuild hourly buckets and officer performance from existing data"""
+    reports, assignments = stats_aggregator.backfill()
+    click.echo(f'Rebuilt {reports} report buckets and {assignments} assignment buckets')
+
+
+@stats_cli.command('migrate')
+def migrate_stats():
+    """Deduplicate performance_metrics and make (user_id, metric_type, period_start) unique"""
+    from app import db
+
+    with db.engine.begin() as connection:
+        deleted = stats_aggregator.migrate_schema(connection)
+    if deleted is None:
+        click.echo('performance_metrics is already unique')
+    else:
+        click.echo(f'Removed {deleted} duplicate performance metrics')
+
+
+@tokens_cli.command('compact')
+def compact_tokens():
+    """Delete revoked tokens that have already expired"""
+    deleted = token_revocation.compact()
+    click.echo(f'Deleted {deleted} expired revoked tokens')
+
+
+@tokens_cli.command('migrate')
+def migrate_tokens():
+    """Convert token_blacklist from raw token strings to jti/expires_at"""
+    from app import db
+
+    with db.engine.begin() as connection:
+        result = token_revocation.migrate_schema(connection)
+    if result is None:
+        click.echo('token_blacklist already uses jti')
+    else:
+        click.echo(f'Migrated {result["migrated"]} rows ({result["unreadable"]} unreadable tokens)')
+
+
+@cameras_cli.command('monitor')
+def monitor_cameras():
+    """Probe camera streams and keep Camera.status current"""
+    click.echo('Starting camera health monitor (Ctrl+C to stop)')
+    try:
+        camera_health_monitor.run()
+    except KeyboardInterrupt:
+        camera_health_monitor.stop()
+    click.echo(camera_health_monitor.stats())
+
+
+@retention_cli.command('run')
+@click.option('--dry-run', is_flag=True, help='Only show what would be created, dropped or deleted')
+def run_retention(dry_run):
+    """Create upcoming partitions and drop/archive/delete expired data"""
+    for table, result in retention_manager.run(dry_run=dry_run).items():
+        click.echo(f'{table}: {result}')
+
+
+@retention_cli.command('partition')
+@click.argument('tables', nargs=-1)
+def partition_tables(tables):
+    """Convert existing tables to range partitions on created_at (PostgreSQL)"""
+    from app import db
+
+    for table in tables or retention_manager.policies:
+        if table not in retention_manager.policies:
+            raise click.BadParameter(f'{table} is not a partitioned table', param_hint='tables')
+        with db.engine.begin() as connection:
+            converted = retention_manager.partition_table(connection, table)
+        click.echo(f'{table}: {"partitioned" if converted else "already partitioned"}')
+
+
+@retention_cli.command('status')
+def retention_status():
+    """Show partitions with estimated rows and size"""
+    from app import db
+
+    with db.engine.connect() as connection:
+        for table in retention_manager.policies:
+            status = retention_manager.status(connection, table)
+            if not status['partitioned']:
+                click.echo(f'{table}: not partitioned, {status["rows"]} rows')
+                continue
+            click.echo(f'{table}:')
+            for partition in status['partitions']:
+                bounds = 'DEFAULT' if partition['default'] else f'[{partition["from"]}, {partition["to"]})'
+                click.echo(f'  {partition["name"]:<32} {bounds:<48} {partition["rows"]:>12} rows '
+                           f'{partition["bytes"] / 1024 / 1024:>10.1f} MB')
+
+
+@reports_cli.command('export')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'parquet']), default='csv', show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help='Write to this file instead of uploading')
+@click.option('--status', help='Comma-separated report statuses')
+@click.option('--priority', help='Comma-separated report priorities')
+@click.option('--camera-id')
+@click.option('--owner-id')
+@click.option('--from', 'created_from', help='ISO datetime, inclusive')
+@click.option('--to', 'created_to', help='ISO datetime, exclusive')
+@click.option('--limit', type=int, help='Export at most this many reports (newest first)')
+def export_reports(fmt, output, status, priority, camera_id, owner_id, created_from, created_to, limit):
+    """Stream reports to a CSV/Parquet file or to the exports storage bucket"""
+    import tempfile
+
+    from flask import current_app
+
+    from app.services.export import (
+        FORMATS, REPORT_COLUMNS, ExportUnavailable, export_chunks, export_filename, export_to_file, report_batches,
+    )
+    from app.services.report_feed import parse_filters
+    from app.utils.lazy import lazy
+
+    try:
+        filters = parse_filters({
+            'status': status, 'priority': priority, 'camera_id': camera_id, 'owner_id': owner_id,
+            'created_from': created_from, 'created_to': created_to,
+        })
+        chunks = export_chunks(report_batches(filters, limit=limit), REPORT_COLUMNS, fmt)
+    except (ValueError, ExportUnavailable) as e:
+        raise click.UsageError(str(e))
+
+    if output:
+        with open(output, 'wb') as fh:
+            written = export_to_file(chunks, fh)
+        click.echo(f'Wrote {written} bytes to {output}')
+        return
+
+    # Di-spool ke file temp dulu: backend storage butuh file yang bisa dibaca ulang per part
+    bucket, key = current_app.config['EXPORTS_BUCKET'], export_filename('reports', fmt)
+    backend = lazy.get('storage')
+    with tempfile.TemporaryFile(dir=current_app.config.get('UPLOAD_SPOOL_DIRECTORY')) as fh:
+        written = export_to_file(chunks, fh)
+        fh.seek(0)
+        backend.put(bucket, key, fh, FORMATS[fmt][0])
+    click.echo(f'Uploaded {written} bytes to {backend.url(bucket, key)}')
+
+
+@uploads_cli.command('retry')
+def retry_uploads():
+    """Resubmit uploads that failed after all retry attempts"""
+    from app.services import upload_pipeline
+
+    submitted = upload_pipeline.retry_failed()
+    upload_pipeline.stop()
+    stats = upload_pipeline.stats()
+    click.echo(f'Resubmitted {submitted} uploads: {stats["uploaded"] + stats["deduplicated"]} succeeded, '
+               f'{stats["failed_pending"]} still failing')
+
+
+def register_commands(app):
+    app.cli.add_command(detection_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(cameras_cli)
+    app.cli.add_command(retention_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(uploads_cli)
@@ -1,14 +1,12 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 import enum
-import uuid
 import json
 from sqlalchemy.dialects.mysql import JSON
-from sqlalchemy import event, Index
+from sqlalchemy import event, Index, UniqueConstraint
+from app import db
 from app.utils.logger import logger
-
-db = SQLAlchemy()
+from app.utils.ids import uuid7
 
 # Enums untuk status dan priority
 class UserRole(enum.Enum):
@@ -58,7 +56,7 @@ class NotificationType(enum.Enum):
 class User(db.Model):
     __tablename__ = 'users'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -82,6 +80,7 @@ class User(db.Model):
     timeline_events = db.relationship('TimelineEvent', back_populates='creator', lazy='dynamic')
     report_updates = db.relationship('ReportUpdate', back_populates='user', lazy='dynamic')
     performance_metrics = db.relationship('PerformanceMetric', back_populates='user', lazy='dynamic', cascade='all, delete-orphan')
+    tokens = db.relationship('Token', back_populates='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
         """Hash and set password"""
@@ -95,7 +94,7 @@ class User(db.Model):
 class Camera(db.Model):
     __tablename__ = 'cameras'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     location = db.Column(db.String(255), nullable=False)
@@ -118,7 +117,7 @@ class Camera(db.Model):
 class Report(db.Model):
     __tablename__ = 'reports'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     camera_id = db.Column(db.String(36), db.ForeignKey('cameras.id', ondelete='CASCADE'), nullable=False, index=True)
@@ -141,13 +140,21 @@ class Report(db.Model):
     assignments = db.relationship('Assignment', back_populates='report', lazy='dynamic', cascade='all, delete-orphan')
     report_updates = db.relationship('ReportUpdate', back_populates='report', lazy='dynamic', cascade='all, delete-orphan')
     
+    # Index komposit untuk feed keyset (created_at, id) per kamera dan per status/priority
+    __table_args__ = (
+        Index('ix_reports_camera_created', 'camera_id', 'created_at', 'id'),
+        Index('ix_reports_status_priority_created', 'status', 'priority', 'created_at', 'id'),
+        Index('ix_reports_created_id', 'created_at', 'id'),
+    )
+    
 # Model Evidence
 class Evidence(db.Model):
     __tablename__ = 'evidences'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     report_id = db.Column(db.String(36), db.ForeignKey('reports.id', ondelete='CASCADE'), nullable=False, index=True)
-    file_url = db.Column(db.String(500), nullable=False)  # URL file di storage
+    file_url = db.Column(db.String(500), nullable=False)  # URL file di storage, kosong selama upload berjalan
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 isi file
     file_type = db.Column(db.Enum(EvidenceType), nullable=False)
     description = db.Column(db.String(255), nullable=True)
     created_by = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -162,7 +169,7 @@ class Evidence(db.Model):
 class Assignment(db.Model):
     __tablename__ = 'assignments'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     report_id = db.Column(db.String(36), db.ForeignKey('reports.id', ondelete='CASCADE'), nullable=False, index=True)
     officer_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     assigned_by = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -181,22 +188,30 @@ class Assignment(db.Model):
 class Location(db.Model):
     __tablename__ = 'locations'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), nullable=False, default=uuid7)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     accuracy = db.Column(db.Float, nullable=True)  # Akurasi dalam meter
     is_active = db.Column(db.Boolean, default=True, nullable=False, index=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Relationships
     user = db.relationship('User', back_populates='locations')
     
+    # Dipartisi per created_at di Postgres (app/services/retention.py); primary key
+    # tabel partisi wajib memuat kolom partisi, identitas ORM tetap id saja
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+    __mapper_args__ = {'primary_key': [id]}
+    
 # Model Timeline Event
 class TimelineEvent(db.Model):
     __tablename__ = 'timeline_events'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), nullable=False, default=uuid7)
     report_id = db.Column(db.String(36), db.ForeignKey('reports.id', ondelete='CASCADE'), nullable=False, index=True)
     event_type = db.Column(db.String(50), nullable=False)  # status_change, assignment, evidence_added, etc.
     event_data = db.Column(db.JSON, nullable=False)  # Data tambahan event dalam format JSON
@@ -207,11 +222,17 @@ class TimelineEvent(db.Model):
     report = db.relationship('Report', back_populates='timeline_events')
     creator = db.relationship('User', back_populates='timeline_events')
     
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+    __mapper_args__ = {'primary_key': [id]}
+    
 # Model Notification
 class Notification(db.Model):
     __tablename__ = 'notifications'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), nullable=False, default=uuid7)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     title = db.Column(db.String(100), nullable=False)
     message = db.Column(db.String(500), nullable=False)
@@ -222,12 +243,18 @@ class Notification(db.Model):
     
     # Relationships
     user = db.relationship('User', back_populates='notifications')
+    
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+    __mapper_args__ = {'primary_key': [id]}
 
 # Model Report Update
 class ReportUpdate(db.Model):
     __tablename__ = 'report_updates'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     report_id = db.Column(db.String(36), db.ForeignKey('reports.id', ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -243,7 +270,7 @@ class ReportUpdate(db.Model):
 class PerformanceMetric(db.Model):
     __tablename__ = 'performance_metrics'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=uuid7)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     metric_type = db.Column(db.String(50), nullable=False)  # response_time, completion_rate, etc.
     value = db.Column(db.Float, nullable=False)
@@ -253,13 +280,42 @@ class PerformanceMetric(db.Model):
     
     # Relationships
     user = db.relationship('User', back_populates='performance_metrics')
+    
+    __table_args__ = (
+        # Satu nilai per petugas, jenis metrik dan periode; target ON CONFLICT di rollup harian
+        UniqueConstraint('user_id', 'metric_type', 'period_start', name='uq_performance_metrics_user_type_period'),
+    )
+
+
+# Rollup per jam untuk dashboard, diperbarui saat status berubah
+class ReportHourlyStat(db.Model):
+    __tablename__ = 'report_hourly_stats'
+    
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # Jam dari Report.created_at
+    status = db.Column(db.Enum(ReportStatus), primary_key=True)
+    priority = db.Column(db.Enum(ReportPriority), primary_key=True)
+    is_automatic = db.Column(db.Boolean, primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class AssignmentHourlyStat(db.Model):
+    __tablename__ = 'assignment_hourly_stats'
+    
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # Jam dari Assignment.created_at
+    officer_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    assigned = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    rejected = db.Column(db.Integer, default=0, nullable=False)
+    response_time_total = db.Column(db.BigInteger, default=0, nullable=False)  # Detik
+    response_time_count = db.Column(db.Integer, default=0, nullable=False)
 
 
 class Token(db.Model):
     __tablename__ = 'token_blacklist'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    token = db.Column(db.String(255), nullable=False)
-    user_id = db.Column(db.String(36), nullable=False)
+    jti = db.Column(db.String(36), nullable=False, unique=True, index=True)  # Claim jti, bukan token utuh
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # Dari claim exp, None bila token tidak expire
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     user = db.relationship("User", back_populates="tokens")
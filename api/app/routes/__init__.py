@@ -0,0 +1,19 @@
+from app.routes.auth import auth_bp
+from app.routes.events import events_bp
+from app.routes.locations import locations_bp
+from app.routes.dispatch import dispatch_bp
+from app.routes.reports import reports_bp
+from app.routes.dashboard import dashboard_bp
+from app.routes.cameras import cameras_bp
+
+
+def register_blueprints(app):
+    app.register_blueprint(auth_bp)
+    if app.config.get('EVENTS_STREAM', True):
+        # Koneksi SSE menahan satu thread per client; cukup di proses gevent
+        app.register_blueprint(events_bp)
+    app.register_blueprint(locations_bp)
+    app.register_blueprint(dispatch_bp)
+    app.register_blueprint(reports_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(cameras_bp)
@@ -0,0 +1,13 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required, get_jwt
+
+from app.services.revocation import token_revocation
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    token_revocation.revoke(get_jwt())
+    return {"message": "Logged out"}
@@ -0,0 +1,35 @@
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+
+from app.models import CameraStatus, UserRole
+from app.utils.cache import get_current_user, lookup_cache
+from app.utils.query_stats import query_budget
+
+cameras_bp = Blueprint('cameras', __name__, url_prefix='/api/cameras')
+
+
+@cameras_bp.route('', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def list_cameras():
+    user = get_current_user()
+    if user is None:
+        return {"error": "User not found"}, 404
+    if user.role != UserRole.OWNER:
+        return {"error": "Forbidden"}, 403
+
+    cameras = lookup_cache.get_owner_cameras(user.id)
+    status = request.args.get('status')
+    if status:
+        try:
+            status = CameraStatus(status.lower()).value
+        except ValueError:
+            return {"error": f"Invalid status: {status}"}, 400
+        cameras = [camera for camera in cameras if camera['status'] == status]
+    search = request.args.get('q', '').strip().lower()
+    if search:
+        cameras = [
+            camera for camera in cameras
+            if search in camera['name'].lower() or search in camera['location'].lower()
+        ]
+    return {"cameras": cameras}
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app.models import UserRole
+from app.services.aggregates import stats_aggregator
+from app.services.export import (
+    DATASET_COLUMNS, FORMATS, ExportUnavailable, dataset_batches, export_chunks, export_response,
+)
+from app.utils.cache import get_current_user
+from app.utils.database import read_replica
+from app.utils.query_stats import query_budget
+
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
+
+
+def _date_range():
+    end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow()
+    start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=30)
+    if start >= end:
+        raise ValueError('from must be before to')
+    return start, end
+
+
+def _require_role(*roles):
+    user = get_current_user()
+    return user is not None and user.role in roles
+
+
+@dashboard_bp.route('/summary', methods=['GET'])
+@jwt_required()
+@query_budget(3)
+@read_replica
+def summary():
+    if not _require_role(UserRole.ADMIN):
+        return {"error": "Forbidden"}, 403
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        **stats_aggregator.dashboard_summary(start, end),
+    }
+
+
+@dashboard_bp.route('/officers/<officer_id>/performance', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+@read_replica
+def officer_performance(officer_id):
+    if officer_id != get_jwt_identity() and not _require_role(UserRole.ADMIN):
+        return {"error": "Forbidden"}, 403
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {
+        "officer_id": officer_id,
+        "days": stats_aggregator.officer_performance(officer_id, start, end),
+    }
+
+
+@dashboard_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_dataset():
+    if not _require_role(UserRole.ADMIN):
+        return {"error": "Forbidden"}, 403
+    dataset = request.args.get('dataset', 'report_hourly')
+    fmt = request.args.get('format', 'csv')
+    if dataset not in DATASET_COLUMNS:
+        return {"error": f"Unknown dataset: {dataset}"}, 400
+    if fmt not in FORMATS:
+        return {"error": f"Unsupported format: {fmt}"}, 400
+    try:
+        start, end = _date_range()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    try:
+        chunks = export_chunks(dataset_batches(dataset, start, end), DATASET_COLUMNS[dataset], fmt)
+    except ExportUnavailable as e:
+        return {"error": str(e)}, 501
+    return export_response(chunks, fmt, dataset)
@@ -0,0 +1,58 @@
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import jwt_required
+
+from app.models import UserRole
+from app.services.spatial import spatial_index
+from app.utils.cache import get_current_user
+
+dispatch_bp = Blueprint('dispatch', __name__, url_prefix='/api')
+
+MAX_RESULTS = 100
+
+
+def _query_args():
+    k = max(1, min(request.args.get('k', 5, type=int), MAX_RESULTS))
+    # Radius selalu dibatasi agar query dari titik jauh tidak memindai seluruh grid
+    max_radius = current_app.config.get('SPATIAL_MAX_RADIUS_KM', 50)
+    radius_km = request.args.get('radius_km', max_radius, type=float)
+    if not 0 < radius_km <= max_radius:
+        radius_km = max_radius
+    return k, radius_km
+
+
+def _dispatcher():
+    # Posisi petugas dan daftar insiden aktif hanya untuk admin dan petugas, bukan owner
+    user = get_current_user()
+    return user is not None and user.role in (UserRole.ADMIN, UserRole.OFFICER)
+
+
+@dispatch_bp.route('/reports/<report_id>/nearest-officers', methods=['GET'])
+@jwt_required()
+def nearest_officers(report_id):
+    if not _dispatcher():
+        return {"error": "Forbidden"}, 403
+    location = spatial_index.report_location(report_id)
+    if location is None:
+        return {"error": "Report not found or camera has no coordinates"}, 404
+    k, radius_km = _query_args()
+    results = spatial_index.nearest_available_officers(location[0], location[1], k, radius_km)
+    return {
+        "report_id": report_id,
+        "officers": [{"user_id": user_id, "distance_km": round(distance, 3)} for distance, user_id in results],
+    }
+
+
+@dispatch_bp.route('/incidents/nearby', methods=['GET'])
+@jwt_required()
+def nearby_incidents():
+    if not _dispatcher():
+        return {"error": "Forbidden"}, 403
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return {"error": "lat and lon are required"}, 400
+    k, radius_km = _query_args()
+    results = spatial_index.nearest_incidents(lat, lon, k, radius_km)
+    return {
+        "incidents": [{"report_id": report_id, "distance_km": round(distance, 3)} for distance, report_id in results],
+    }
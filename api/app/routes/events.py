@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from flask import Blueprint, Response, current_app, request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import select
+
+from app import db, jwt
+from app.models import Assignment, AssignmentStatus, Camera, Report, UserRole
+from app.services.events import event_gateway
+from app.services.locations import location_tracker
+from app.utils.cache import get_current_user
+
+events_bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+MAX_CHANNELS = 20
+ACTIVE_ASSIGNMENT = (AssignmentStatus.PENDING, AssignmentStatus.ACCEPTED, AssignmentStatus.IN_PROGRESS)
+STREAM_SCOPE = 'events'
+
+
+@jwt.token_verification_loader
+def _stream_token_scope(jwt_header, jwt_data):
+    # Token stream muncul di URL (log proxy, riwayat browser), jadi hanya berlaku untuk stream
+    return jwt_data.get('scope') != STREAM_SCOPE or request.endpoint == 'events.stream'
+
+
+def _owns_report(user, report_id):
+    owner_id = db.session.execute(
+        select(Camera.owner_id).join(Report, Report.camera_id == Camera.id).where(Report.id == report_id)
+    ).scalar()
+    return owner_id == user.id
+
+
+def _tracks_officer(user_id, officer_id):
+    # Owner hanya boleh melacak petugas yang sedang menangani laporan dari kameranya
+    return db.session.execute(
+        select(Assignment.id)
+        .join(Report, Report.id == Assignment.report_id)
+        .join(Camera, Camera.id == Report.camera_id)
+        .where(
+            Assignment.officer_id == officer_id,
+            Assignment.status.in_(ACTIVE_ASSIGNMENT),
+            Camera.owner_id == user_id,
+        )
+        .limit(1)
+    ).first() is not None
+
+
+def _authorized(user, channel):
+    kind, _, key = channel.partition(':')
+    if kind == 'user':
+        return key == user.id
+    if user.role in (UserRole.ADMIN, UserRole.OFFICER):
+        return kind in ('report', 'officer', 'officers')
+    if kind == 'report':
+        return _owns_report(user, key)
+    if kind == 'officer':
+        return _tracks_officer(user.id, key)
+    return False
+
+
+def _channels(user, requested):
+    """(channels, error response) untuk daftar channel dipisah koma"""
+    channels = [c for c in requested.split(',') if c] or [f'user:{user.id}']
+    if len(channels) > MAX_CHANNELS:
+        return None, ({"error": f"At most {MAX_CHANNELS} channels"}, 400)
+    for channel in channels:
+        if not _authorized(user, channel):
+            return None, ({"error": f"Forbidden channel: {channel}"}, 403)
+    return channels, None
+
+
+def _officer_access_check(user_id, channels):
+    """Untuk owner: cek ulang assignment setiap kali posisi petugas akan dikirim.
+
+    Assignment bisa selesai atau dialihkan saat stream masih terbuka; tanpa cek
+    ini owner terus menerima posisi petugas yang sudah tidak menangani
+    laporannya.
+    """
+    tracked = {c for c in channels if c.startswith('officer:')}
+    if not tracked:
+        return None
+    app = current_app._get_current_object()
+
+    def check(events):
+        officers = {e.channel.partition(':')[2] for e in events if e.channel in tracked}
+        if not officers:
+            return True
+        with app.app_context():
+            try:
+                return all(_tracks_officer(user_id, officer_id) for officer_id in officers)
+            finally:
+                db.session.remove()
+
+    return check
+
+
+@events_bp.route('/token', methods=['POST'])
+@jwt_required()
+def stream_token():
+    """Token berumur pendek untuk ?jwt= karena EventSource tidak bisa mengirim header"""
+    user = get_current_user()
+    if user is None:
+        return {"error": "User not found"}, 404
+
+    data = request.get_json(silent=True) or {}
+    channels, error = _channels(user, data.get('channels') or request.args.get('channels', ''))
+    if error:
+        return error
+    expires = current_app.config.get('EVENTS_TOKEN_EXPIRES', 60)
+    token = create_access_token(
+        identity=user.id,
+        expires_delta=timedelta(seconds=expires),
+        additional_claims={'scope': STREAM_SCOPE, 'channels': channels},
+    )
+    return {"token": token, "channels": channels, "expires_in": expires}, 200
+
+
+@events_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['query_string'])  # EventSource tidak bisa mengirim header
+def stream():
+    claims = get_jwt()
+    if claims.get('scope') != STREAM_SCOPE:
+        return {"error": "Use a stream token from POST /api/events/token"}, 401
+    user = get_current_user()
+    if user is None:
+        return {"error": "User not found"}, 404
+
+    # Channel ditentukan saat token dibuat; dicek ulang karena akses bisa berubah sejak itu
+    channels, error = _channels(user, ','.join(claims.get('channels', ())))
+    if error:
+        return error
+    check = None
+    if user.role not in (UserRole.ADMIN, UserRole.OFFICER):
+        check = _officer_access_check(get_jwt_identity(), channels)
+    db.session.remove()  # Jangan tahan koneksi database selama stream terbuka
+
+    if any(c == 'officers' or c.startswith('officer:') for c in channels):
+        # Posisi dari worker lain masuk lewat refresh location_tracker
+        location_tracker.start()
+
+    subscription = event_gateway.subscribe(channels)
+    return Response(
+        event_gateway.stream(subscription, check),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+
+from app.models import UserRole
+from app.services.locations import location_tracker
+from app.utils.cache import get_current_user
+from app.utils.query_stats import query_budget
+
+locations_bp = Blueprint('locations', __name__, url_prefix='/api/locations')
+
+MAX_PINGS_PER_BATCH = 500
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _parse_ping(item, now):
+    latitude = float(item['latitude'])
+    longitude = float(item['longitude'])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates out of range')
+    accuracy = item.get('accuracy')
+    timestamp = item.get('timestamp')  # Epoch detik dari perangkat
+    recorded_at = datetime.utcfromtimestamp(float(timestamp)) if timestamp is not None else now
+    # Jam perangkat yang maju tidak boleh menggeser posisi terakhir ke masa depan
+    recorded_at = min(recorded_at, now + MAX_CLOCK_SKEW)
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'accuracy': float(accuracy) if accuracy is not None else None,
+        'recorded_at': recorded_at,
+    }
+
+
+def _current_officer():
+    """User OFFICER dari token; ping dari role lain akan muncul sebagai petugas tersedia"""
+    user = get_current_user()
+    if user is None or user.role != UserRole.OFFICER:
+        return None
+    return user
+
+
+@locations_bp.route('/batch', methods=['POST'])
+@jwt_required()
+@query_budget(1)  # Hanya saat user belum ada di cache
+def ingest_batch():
+    user = _current_officer()
+    if user is None:
+        return {"error": "Only officers can report locations"}, 403
+    data = request.get_json(silent=True) or {}
+    items = data.get('pings')
+    if not isinstance(items, list) or not items:
+        return {"error": "pings must be a non-empty list"}, 400
+    if len(items) > MAX_PINGS_PER_BATCH:
+        return {"error": f"At most {MAX_PINGS_PER_BATCH} pings per batch"}, 400
+
+    now = datetime.utcnow()
+    try:
+        pings = [_parse_ping(item, now) for item in items]
+    except (KeyError, TypeError, ValueError, OverflowError, OSError) as e:
+        # OverflowError/OSError: timestamp di luar jangkauan (inf, 1e20)
+        return {"error": f"Invalid ping: {e}"}, 400
+
+    accepted = location_tracker.ingest(user.id, pings)
+    return {"accepted": accepted}, 202
+
+
+@locations_bp.route('/status', methods=['POST'])
+@jwt_required()
+def update_status():
+    user = _current_officer()
+    if user is None:
+        return {"error": "Only officers can change duty status"}, 403
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('is_active'), bool):
+        return {"error": "is_active must be a boolean"}, 400
+    position = location_tracker.set_active(user.id, data['is_active'])
+    if position is None:
+        return {"error": "No location reported yet"}, 404
+    return position.to_dict()
+
+
+@locations_bp.route('/officers', methods=['GET'])
+@jwt_required()
+@query_budget(1)
+def officer_positions():
+    # Posisi seluruh petugas hanya untuk admin dan sesama petugas, bukan owner
+    user = get_current_user()
+    if user is None or user.role not in (UserRole.ADMIN, UserRole.OFFICER):
+        return {"error": "Forbidden"}, 403
+    active_only = request.args.get('active', 'true').lower() != 'false'
+    positions = location_tracker.positions(active_only=active_only)
+    return {"officers": [position.to_dict() for position in positions]}
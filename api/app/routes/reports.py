@@ -0,0 +1,144 @@
+import os
+
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import jwt_required
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.models import Evidence, EvidenceType, Report, UserRole
+from app.utils.cache import get_current_user
+from app.utils.database import read_replica
+from app.utils.query_stats import query_budget
+from app.services.export import (
+    FORMATS, REPORT_COLUMNS, ExportUnavailable, export_chunks, export_response, report_batches,
+)
+from app.services.report_feed import InvalidCursor, feed_query, paginate, parse_filters, DEFAULT_PAGE_SIZE
+from app.services.storage import UploadQueueFull, UploadTooLarge, upload_pipeline
+
+reports_bp = Blueprint('reports', __name__, url_prefix='/api/reports')
+
+
+@reports_bp.route('', methods=['GET'])
+@jwt_required()
+@query_budget(3)
+@read_replica
+def list_reports():
+    user = get_current_user()
+    if user is None:
+        return {"error": "User not found"}, 404
+
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    # Owner hanya boleh melihat laporan dari kameranya sendiri
+    if user.role == UserRole.OWNER:
+        filters['owner_id'] = user.id
+
+    try:
+        page = paginate(
+            feed_query(**filters),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        )
+    except InvalidCursor as e:
+        return {"error": str(e)}, 400
+    return page
+
+
+@reports_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_reports():
+    user = get_current_user()
+    if user is None:
+        return {"error": "User not found"}, 404
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return {"error": f"Unsupported format: {fmt}"}, 400
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    # Sama seperti feed: owner hanya boleh mengexport laporan dari kameranya sendiri
+    if user.role == UserRole.OWNER:
+        filters['owner_id'] = user.id
+
+    try:
+        chunks = export_chunks(report_batches(filters), REPORT_COLUMNS, fmt)
+    except ExportUnavailable as e:
+        return {"error": str(e)}, 501
+    return export_response(chunks, fmt, 'reports')
+
+
+def _evidence_type(content_type):
+    for prefix, evidence_type in (('image/', EvidenceType.IMAGE), ('video/', EvidenceType.VIDEO),
+                                  ('audio/', EvidenceType.AUDIO)):
+        if content_type.startswith(prefix):
+            return evidence_type
+    return EvidenceType.DOCUMENT
+
+
+@reports_bp.route('/<report_id>/evidence', methods=['POST'])
+@jwt_required()
+def upload_evidence(report_id):
+    user = get_current_user()
+    if user is None:
+        return {"error": "User not found"}, 404
+
+    report = db.session.get(Report, report_id)
+    if report is None:
+        return {"error": "Report not found"}, 404
+    if user.role == UserRole.OWNER and report.camera.owner_id != user.id:
+        return {"error": "Forbidden"}, 403
+
+    # Slot antrian dipesan sebelum body dibaca: saat antrian penuh, file tidak perlu di-spool
+    try:
+        upload_pipeline.reserve()
+    except UploadQueueFull as e:
+        return {"error": str(e)}, 503
+
+    path = None
+    try:
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            upload_pipeline.release()
+            return {"error": "File is required"}, 400
+
+        # File disalin ke spool per chunk; encode/upload ke storage berjalan di latar belakang
+        content_type = upload.mimetype or 'application/octet-stream'
+        extension = os.path.splitext(secure_filename(upload.filename))[1].lower()
+        path = upload_pipeline.spool(upload.stream, extension)
+
+        evidence = Evidence(
+            report_id=report.id,
+            file_url='',
+            file_type=_evidence_type(content_type),
+            description=request.form.get('description'),
+            created_by=user.id,
+        )
+        db.session.add(evidence)
+        db.session.commit()
+        upload_pipeline.submit_file(
+            path, current_app.config['EVIDENCE_BUCKET'], content_type, evidence_id=evidence.id, reserved=True
+        )
+    except UploadTooLarge as e:
+        upload_pipeline.release()
+        return {"error": str(e)}, 413
+    except BaseException:
+        upload_pipeline.release()
+        if path:
+            os.unlink(path)
+        raise
+
+    return {
+        "evidence": {
+            "id": evidence.id,
+            "report_id": evidence.report_id,
+            "file_type": evidence.file_type.value,
+            "file_url": None,
+            "status": "uploading",
+        }
+    }, 202
@@ -0,0 +1,17 @@
+from app.services.detection import detection_worker
+from app.services.inference import inference_engine
+from app.services.coalescer import detection_coalescer
+from app.services.notifications import notification_dispatcher
+from app.services.locations import location_tracker
+from app.services.spatial import spatial_index
+from app.services.aggregates import stats_aggregator
+from app.services.revocation import token_revocation
+from app.services.health import camera_health_monitor
+from app.services.storage import upload_pipeline
+from app.services.events import event_gateway
+from app.services.retention import retention_manager
+
+__all__ = ['detection_worker', 'inference_engine', 'detection_coalescer', 'notification_dispatcher',
+           'location_tracker', 'spatial_index', 'stats_aggregator',
+           'token_revocation', 'camera_health_monitor', 'upload_pipeline',
+           'event_gateway', 'retention_manager']
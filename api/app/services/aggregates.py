@@ -0,0 +1,369 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, inspect, select
+
+from app.utils.ids import uuid7
+
+log = logging.getLogger('tangkapin.aggregates')
+
+DAY = timedelta(days=1)
+
+
+def hour_bucket(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _history(target, attribute):
+    """(nilai lama, nilai baru) atribut di dalam flush yang sedang berjalan"""
+    history = inspect(target).attrs[attribute].history
+    new = history.added[0] if history.added else getattr(target, attribute)
+    old = history.deleted[0] if history.deleted else new
+    return old, new
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _upsert(connection, table, keys, values, defaults, merge):
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**keys, **values, **defaults)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: merge(table.c[column], stmt.excluded[column]) for column in values},
+        )
+        connection.execute(stmt)
+        return
+
+    where = [table.c[column] == value for column, value in keys.items()]
+    result = connection.execute(
+        table.update().where(*where).values({column: merge(table.c[column], value) for column, value in values.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**keys, **values, **defaults))
+
+
+def upsert_add(connection, table, keys, deltas):
+    """Tambahkan delta ke baris rollup, buat barisnya bila belum ada"""
+    _upsert(connection, table, keys, deltas, {}, lambda current, delta: current + delta)
+
+
+def upsert_set(connection, table, keys, values, defaults=None):
+    """Timpa nilai baris dengan kunci unik `keys`; `defaults` hanya dipakai saat baris baru dibuat"""
+    _upsert(connection, table, keys, values, defaults or {}, lambda current, value: value)
+
+
+class StatsAggregator:
+    """Rollup inkremental untuk dashboard dan kinerja petugas.
+
+    Setiap INSERT/UPDATE/DELETE Report dan Assignment menggeser hitungan di
+    tabel bucket per jam pada transaksi yang sama, dan rollup harian petugas di
+    PerformanceMetric dihitung ulang dari paling banyak 24 bucket. Dashboard
+    cukup menjumlahkan bucket dalam rentang waktu, bukan memindai riwayat.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import Assignment, Report
+
+        self.app = app
+        if not self._listening:
+            event.listen(Report, 'after_insert', self._report_inserted)
+            event.listen(Report, 'after_update', self._report_updated)
+            event.listen(Report, 'after_delete', self._report_deleted)
+            event.listen(Assignment, 'after_insert', self._assignment_inserted)
+            event.listen(Assignment, 'after_update', self._assignment_updated)
+            event.listen(Assignment, 'after_delete', self._assignment_deleted)
+            # Tanpa active_history, atribut yang kedaluwarsa setelah commit diganti tanpa
+            # memuat nilai lama, sehingga _history melihat lama == baru dan delta hilang
+            for attribute in (Report.status, Report.priority, Report.is_automatic,
+                              Assignment.status, Assignment.response_time, Assignment.officer_id):
+                event.listen(attribute, 'set', _keep_old_value, active_history=True)
+            self._listening = True
+        app.extensions['stats_aggregator'] = self
+
+    # Report buckets
+
+    def _report_delta(self, connection, created_at, status, priority, is_automatic, delta):
+        from app.models import ReportHourlyStat
+
+        upsert_add(connection, ReportHourlyStat.__table__, {
+            'bucket_start': hour_bucket(created_at),
+            'status': status,
+            'priority': priority,
+            'is_automatic': bool(is_automatic),
+        }, {'count': delta})
+
+    def _report_inserted(self, mapper, connection, target):
+        self._report_delta(connection, target.created_at, target.status, target.priority, target.is_automatic, 1)
+
+    def _report_updated(self, mapper, connection, target):
+        old_status, new_status = _history(target, 'status')
+        old_priority, new_priority = _history(target, 'priority')
+        old_automatic, new_automatic = _history(target, 'is_automatic')
+        old = (old_status, old_priority, bool(old_automatic))
+        new = (new_status, new_priority, bool(new_automatic))
+        if old == new:
+            return
+        self._report_delta(connection, target.created_at, *old, -1)
+        self._report_delta(connection, target.created_at, *new, 1)
+
+    def _report_deleted(self, mapper, connection, target):
+        self._report_delta(connection, target.created_at, target.status, target.priority, target.is_automatic, -1)
+
+    # Assignment buckets
+
+    def _assignment_delta(self, connection, officer_id, created_at, deltas):
+        from app.models import AssignmentHourlyStat
+
+        deltas = {column: value for column, value in deltas.items() if value}
+        if not deltas:
+            return
+        upsert_add(connection, AssignmentHourlyStat.__table__, {
+            'bucket_start': hour_bucket(created_at),
+            'officer_id': officer_id,
+        }, deltas)
+        self._refresh_officer_day(connection, officer_id, day_bucket(created_at))
+
+    @staticmethod
+    def _assignment_counts(status, response_time, sign):
+        from app.models import AssignmentStatus
+
+        return {
+            'completed': sign if status == AssignmentStatus.COMPLETED else 0,
+            'rejected': sign if status == AssignmentStatus.REJECTED else 0,
+            'response_time_total': sign * response_time if response_time is not None else 0,
+            'response_time_count': sign if response_time is not None else 0,
+        }
+
+    def _assignment_inserted(self, mapper, connection, target):
+        deltas = self._assignment_counts(target.status, target.response_time, 1)
+        deltas['assigned'] = 1
+        self._assignment_delta(connection, target.officer_id, target.created_at, deltas)
+
+    def _assignment_updated(self, mapper, connection, target):
+        old_status, new_status = _history(target, 'status')
+        old_response, new_response = _history(target, 'response_time')
+        old_officer, new_officer = _history(target, 'officer_id')
+        if (old_status, old_response, old_officer) == (new_status, new_response, new_officer):
+            return
+        removed = self._assignment_counts(old_status, old_response, -1)
+        added = self._assignment_counts(new_status, new_response, 1)
+        if old_officer != new_officer:
+            removed['assigned'] = -1
+            added['assigned'] = 1
+            self._assignment_delta(connection, old_officer, target.created_at, removed)
+            self._assignment_delta(connection, new_officer, target.created_at, added)
+        else:
+            merged = {column: removed[column] + added[column] for column in removed}
+            self._assignment_delta(connection, new_officer, target.created_at, merged)
+
+    def _assignment_deleted(self, mapper, connection, target):
+        deltas = self._assignment_counts(target.status, target.response_time, -1)
+        deltas['assigned'] = -1
+        self._assignment_delta(connection, target.officer_id, target.created_at, deltas)
+
+    # PerformanceMetric
+
+    def _refresh_officer_day(self, connection, officer_id, day):
+        from app.models import AssignmentHourlyStat, PerformanceMetric
+
+        stats = AssignmentHourlyStat.__table__
+        row = connection.execute(
+            select(
+                func.coalesce(func.sum(stats.c.assigned), 0),
+                func.coalesce(func.sum(stats.c.completed), 0),
+                func.coalesce(func.sum(stats.c.rejected), 0),
+                func.coalesce(func.sum(stats.c.response_time_total), 0),
+                func.coalesce(func.sum(stats.c.response_time_count), 0),
+            ).where(
+                stats.c.officer_id == officer_id,
+                stats.c.bucket_start >= day,
+                stats.c.bucket_start < day + DAY,
+            )
+        ).one()
+        assigned, completed, rejected, response_total, response_count = row
+        values = {
+            'assignments_total': assigned,
+            'assignments_completed': completed,
+            'assignments_rejected': rejected,
+            'completion_rate': completed / assigned if assigned else 0.0,
+            'avg_response_time': response_total / response_count if response_count else 0.0,
+        }
+
+        metrics = PerformanceMetric.__table__
+        for metric_type, value in values.items():
+            # Unique (user_id, metric_type, period_start) membuat dua transaksi yang
+            # bersamaan menimpa baris yang sama, bukan menyisipkan duplikat
+            upsert_set(connection, metrics, {
+                'user_id': officer_id,
+                'metric_type': metric_type,
+                'period_start': day,
+            }, {'value': float(value)}, defaults={
+                'id': uuid7(),
+                'period_end': day + DAY,
+                'created_at': datetime.utcnow(),
+            })
+
+    # Backfill dan query
+
+    def backfill(self, batch_size=10000):
+        """Bangun ulang semua bucket dari data yang ada"""
+        from app import db
+        from app.models import (
+            Assignment, AssignmentHourlyStat, PerformanceMetric, Report, ReportHourlyStat,
+        )
+
+        report_counts = defaultdict(int)
+        rows = db.session.query(Report.created_at, Report.status, Report.priority, Report.is_automatic)
+        for created_at, status, priority, is_automatic in rows.yield_per(batch_size):
+            report_counts[(hour_bucket(created_at), status, priority, bool(is_automatic))] += 1
+
+        assignment_counts = defaultdict(lambda: defaultdict(int))
+        rows = db.session.query(Assignment.officer_id, Assignment.created_at, Assignment.status, Assignment.response_time)
+        for officer_id, created_at, status, response_time in rows.yield_per(batch_size):
+            bucket = assignment_counts[(hour_bucket(created_at), officer_id)]
+            bucket['assigned'] += 1
+            for column, value in self._assignment_counts(status, response_time, 1).items():
+                bucket[column] += value
+
+        connection = db.session.connection()
+        connection.execute(ReportHourlyStat.__table__.delete())
+        connection.execute(AssignmentHourlyStat.__table__.delete())
+        metric_types = ('assignments_total', 'assignments_completed', 'assignments_rejected',
+                        'completion_rate', 'avg_response_time')
+        connection.execute(PerformanceMetric.__table__.delete().where(
+            PerformanceMetric.metric_type.in_(metric_types)
+        ))
+        if report_counts:
+            connection.execute(ReportHourlyStat.__table__.insert(), [
+                {'bucket_start': bucket, 'status': status, 'priority': priority,
+                 'is_automatic': is_automatic, 'count': count}
+                for (bucket, status, priority, is_automatic), count in report_counts.items()
+            ])
+        if assignment_counts:
+            connection.execute(AssignmentHourlyStat.__table__.insert(), [
+                {'bucket_start': bucket, 'officer_id': officer_id, **counts}
+                for (bucket, officer_id), counts in assignment_counts.items()
+            ])
+        for officer_id, day in {(officer_id, day_bucket(bucket)) for bucket, officer_id in assignment_counts}:
+            self._refresh_officer_day(connection, officer_id, day)
+        db.session.commit()
+        log.info('Backfilled %d report buckets and %d assignment buckets', len(report_counts), len(assignment_counts))
+        return len(report_counts), len(assignment_counts)
+
+    def migrate_schema(self, connection):
+        """Ganti index biasa performance_metrics dengan unique index (user_id, metric_type, period_start).
+
+        Duplikat yang sempat tersisip oleh UPDATE-lalu-INSERT lama dihapus dulu;
+        per kunci disimpan baris dengan id terbesar (UUIDv7, jadi yang terbaru).
+        Mengembalikan jumlah baris yang dihapus, atau None bila sudah unik.
+        """
+        from sqlalchemy import text
+
+        indexes = {index['name']: index for index in inspect(connection).get_indexes('performance_metrics')}
+        constraints = {
+            constraint['name'] for constraint in inspect(connection).get_unique_constraints('performance_metrics')
+        }
+        if 'uq_performance_metrics_user_type_period' in constraints or \
+                indexes.get('uq_performance_metrics_user_type_period', {}).get('unique'):
+            return None
+
+        # Subquery dibungkus tabel turunan agar MySQL mau menghapus dari tabel yang sama
+        deleted = connection.execute(text(
+            'DELETE FROM performance_metrics WHERE id NOT IN ('
+            'SELECT id FROM (SELECT MAX(id) AS id FROM performance_metrics '
+            'GROUP BY user_id, metric_type, period_start) AS keep)'
+        )).rowcount
+        if 'ix_performance_metrics_user_type_period' in indexes:
+            if connection.dialect.name == 'mysql':
+                connection.execute(text('DROP INDEX ix_performance_metrics_user_type_period ON performance_metrics'))
+            else:
+                connection.execute(text('DROP INDEX ix_performance_metrics_user_type_period'))
+        connection.execute(text(
+            'CREATE UNIQUE INDEX uq_performance_metrics_user_type_period '
+            'ON performance_metrics (user_id, metric_type, period_start)'
+        ))
+        return deleted
+
+    def dashboard_summary(self, start, end):
+        from app import db
+        from app.models import AssignmentHourlyStat, ReportHourlyStat
+
+        by_status = defaultdict(int)
+        by_priority = defaultdict(int)
+        automatic = 0
+        total = 0
+        rows = db.session.query(
+            ReportHourlyStat.status, ReportHourlyStat.priority, ReportHourlyStat.is_automatic,
+            func.sum(ReportHourlyStat.count),
+        ).filter(
+            ReportHourlyStat.bucket_start >= hour_bucket(start),
+            ReportHourlyStat.bucket_start < end,
+        ).group_by(ReportHourlyStat.status, ReportHourlyStat.priority, ReportHourlyStat.is_automatic)
+        for status, priority, is_automatic, count in rows:
+            by_status[status.value] += count
+            by_priority[priority.value] += count
+            total += count
+            if is_automatic:
+                automatic += count
+
+        assigned, completed, rejected, response_total, response_count = db.session.query(
+            func.coalesce(func.sum(AssignmentHourlyStat.assigned), 0),
+            func.coalesce(func.sum(AssignmentHourlyStat.completed), 0),
+            func.coalesce(func.sum(AssignmentHourlyStat.rejected), 0),
+            func.coalesce(func.sum(AssignmentHourlyStat.response_time_total), 0),
+            func.coalesce(func.sum(AssignmentHourlyStat.response_time_count), 0),
+        ).filter(
+            AssignmentHourlyStat.bucket_start >= hour_bucket(start),
+            AssignmentHourlyStat.bucket_start < end,
+        ).one()
+
+        return {
+            'reports': {
+                'total': total,
+                'automatic': automatic,
+                'by_status': dict(by_status),
+                'by_priority': dict(by_priority),
+            },
+            'assignments': {
+                'total': assigned,
+                'completed': completed,
+                'rejected': rejected,
+                'completion_rate': completed / assigned if assigned else 0.0,
+                'avg_response_time': response_total / response_count if response_count else None,
+            },
+        }
+
+    def officer_performance(self, officer_id, start, end):
+        from app.models import PerformanceMetric
+
+        rows = PerformanceMetric.query.filter(
+            PerformanceMetric.user_id == officer_id,
+            PerformanceMetric.period_start >= day_bucket(start),
+            PerformanceMetric.period_start < end,
+        ).order_by(PerformanceMetric.period_start).all()
+        days = defaultdict(dict)
+        for metric in rows:
+            days[metric.period_start.date().isoformat()][metric.metric_type] = metric.value
+        return [{'date': date, **values} for date, values in days.items()]
+
+
+stats_aggregator = StatsAggregator()
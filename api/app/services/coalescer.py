@@ -0,0 +1,260 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.services.detection import priority_for_confidence
+
+log = logging.getLogger('tangkapin.coalescer')
+
+
+@dataclass
+class CoalescedIncident:
+    report_id: str
+    evidence_id: str
+    reporter_id: str
+    first_seen: float
+    last_seen: float
+    best_confidence: float
+    weapon_type: str
+    detections: int = 1
+
+
+class DetectionCoalescer:
+    """Menggabungkan deteksi beruntun dari satu kamera menjadi satu Report.
+
+    Deteksi yang datang dalam window (dihitung dari deteksi terakhir) dilipat ke
+    Report yang sama. Report hanya di-UPDATE bila confidence naik, dan frame
+    terbaik disimpan sebagai satu Evidence yang URL-nya diganti di tempat.
+    Encode dan upload frame berjalan di upload_pipeline setelah commit, jadi
+    alert tidak menunggu upload selesai.
+    Entri kedaluwarsa dikeluarkan dari index dan ringkasannya dicatat sebagai
+    satu TimelineEvent.
+
+    `_lock` hanya menjaga index dan counter; commit, antrian upload dan notifikasi
+    berjalan di bawah lock per kamera, jadi kamera lain tidak ikut menunggu.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._incidents = OrderedDict()  # camera_id -> CoalescedIncident, urut last_seen
+        self._lock = threading.Lock()
+        self._camera_locks = {}  # camera_id -> Lock, serialisasi create/update per kamera
+        self.raw_detections = 0
+        self.reports_created = 0
+        self.reports_updated = 0
+        self.evictions = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.window = app.config.get('DETECTION_COALESCE_WINDOW', 60)
+        self.max_age = app.config.get('DETECTION_COALESCE_MAX_AGE', 900)
+        self.bucket = app.config.get('DETECTION_IMAGES_BUCKET', 'detection-images')
+        app.extensions['detection_coalescer'] = self
+
+    def _expired(self, incident, now):
+        return now - incident.last_seen > self.window or now - incident.first_seen > self.max_age
+
+    def upload_frame(self, frame, report_id, evidence_id):
+        """Antrikan frame terbaik; URL Report/Evidence diisi setelah upload selesai"""
+        from app.services.storage import upload_pipeline
+
+        try:
+            upload_pipeline.submit_frame(frame.image, self.bucket, report_id=report_id, evidence_id=evidence_id)
+        except Exception:
+            log.exception('Unable to queue detection frame for report %s', report_id)
+
+    def handle(self, frame, detection):
+        """Handler on_detection untuk DetectionPipeline, mengembalikan report_id"""
+        from app.utils.metrics import DETECTIONS_OVER_THRESHOLD
+
+        DETECTIONS_OVER_THRESHOLD.labels(detection.label).inc()
+        now = frame.captured_at
+        with self._lock:
+            self.raw_detections += 1
+            expired = self._pop_expired(now)
+            camera_lock = self._camera_locks.setdefault(frame.camera_id, threading.Lock())
+
+        with camera_lock:
+            improved = False
+            with self._lock:
+                incident = self._incidents.get(frame.camera_id)
+                if incident is not None and self._expired(incident, now):
+                    expired.append(self._incidents.pop(frame.camera_id))
+                    incident = None
+                elif incident is not None:
+                    improved = self._fold(incident, frame, detection)
+                    self._incidents.move_to_end(frame.camera_id)
+            if incident is None:
+                incident = self._create_incident(frame, detection)
+                if incident is not None:
+                    with self._lock:
+                        self._incidents[frame.camera_id] = incident
+                        self.reports_created += 1
+            elif improved:
+                self._update_report(incident.report_id, detection)
+                self.upload_frame(frame, incident.report_id, incident.evidence_id)
+                with self._lock:
+                    self.reports_updated += 1
+
+        # Ringkasan ditulis setelah deteksi ini diproses agar kegagalannya tidak ikut menggagalkan alert
+        self._record_summaries(expired)
+        return incident.report_id if incident else None
+
+    def _create_incident(self, frame, detection):
+        from app import db
+        from app.models import Camera, Evidence, EvidenceType, Report
+
+        with self.app.app_context():
+            camera = db.session.get(Camera, frame.camera_id)
+            if camera is None:
+                return None
+            report = Report(
+                title=f'Weapon detected: {detection.label}',
+                description=f'Automatic detection on camera {camera.name} ({camera.location})',
+                camera_id=camera.id,
+                reporter_id=camera.owner_id,
+                priority=priority_for_confidence(detection.confidence),
+                detection_confidence=detection.confidence,
+                weapon_type=detection.label,
+                is_automatic=True,
+            )
+            db.session.add(report)
+            db.session.flush()
+            evidence = Evidence(
+                report_id=report.id,
+                file_url='',
+                file_type=EvidenceType.IMAGE,
+                description='Best detection frame',
+                created_by=camera.owner_id,
+            )
+            db.session.add(evidence)
+            db.session.commit()
+            log.info('Automatic report %s created for camera %s (%s %.2f)',
+                     report.id, camera.id, detection.label, detection.confidence)
+            self.upload_frame(frame, report.id, evidence.id)
+            self._notify_owner(report, camera)
+            return CoalescedIncident(
+                report_id=report.id,
+                evidence_id=evidence.id,
+                reporter_id=camera.owner_id,
+                first_seen=frame.captured_at,
+                last_seen=frame.captured_at,
+                best_confidence=detection.confidence,
+                weapon_type=detection.label,
+            )
+
+    def _notify_owner(self, report, camera):
+        from app.models import NotificationType
+        from app.services.notifications import notification_dispatcher
+
+        try:
+            notification_dispatcher.notify(
+                [camera.owner_id],
+                title=report.title,
+                message=f'{camera.name}: {report.weapon_type} ({report.detection_confidence:.0%})',
+                notification_type=NotificationType.REPORT,
+                reference_id=report.id,
+                data={'camera_id': camera.id, 'priority': report.priority.value},
+                event='detection_alert',
+            )
+        except Exception:
+            log.exception('Unable to queue alert for report %s', report.id)
+
+    def _fold(self, incident, frame, detection):
+        """Lipat deteksi ke insiden (di bawah _lock); True bila confidence naik"""
+        incident.detections += 1
+        incident.last_seen = frame.captured_at
+        if detection.confidence <= incident.best_confidence:
+            return False
+        incident.best_confidence = detection.confidence
+        incident.weapon_type = detection.label
+        return True
+
+    def _update_report(self, report_id, detection):
+        from app import db
+        from app.models import Report
+
+        with self.app.app_context():
+            # Lewat ORM (bukan bulk UPDATE) agar event rollup dashboard ikut berjalan
+            report = db.session.get(Report, report_id)
+            if report is not None:
+                report.detection_confidence = detection.confidence
+                report.weapon_type = detection.label
+                report.priority = priority_for_confidence(detection.confidence)
+            db.session.commit()
+
+    def _pop_expired(self, now):
+        expired = []
+        while self._incidents:
+            camera_id, incident = next(iter(self._incidents.items()))
+            if not self._expired(incident, now):
+                break
+            self._incidents.popitem(last=False)
+            expired.append(incident)
+        return expired
+
+    def _record_summaries(self, incidents):
+        if not incidents:
+            return
+        with self._lock:
+            self.evictions += len(incidents)
+        try:
+            self._write_summaries(incidents)
+        except Exception:
+            log.exception('Unable to record detection summaries for %d incidents', len(incidents))
+
+    def _write_summaries(self, incidents):
+        from app import db
+        from app.models import TimelineEvent
+
+        with self.app.app_context():
+            db.session.add_all([
+                TimelineEvent(
+                    report_id=incident.report_id,
+                    event_type='detection_summary',
+                    event_data={
+                        'detections': incident.detections,
+                        'best_confidence': incident.best_confidence,
+                        'weapon_type': incident.weapon_type,
+                        'duration_seconds': round(incident.last_seen - incident.first_seen, 3),
+                    },
+                    created_by=incident.reporter_id,
+                )
+                for incident in incidents
+            ])
+            db.session.commit()
+
+    def evict_expired(self, now=None):
+        """Dipanggil periodik oleh worker agar insiden yang sepi ikut ditutup"""
+        with self._lock:
+            expired = self._pop_expired(now or time.time())
+        self._record_summaries(expired)
+        return len(expired)
+
+    def flush(self):
+        with self._lock:
+            incidents = list(self._incidents.values())
+            self._incidents.clear()
+        self._record_summaries(incidents)
+
+    def folded_counts(self):
+        with self._lock:
+            return {incident.report_id: incident.detections for incident in self._incidents.values()}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'active_incidents': len(self._incidents),
+                'raw_detections': self.raw_detections,
+                'reports_created': self.reports_created,
+                'reports_updated': self.reports_updated,
+                'evictions': self.evictions,
+            }
+
+
+detection_coalescer = DetectionCoalescer()
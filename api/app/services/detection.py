@@ -0,0 +1,379 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+log = logging.getLogger('tangkapin.detection')
+
+
+@dataclass
+class Detection:
+    label: str
+    confidence: float
+    bbox: tuple
+
+
+@dataclass
+class Frame:
+    camera_id: str
+    image: object  # numpy BGR array dari OpenCV
+    captured_at: float = field(default_factory=time.time)
+
+
+class DetectionStats:
+    """Counter sederhana untuk monitoring dan benchmark pipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames_read = 0
+        self.frames_skipped_fps = 0
+        self.frames_skipped_motion = 0
+        self.frames_dropped = 0
+        self.frames_inferred = 0
+        self.batches = 0
+        self.alerts = 0
+        self.inference_seconds = 0.0
+        # Hanya sampel terbaru agar worker yang berjalan lama tidak terus menumpuk memori
+        self.frame_latencies = deque(maxlen=10000)
+        self.alert_latencies = deque(maxlen=10000)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record(self, name, value):
+        with self._lock:
+            getattr(self, name).append(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'frames_read': self.frames_read,
+                'frames_skipped_fps': self.frames_skipped_fps,
+                'frames_skipped_motion': self.frames_skipped_motion,
+                'frames_dropped': self.frames_dropped,
+                'frames_inferred': self.frames_inferred,
+                'batches': self.batches,
+                'alerts': self.alerts,
+                'inference_seconds': self.inference_seconds,
+                'frame_latencies': list(self.frame_latencies),
+                'alert_latencies': list(self.alert_latencies),
+            }
+
+
+class YoloBackend:
+    """Memuat model YOLO sekali dan menjalankan inference per batch frame"""
+
+    def __init__(self, model_path, device='cpu'):
+        self.model_path = model_path
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                # Import berat ditunda sampai benar-benar dibutuhkan
+                from ultralytics import YOLO
+
+                started = time.time()
+                self._model = YOLO(self.model_path)
+                log.info('Model loaded from %s in %.2fs', self.model_path, time.time() - started)
+        return self._model
+
+    def predict(self, images):
+        model = self.load()
+        results = model(images, device=self.device, verbose=False)
+        batch = []
+        for result in results:
+            detections = []
+            boxes = result.boxes
+            if boxes is not None:
+                for cls, conf, xyxy in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist()):
+                    detections.append(Detection(result.names[int(cls)], float(conf), tuple(xyxy)))
+            batch.append(detections)
+        return batch
+
+
+class CameraStream:
+    """Membaca frame dari satu kamera dan hanya meneruskan frame yang layak diproses.
+
+    Frame dibuang bila melebihi budget FPS kamera atau bila tidak ada gerakan
+    dibanding frame terakhir yang diteruskan (kecuali sudah melewati idle interval).
+    """
+
+    def __init__(self, camera_id, source, pipeline, max_fps, motion_threshold, idle_interval, realtime=False):
+        self.camera_id = camera_id
+        self.source = source
+        self.pipeline = pipeline
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.motion_threshold = motion_threshold
+        self.idle_interval = idle_interval
+        self.realtime = realtime
+        self._stop = threading.Event()
+        self._thread = None
+        self._reference = None
+        self._last_submit = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'camera-{self.camera_id}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _has_motion(self, cv2, image, now):
+        small = cv2.cvtColor(cv2.resize(image, (64, 36), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if self._reference is None or now - self._last_submit >= self.idle_interval:
+            self._reference = small
+            return True
+        score = cv2.absdiff(small, self._reference).mean()
+        if score < self.motion_threshold:
+            return False
+        self._reference = small
+        return True
+
+    def _run(self):
+        import cv2
+
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            log.warning('Camera %s: unable to open stream %s', self.camera_id, self.source)
+            return
+
+        stats = self.pipeline.stats
+        frame_period = 0.0
+        if self.realtime:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_period = 1.0 / fps
+
+        try:
+            while not self._stop.is_set():
+                read_started = time.time()
+                ok, image = capture.read()
+                if not ok:
+                    log.info('Camera %s: stream ended', self.camera_id)
+                    break
+                now = time.time()
+                stats.incr('frames_read')
+
+                if now - self._last_submit < self.min_interval:
+                    stats.incr('frames_skipped_fps')
+                elif not self._has_motion(cv2, image, now):
+                    stats.incr('frames_skipped_motion')
+                else:
+                    self._last_submit = now
+                    self.pipeline.submit(Frame(self.camera_id, image, now))
+
+                if frame_period:
+                    remaining = frame_period - (time.time() - read_started)
+                    if remaining > 0:
+                        self._stop.wait(remaining)
+        finally:
+            capture.release()
+
+
+class DetectionPipeline:
+    """Menggabungkan frame dari banyak kamera ke dalam satu panggilan model.
+
+    Setiap kamera hanya memiliki satu slot frame tertunda; frame baru
+    menggantikan frame lama yang belum diproses sehingga inference selalu
+    memakai frame terbaru saat model sedang sibuk.
+    """
+
+    def __init__(self, backend, on_detection, threshold, batch_size=8, batch_timeout=0.05, stats=None, concurrency=1):
+        self.backend = backend
+        self.on_detection = on_detection
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.stats = stats or DetectionStats()
+        self.concurrency = concurrency
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def submit(self, frame):
+        with self._cond:
+            if frame.camera_id in self._pending:
+                self.stats.incr('frames_dropped')
+            self._pending[frame.camera_id] = frame
+            self._cond.notify()
+
+    def start(self):
+        # Lebih dari satu thread hanya berguna bila backend adalah pool proses
+        self._threads = [
+            threading.Thread(target=self._run, name=f'detection-inference-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _collect_batch(self):
+        with self._cond:
+            while not self._pending and not self._stop.is_set():
+                self._cond.wait(0.5)
+            deadline = time.time() + self.batch_timeout
+            while len(self._pending) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            camera_ids = list(self._pending)[:self.batch_size]
+            return [self._pending.pop(camera_id) for camera_id in camera_ids]
+
+    def process_batch(self, batch):
+        started = time.time()
+        results = self.backend.predict([frame.image for frame in batch])
+        finished = time.time()
+
+        self.stats.incr('batches')
+        self.stats.incr('frames_inferred', len(batch))
+        self.stats.incr('inference_seconds', finished - started)
+
+        for frame, detections in zip(batch, results):
+            self.stats.record('frame_latencies', finished - frame.captured_at)
+            hits = [d for d in detections if d.confidence >= self.threshold]
+            if not hits:
+                continue
+            best = max(hits, key=lambda d: d.confidence)
+            try:
+                self.on_detection(frame, best)
+            except Exception:
+                log.exception('Detection handler failed for camera %s', frame.camera_id)
+                continue
+            self.stats.incr('alerts')
+            self.stats.record('alert_latencies', time.time() - frame.captured_at)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self.process_batch(batch)
+            except Exception:
+                log.exception('Inference failed for batch of %d frames', len(batch))
+
+
+def priority_for_confidence(confidence):
+    from app.models import ReportPriority
+
+    if confidence >= 0.9:
+        return ReportPriority.CRITICAL
+    return ReportPriority.HIGH
+
+
+class DetectionWorker:
+    """Worker yang menjalankan pipeline deteksi untuk semua kamera ONLINE"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.pipeline = None
+        self.backend = None
+        self.coalescer = None
+        self.streams = {}
+        self._stop = threading.Event()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['detection_worker'] = self
+
+    def _settings(self):
+        config = self.app.config
+        return {
+            'max_fps': config.get('DETECTION_MAX_FPS', 2),
+            'motion_threshold': config.get('DETECTION_MOTION_THRESHOLD', 4.0),
+            'idle_interval': config.get('DETECTION_IDLE_INTERVAL', 10),
+        }
+
+    def sync_cameras(self):
+        from app.models import Camera, CameraStatus
+
+        with self.app.app_context():
+            rows = Camera.query.with_entities(Camera.id, Camera.stream_url).filter(
+                Camera.status == CameraStatus.ONLINE,
+                Camera.is_active.is_(True),
+            ).all()
+        wanted = {camera_id: stream_url for camera_id, stream_url in rows}
+
+        for camera_id in list(self.streams):
+            stream = self.streams[camera_id]
+            if camera_id not in wanted or not stream.alive:
+                stream.stop()
+                del self.streams[camera_id]
+
+        settings = self._settings()
+        for camera_id, stream_url in wanted.items():
+            if camera_id not in self.streams:
+                stream = CameraStream(camera_id, stream_url, self.pipeline, **settings)
+                stream.start()
+                self.streams[camera_id] = stream
+        log.info('Watching %d cameras', len(self.streams))
+
+    def run(self):
+        config = self.app.config
+        concurrency = config.get('INFERENCE_WORKERS', 0)
+        if concurrency:
+            from app.services.inference import inference_engine
+            self.backend = inference_engine
+        else:
+            self.backend = YoloBackend(config['ML_MODEL_PATH'], config.get('DETECTION_DEVICE', 'cpu'))
+        self.backend.load()
+        from app.services.coalescer import detection_coalescer
+        self.coalescer = detection_coalescer
+        self.pipeline = DetectionPipeline(
+            self.backend,
+            self.coalescer.handle,
+            threshold=config['DETECTION_CONFIDENCE_THRESHOLD'],
+            batch_size=config.get('DETECTION_BATCH_SIZE', 8),
+            batch_timeout=config.get('DETECTION_BATCH_TIMEOUT', 0.05),
+            concurrency=max(1, concurrency),
+        )
+        self.pipeline.start()
+
+        refresh = config.get('DETECTION_CAMERA_REFRESH_INTERVAL', 30)
+        try:
+            while not self._stop.is_set():
+                self.sync_cameras()
+                self.coalescer.evict_expired()
+                self._stop.wait(refresh)
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        for stream in self.streams.values():
+            stream.stop()
+        self.streams.clear()
+        if self.pipeline:
+            self.pipeline.stop(timeout=5)
+        if hasattr(self.backend, 'stop'):
+            self.backend.stop()
+        if self.coalescer:
+            self.coalescer.flush()
+        from app.services.storage import upload_pipeline
+        upload_pipeline.stop()
+
+
+detection_worker = DetectionWorker()
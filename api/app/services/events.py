@@ -0,0 +1,295 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.utils.lazy import lazy
+
+log = logging.getLogger('tangkapin.events')
+
+EVENTS_CHANNEL = 'tangkapin:events'
+
+
+@dataclass
+class Event:
+    channel: str
+    type: str
+    data: dict
+    # Event dengan key yang sama menggantikan event lama yang belum terkirim
+    key: str = None
+    id: int = 0
+    published_at: float = field(default_factory=time.time)
+
+    def encode(self):
+        payload = json.dumps(self.data, default=str)
+        return f'id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """Antrian event untuk satu koneksi SSE.
+
+    Update yang bisa digabung (posisi petugas) hanya menyimpan nilai terbaru
+    per key. Bila antrian tetap penuh karena client lambat, subscription
+    ditutup agar client reconnect dan memuat ulang state lewat REST, bukan
+    menerima event yang sudah basi.
+    """
+
+    def __init__(self, channels, maxsize):
+        self.channels = frozenset(channels)
+        self.maxsize = maxsize
+        self.overflowed = False
+        self.closed = False
+        self.dropped = 0
+        self._events = OrderedDict()
+        self._anonymous = itertools.count()
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if self.closed:
+                return False
+            key = event.key or ('_', next(self._anonymous))
+            if key in self._events:
+                # Posisi lama yang belum terkirim tidak ada gunanya lagi
+                del self._events[key]
+                self.dropped += 1
+            elif len(self._events) >= self.maxsize:
+                self.overflowed = True
+                self.closed = True
+                self._events.clear()
+                self._cond.notify_all()
+                return False
+            self._events[key] = event
+            self._cond.notify()
+            return True
+
+    def get(self, timeout=None):
+        """Ambil semua event tertunda; list kosong bila timeout"""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._events.values())
+            self._events.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class EventGateway:
+    """Pub/sub in-process untuk stream SSE.
+
+    Event dikirim hanya ke subscription yang berlangganan channel-nya. Perubahan
+    Report.status dan TimelineEvent baru ditangkap lewat event mapper dan
+    dipublikasikan setelah commit; posisi petugas berasal dari location_tracker.
+    Bila EVENTS_REDIS_URL diisi, event juga disebarkan ke proses lain (worker
+    API, CLI detection/monitor) lewat pub/sub Redis.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._subscriptions = defaultdict(set)  # channel -> {Subscription}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._origin = uuid.uuid4().hex
+        self.redis_url = None
+        self._listener_pid = None
+        self._listening = False
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import Report, TimelineEvent
+        from app.services.health import camera_health_monitor
+        from app.services.locations import location_tracker
+
+        self.app = app
+        self.queue_size = app.config.get('EVENTS_QUEUE_SIZE', 100)
+        self.heartbeat = app.config.get('EVENTS_HEARTBEAT', 15)
+
+        self.redis_url = app.config.get('EVENTS_REDIS_URL')
+        if self.redis_url:
+            lazy.register('events_redis', self._connect)
+
+        if not self._listening:
+            event.listen(TimelineEvent, 'after_insert', self._timeline_inserted)
+            event.listen(Report, 'after_update', self._report_updated)
+            event.listen(Session, 'after_commit', self._flush_pending)
+            event.listen(Session, 'after_rollback', self._discard_pending)
+            location_tracker.subscribe(self._position_changed)
+            camera_health_monitor.subscribe(self._camera_changed)
+            self._listening = True
+        app.extensions['event_gateway'] = self
+
+    # Subscribers
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        if self.redis_url:
+            self._start_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscriptions.values() for s in subscribers})
+
+    def stream(self, subscription, check=None):
+        """Generator body respons text/event-stream.
+
+        `check(events)` dipanggil sebelum setiap kiriman; bila False stream
+        ditutup dengan event `forbidden` dan client harus meminta token baru.
+        """
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                events = subscription.get(self.heartbeat)
+                if subscription.overflowed:
+                    self.overflows += 1
+                    yield 'event: overflow\ndata: {}\n\n'
+                    return
+                if subscription.closed:
+                    return
+                if not events:
+                    # Komentar SSE menjaga koneksi tetap hidup melewati proxy
+                    yield ': keepalive\n\n'
+                    continue
+                if check is not None and not check(events):
+                    yield 'event: forbidden\ndata: {}\n\n'
+                    return
+                self.delivered += len(events)
+                yield ''.join(e.encode() for e in events)
+        finally:
+            self.unsubscribe(subscription)
+
+    # Publishers
+
+    def publish(self, channel, event_type, data, key=None, broadcast=True):
+        self._deliver(Event(channel, event_type, data, key))
+        if broadcast and self.redis_url:
+            try:
+                lazy.get('events_redis').publish(EVENTS_CHANNEL, json.dumps(
+                    {'origin': self._origin, 'channel': channel, 'type': event_type, 'data': data, 'key': key},
+                    default=str,
+                ))
+            except Exception:
+                log.exception('Redis publish failed for %s', channel)
+
+    def _deliver(self, event):
+        self.published += 1
+        with self._lock:
+            subscribers = list(self._subscriptions.get(event.channel, ()))
+        if not subscribers:
+            return 0
+        event.id = next(self._ids)
+        return sum(subscription.put(event) for subscription in subscribers)
+
+    def _connect(self):
+        import redis
+
+        return redis.Redis.from_url(self.redis_url)
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name='event-gateway', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = lazy.get('events_redis').pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(EVENTS_CHANNEL)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    if payload.pop('origin') == self._origin:
+                        continue
+                    self._deliver(Event(**payload))
+            except Exception:
+                log.exception('Event listener disconnected')
+                time.sleep(1)
+
+    # Sources
+
+    def _pending(self, target):
+        session = Session.object_session(target)
+        if session is None:
+            return None
+        return session.info.setdefault('gateway_events', [])
+
+    def _timeline_inserted(self, mapper, connection, target):
+        pending = self._pending(target)
+        if pending is not None:
+            pending.append((f'report:{target.report_id}', 'timeline', {
+                'id': target.id,
+                'report_id': target.report_id,
+                'event_type': target.event_type,
+                'event_data': target.event_data,
+                'created_by': target.created_by,
+                'created_at': target.created_at.isoformat() if target.created_at else None,
+            }, None))
+
+    def _report_updated(self, mapper, connection, target):
+        history = inspect(target).attrs.status.history
+        if not history.has_changes():
+            return
+        pending = self._pending(target)
+        if pending is None:
+            return
+        data = {
+            'report_id': target.id,
+            'status': target.status.value,
+            'previous_status': history.deleted[0].value if history.deleted else None,
+            'updated_at': target.updated_at.isoformat() if target.updated_at else None,
+        }
+        pending.append((f'report:{target.id}', 'report_status', data, None))
+        # Reporter (owner kamera untuk laporan otomatis) menerima semua perubahan status laporannya
+        pending.append((f'user:{target.reporter_id}', 'report_status', data, None))
+
+    def _flush_pending(self, session):
+        for channel, event_type, data, key in session.info.pop('gateway_events', ()):
+            self.publish(channel, event_type, data, key)
+
+    def _discard_pending(self, session):
+        session.info.pop('gateway_events', None)
+
+    def _position_changed(self, position):
+        # Setiap proses menerima posisi lewat location_tracker (refresh dari database),
+        # jadi tidak perlu disebarkan lewat Redis
+        data = position.to_dict()
+        key = f'location:{position.user_id}'
+        self.publish('officers', 'location', data, key=key, broadcast=False)
+        self.publish(f'officer:{position.user_id}', 'location', data, key=key, broadcast=False)
+
+    def _camera_changed(self, transition):
+        self.publish(f'user:{transition.owner_id}', 'camera_status', transition.to_dict())
+
+
+event_gateway = EventGateway()
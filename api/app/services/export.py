@@ -0,0 +1,320 @@
+"""Export laporan dan rollup dashboard dalam bentuk CSV atau Parquet secara streaming.
+
+Baris dibaca dengan server-side cursor (`yield_per`) per batch, data terkait
+(evidence, assignment, timeline) diambil dengan satu query IN per batch, lalu
+setiap batch langsung ditulis sebagai chunk CSV atau row group Parquet. Memori
+yang dipakai sebanding dengan ukuran batch, bukan jumlah baris yang diexport.
+"""
+import csv
+import enum
+import io
+from collections import defaultdict
+from datetime import datetime
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+
+from app import db
+from app.models import (
+    Assignment, AssignmentHourlyStat, Camera, Evidence, Report, ReportHourlyStat, TimelineEvent, User,
+)
+from app.services.report_feed import apply_filters
+from app.utils.database import replica_reads
+
+DEFAULT_BATCH_SIZE = 2000
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# (nama kolom, tipe) — tipe dipetakan ke tipe Arrow saat menulis Parquet
+REPORT_COLUMNS = (
+    ('id', 'string'),
+    ('created_at', 'timestamp'),
+    ('updated_at', 'timestamp'),
+    ('title', 'string'),
+    ('status', 'string'),
+    ('priority', 'string'),
+    ('is_automatic', 'bool'),
+    ('weapon_type', 'string'),
+    ('detection_confidence', 'float'),
+    ('detection_image_url', 'string'),
+    ('camera_id', 'string'),
+    ('camera_name', 'string'),
+    ('camera_location', 'string'),
+    ('latitude', 'float'),
+    ('longitude', 'float'),
+    ('reporter_id', 'string'),
+    ('reporter_name', 'string'),
+    ('evidence_count', 'int'),
+    ('evidence_urls', 'string'),
+    ('assignment_count', 'int'),
+    ('officer_ids', 'string'),
+    ('assignment_status', 'string'),
+    ('response_time', 'int'),
+    ('timeline_count', 'int'),
+    ('last_event_type', 'string'),
+    ('last_event_at', 'timestamp'),
+)
+
+DATASET_COLUMNS = {
+    'report_hourly': (
+        ('bucket_start', 'timestamp'),
+        ('status', 'string'),
+        ('priority', 'string'),
+        ('is_automatic', 'bool'),
+        ('count', 'int'),
+    ),
+    'officer_hourly': (
+        ('bucket_start', 'timestamp'),
+        ('officer_id', 'string'),
+        ('officer_name', 'string'),
+        ('assigned', 'int'),
+        ('completed', 'int'),
+        ('rejected', 'int'),
+        ('response_time_total', 'int'),
+        ('response_time_count', 'int'),
+    ),
+}
+
+# Pemisah untuk kolom multi-nilai (evidence_urls, officer_ids)
+LIST_SEPARATOR = ' '
+
+# Awalan yang membuat Excel/LibreOffice/Sheets membaca sel sebagai formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+def _batch_size(batch_size=None):
+    return batch_size or current_app.config.get('EXPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def _plain(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _stream(stmt, batch_size):
+    """Baris hasil select() sebagai list of dict per batch lewat server-side cursor"""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.mappings().partitions():
+            yield [{key: _plain(value) for key, value in row.items()} for row in partition]
+    finally:
+        result.close()
+
+
+def _attach_related(rows):
+    """Lengkapi satu batch laporan dengan ringkasan evidence, assignment dan timeline.
+
+    Tiga query per batch, bukan tiga query per laporan seperti relationship
+    dynamic di Report. Timeline dibatasi created_at >= laporan tertua di batch
+    agar PostgreSQL hanya memindai partisi yang relevan.
+    """
+    by_id = {}
+    for row in rows:
+        row.update(evidence_count=0, evidence_urls=None, assignment_count=0, officer_ids=None,
+                   assignment_status=None, response_time=None, timeline_count=0, last_event_type=None,
+                   last_event_at=None)
+        by_id[row['id']] = row
+    if not by_id:
+        return rows
+    ids = list(by_id)
+
+    urls = defaultdict(list)
+    for report_id, file_url in db.session.execute(
+        select(Evidence.report_id, Evidence.file_url)
+        .where(Evidence.report_id.in_(ids))
+        .order_by(Evidence.report_id, Evidence.created_at)
+    ):
+        urls[report_id].append(file_url)
+    for report_id, values in urls.items():
+        by_id[report_id]['evidence_count'] = len(values)
+        by_id[report_id]['evidence_urls'] = LIST_SEPARATOR.join(url for url in values if url) or None
+
+    officers = defaultdict(list)
+    for report_id, officer_id, status, response_time in db.session.execute(
+        select(Assignment.report_id, Assignment.officer_id, Assignment.status, Assignment.response_time)
+        .where(Assignment.report_id.in_(ids))
+        .order_by(Assignment.report_id, Assignment.created_at)
+    ):
+        officers[report_id].append(officer_id)
+        row = by_id[report_id]
+        # Assignment terakhir menentukan status dan waktu respons
+        row['assignment_status'] = _plain(status)
+        row['response_time'] = response_time
+    for report_id, values in officers.items():
+        by_id[report_id]['assignment_count'] = len(values)
+        by_id[report_id]['officer_ids'] = LIST_SEPARATOR.join(dict.fromkeys(values))
+
+    oldest = min(row['created_at'] for row in rows)
+    for report_id, event_type, created_at in db.session.execute(
+        select(TimelineEvent.report_id, TimelineEvent.event_type, TimelineEvent.created_at)
+        .where(TimelineEvent.report_id.in_(ids), TimelineEvent.created_at >= oldest)
+        .order_by(TimelineEvent.report_id, TimelineEvent.created_at)
+    ):
+        row = by_id[report_id]
+        row['timeline_count'] += 1
+        row['last_event_type'] = event_type
+        row['last_event_at'] = created_at
+    return rows
+
+
+def report_batches(filters=None, batch_size=None, limit=None):
+    """Batch baris export laporan (satu dict datar per laporan) dengan filter yang sama seperti feed"""
+    stmt = (
+        select(
+            Report.id, Report.created_at, Report.updated_at, Report.title, Report.status, Report.priority,
+            Report.is_automatic, Report.weapon_type, Report.detection_confidence, Report.detection_image_url,
+            Report.camera_id, Camera.name.label('camera_name'), Camera.location.label('camera_location'),
+            Camera.latitude, Camera.longitude, Report.reporter_id, User.name.label('reporter_name'),
+        )
+        .join(Camera, Report.camera_id == Camera.id)
+        .join(User, Report.reporter_id == User.id)
+    )
+    stmt = apply_filters(stmt, **(filters or {})).order_by(Report.created_at.desc(), Report.id.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    for rows in _stream(stmt, _batch_size(batch_size)):
+        yield _attach_related(rows)
+
+
+def dataset_batches(dataset, start, end, batch_size=None):
+    """Batch rollup dashboard per jam dalam rentang [start, end)"""
+    if dataset == 'report_hourly':
+        stmt = (
+            select(ReportHourlyStat.bucket_start, ReportHourlyStat.status, ReportHourlyStat.priority,
+                   ReportHourlyStat.is_automatic, ReportHourlyStat.count)
+            .where(ReportHourlyStat.bucket_start >= start, ReportHourlyStat.bucket_start < end)
+            .order_by(ReportHourlyStat.bucket_start)
+        )
+    elif dataset == 'officer_hourly':
+        stmt = (
+            select(AssignmentHourlyStat.bucket_start, AssignmentHourlyStat.officer_id,
+                   User.name.label('officer_name'), AssignmentHourlyStat.assigned, AssignmentHourlyStat.completed,
+                   AssignmentHourlyStat.rejected, AssignmentHourlyStat.response_time_total,
+                   AssignmentHourlyStat.response_time_count)
+            .join(User, AssignmentHourlyStat.officer_id == User.id)
+            .where(AssignmentHourlyStat.bucket_start >= start, AssignmentHourlyStat.bucket_start < end)
+            .order_by(AssignmentHourlyStat.bucket_start, AssignmentHourlyStat.officer_id)
+        )
+    else:
+        raise ValueError(f'Unknown dataset: {dataset}')
+    return _stream(stmt, _batch_size(batch_size))
+
+
+def _csv_cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Judul/deskripsi diisi pengguna; "=HYPERLINK(...)" tidak boleh dieksekusi spreadsheet
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(batches, columns):
+    """Header lalu satu chunk bytes per batch"""
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    yield buffer.getvalue().encode()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([_csv_cell(row.get(name)) for name in names])
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """File tujuan ParquetWriter yang menampung bytes sampai diambil oleh drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def require_parquet():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportUnavailable('Parquet export requires pyarrow')
+
+
+def parquet_chunks(batches, columns):
+    """Satu row group Parquet per batch; footer ditulis setelah batch terakhir"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'string': pa.string(), 'timestamp': pa.timestamp('us'), 'float': pa.float64(),
+             'bool': pa.bool_(), 'int': pa.int64()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(batches, columns, fmt):
+    if fmt == 'csv':
+        return csv_chunks(batches, columns)
+    if fmt == 'parquet':
+        # Dicek di sini, bukan di generator, agar error muncul sebelum response mulai dikirim
+        require_parquet()
+        return parquet_chunks(batches, columns)
+    raise ValueError(f'Unknown export format: {fmt}')
+
+
+def export_filename(name, fmt, now=None):
+    return f'{name}-{(now or datetime.utcnow()):%Y%m%d-%H%M%S}.{FORMATS[fmt][1]}'
+
+
+def export_response(chunks, fmt, name):
+    """Response HTTP streaming; query berjalan saat chunk dikirim, dari replica bila ada"""
+    def generate():
+        with replica_reads():
+            yield from chunks
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=FORMATS[fmt][0],
+        headers={'Content-Disposition': f'attachment; filename="{export_filename(name, fmt)}"'},
+    )
+
+
+def export_to_file(chunks, fileobj):
+    """Tulis chunk ke file terbuka, kembalikan jumlah bytes"""
+    written = 0
+    for chunk in chunks:
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
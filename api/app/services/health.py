@@ -0,0 +1,423 @@
+import asyncio
+import heapq
+import logging
+import random
+import ssl
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from urllib.parse import urlsplit
+
+log = logging.getLogger('tangkapin.health')
+
+DEFAULT_PORTS = {'rtsp': 554, 'rtsps': 322, 'http': 80, 'https': 443, 'rtmp': 1935}
+
+
+@dataclass
+class ProbeTarget:
+    camera_id: str
+    owner_id: str
+    name: str
+    stream_url: str
+    cctv_ip: str = None
+    online: bool = False
+    failures: int = 0
+    last_seen: datetime = None
+
+    @property
+    def endpoint(self):
+        """(scheme, host, port) yang di-probe; cctv_ip dipakai bila stream_url tidak punya host"""
+        parts = urlsplit(self.stream_url or '')
+        scheme = parts.scheme.lower()
+        host = parts.hostname
+        port = parts.port
+        if not host and self.cctv_ip:
+            host, _, explicit_port = self.cctv_ip.partition(':')
+            port = int(explicit_port) if explicit_port else None
+        return scheme, host, port or DEFAULT_PORTS.get(scheme, 554)
+
+
+@dataclass
+class StatusTransition:
+    camera_id: str
+    owner_id: str
+    name: str
+    online: bool
+    seen_at: datetime
+    changed_at: datetime
+
+    def to_dict(self):
+        return {
+            'camera_id': self.camera_id,
+            'name': self.name,
+            'status': 'online' if self.online else 'offline',
+            'last_online': self.seen_at.isoformat() if self.seen_at else None,
+            'changed_at': self.changed_at.isoformat(),
+        }
+
+
+class CameraHealthMonitor:
+    """Memeriksa ketersediaan stream kamera secara konkuren di event loop asyncio.
+
+    Setiap kamera dijadwalkan ulang dengan jitter agar probe tersebar merata dan
+    tidak menumpuk di awal interval. Probe dibatasi secara global
+    (HEALTH_CHECK_CONCURRENCY) dan per host (HEALTH_CHECK_PER_HOST), karena satu
+    NVR sering melayani banyak kamera. Hanya perubahan status yang ditulis ke
+    database, dikumpulkan menjadi satu UPDATE executemany per flush.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.targets = {}
+        self._listeners = []
+        self._pending = {}
+        # flush() yang gagal mengembalikan transisi dari thread executor
+        self._pending_lock = threading.Lock()
+        self._schedule = []
+        self._client = None
+        self._ssl = None
+        self._slots = None
+        self._host_slots = {}
+        self._stop = threading.Event()
+        self._latencies = deque(maxlen=10000)
+        self.probes = 0
+        self.probe_failures = 0
+        self.transitions = 0
+        self.started_at = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.configure(app.config)
+        app.extensions['camera_health_monitor'] = self
+
+    def configure(self, config):
+        self.interval = config.get('HEALTH_CHECK_INTERVAL', 30)
+        self.jitter = config.get('HEALTH_CHECK_JITTER', 0.2)
+        self.timeout = config.get('HEALTH_CHECK_TIMEOUT', 3.0)
+        self.concurrency = config.get('HEALTH_CHECK_CONCURRENCY', 256)
+        self.per_host = config.get('HEALTH_CHECK_PER_HOST', 4)
+        self.failure_threshold = config.get('HEALTH_CHECK_FAILURES', 2)
+        self.flush_interval = config.get('HEALTH_CHECK_FLUSH_INTERVAL', 1.0)
+        self.refresh_interval = config.get('HEALTH_CHECK_REFRESH_INTERVAL', 60)
+
+    def subscribe(self, callback):
+        """callback(transition) dipanggil setelah perubahan status tersimpan"""
+        self._listeners.append(callback)
+
+    # Probing
+
+    async def open(self):
+        import httpx
+
+        self._slots = asyncio.Semaphore(self.concurrency)
+        # Kamera/NVR umumnya memakai sertifikat self-signed
+        self._ssl = ssl.create_default_context()
+        self._ssl.check_hostname = False
+        self._ssl.verify_mode = ssl.CERT_NONE
+        self._host_slots = {}
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            verify=self._ssl,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=0),
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_slot(self, host):
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def probe(self, target):
+        """True bila endpoint kamera menjawab dalam HEALTH_CHECK_TIMEOUT"""
+        scheme, host, port = target.endpoint
+        if not host:
+            return False
+        started = time.perf_counter()
+        ok = False
+        try:
+            async with self._host_slot(host):
+                if scheme in ('http', 'https'):
+                    ok = await self._probe_http(target.stream_url)
+                elif scheme in ('rtsp', 'rtsps'):
+                    ok = await asyncio.wait_for(
+                        self._probe_rtsp(host, port, target.stream_url, tls=scheme == 'rtsps'), self.timeout
+                    )
+                else:
+                    ok = await asyncio.wait_for(self._probe_tcp(host, port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            log.debug('Probe %s (%s:%s) failed: %r', target.camera_id, host, port, e)
+        except Exception as e:
+            log.debug('Probe %s failed: %r', target.camera_id, e)
+        self.probes += 1
+        if not ok:
+            self.probe_failures += 1
+        self._latencies.append(time.perf_counter() - started)
+        return ok
+
+    async def _probe_http(self, url):
+        # Stream MJPEG tidak pernah selesai; cukup baca header lalu tutup
+        async with self._client.stream('GET', url) as response:
+            # 401/403 tetap berarti kamera hidup
+            return response.status_code < 500
+
+    async def _probe_rtsp(self, host, port, url, tls=False):
+        reader, writer = await asyncio.open_connection(host, port, ssl=self._ssl if tls else None)
+        try:
+            writer.write(f'OPTIONS {url} RTSP/1.0\r\nCSeq: 1\r\nUser-Agent: tangkapin-health\r\n\r\n'.encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            return status_line.startswith(b'RTSP/1.0')
+        finally:
+            writer.close()
+
+    async def _probe_tcp(self, host, port):
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        return True
+
+    async def check(self, target):
+        async with self._slots:
+            ok = await self.probe(target)
+        self._record(target, ok)
+        return ok
+
+    async def probe_round(self, targets):
+        """Probe semua target sekali (tanpa penjadwalan); dipakai benchmark"""
+        return await asyncio.gather(*(self.check(target) for target in targets))
+
+    def _record(self, target, ok):
+        now = datetime.utcnow()
+        if ok:
+            target.failures = 0
+            target.last_seen = now
+            if target.online:
+                return
+            target.online = True
+        else:
+            target.failures += 1
+            # Butuh beberapa kegagalan berturut-turut agar satu timeout tidak memicu alert
+            if not target.online or target.failures < self.failure_threshold:
+                return
+            target.online = False
+        self.transitions += 1
+        with self._pending_lock:
+            self._pending[target.camera_id] = StatusTransition(
+                camera_id=target.camera_id,
+                owner_id=target.owner_id,
+                name=target.name,
+                online=target.online,
+                seen_at=target.last_seen,
+                changed_at=now,
+            )
+
+    # Scheduling
+
+    def _next_due(self, now):
+        return now + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _load_targets(self):
+        from app.models import Camera, CameraStatus
+
+        with self.app.app_context():
+            rows = Camera.query.with_entities(
+                Camera.id, Camera.owner_id, Camera.name, Camera.stream_url, Camera.cctv_ip,
+                Camera.status, Camera.last_online,
+            ).filter(
+                Camera.is_active.is_(True),
+                Camera.status != CameraStatus.MAINTENANCE,
+            ).all()
+        return rows
+
+    def sync_targets(self, rows, now):
+        from app.models import CameraStatus
+
+        wanted = set()
+        for camera_id, owner_id, name, stream_url, cctv_ip, status, last_online in rows:
+            wanted.add(camera_id)
+            target = self.targets.get(camera_id)
+            if target is None:
+                self.targets[camera_id] = ProbeTarget(
+                    camera_id, owner_id, name, stream_url, cctv_ip,
+                    online=status == CameraStatus.ONLINE, last_seen=last_online,
+                )
+                # Kamera baru disebar acak di sepanjang satu interval
+                heapq.heappush(self._schedule, (now + random.uniform(0, self.interval), camera_id))
+            else:
+                target.owner_id, target.name = owner_id, name
+                target.stream_url, target.cctv_ip = stream_url, cctv_ip
+        for camera_id in set(self.targets) - wanted:
+            del self.targets[camera_id]
+            with self._pending_lock:
+                self._pending.pop(camera_id, None)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        await self.open()
+        self.started_at = time.monotonic()
+        inflight = set()
+        next_refresh = next_flush = loop.time()
+        try:
+            while not self._stop.is_set():
+                now = loop.time()
+                if now >= next_refresh:
+                    rows = await loop.run_in_executor(None, self._load_targets)
+                    self.sync_targets(rows, now)
+                    next_refresh = now + self.refresh_interval
+                    log.info('Monitoring %d cameras (%s)', len(self.targets), self.stats())
+                if now >= next_flush:
+                    if self._pending:
+                        await loop.run_in_executor(None, self.flush, self._take_pending())
+                    next_flush = now + self.flush_interval
+
+                while self._schedule and self._schedule[0][0] <= now:
+                    _, camera_id = heapq.heappop(self._schedule)
+                    target = self.targets.get(camera_id)
+                    if target is None:
+                        continue
+                    heapq.heappush(self._schedule, (self._next_due(now), camera_id))
+                    await self._slots.acquire()
+                    task = loop.create_task(self._scheduled_check(target))
+                    inflight.add(task)
+                    task.add_done_callback(inflight.discard)
+
+                wake = min(next_refresh, next_flush)
+                if self._schedule:
+                    wake = min(wake, self._schedule[0][0])
+                await asyncio.sleep(max(0.0, min(wake - loop.time(), self.flush_interval)))
+        finally:
+            if inflight:
+                await asyncio.gather(*inflight, return_exceptions=True)
+            await self.close()
+            if self._pending:
+                await loop.run_in_executor(None, self.flush, self._take_pending())
+
+    async def _scheduled_check(self, target):
+        try:
+            ok = await self.probe(target)
+            self._record(target, ok)
+        finally:
+            self._slots.release()
+
+    def run(self):
+        self._stop.clear()
+        asyncio.run(self._run())
+
+    def stop(self):
+        self._stop.set()
+
+    # Persistence and events
+
+    def _take_pending(self):
+        with self._pending_lock:
+            transitions, self._pending = list(self._pending.values()), {}
+        return transitions
+
+    def flush(self, transitions=None):
+        """Tulis perubahan status tertunda dengan satu UPDATE executemany"""
+        from sqlalchemy import bindparam, func, select, update
+        from app import db
+        from app.models import Camera, CameraStatus
+        from app.utils.cache import lookup_cache
+
+        if transitions is None:
+            transitions = self._take_pending()
+        if not transitions:
+            return []
+        table = Camera.__table__
+        try:
+            with self.app.app_context():
+                # Kamera yang di-set MAINTENANCE oleh admin tidak ditimpa dan tidak
+                # memicu notifikasi; baris dikunci agar status tidak berubah sebelum UPDATE
+                writable = set(db.session.execute(
+                    select(table.c.id).where(
+                        table.c.id.in_([t.camera_id for t in transitions]),
+                        table.c.status != CameraStatus.MAINTENANCE,
+                    ).with_for_update()
+                ).scalars())
+                transitions = [t for t in transitions if t.camera_id in writable]
+                if transitions:
+                    db.session.execute(update(table).where(
+                        table.c.id == bindparam('camera_id'),
+                        table.c.status != CameraStatus.MAINTENANCE,
+                    ).values(
+                        status=bindparam('new_status'),
+                        last_online=func.coalesce(bindparam('seen_at'), table.c.last_online),
+                    ), [
+                        {
+                            'camera_id': t.camera_id,
+                            'new_status': CameraStatus.ONLINE if t.online else CameraStatus.OFFLINE,
+                            'seen_at': t.seen_at,
+                        }
+                        for t in transitions
+                    ])
+                db.session.commit()
+        except Exception:
+            log.exception('Failed to persist %d camera status transitions', len(transitions))
+            # Dicoba lagi pada flush berikutnya, kecuali sudah ada transisi yang lebih baru
+            with self._pending_lock:
+                for transition in transitions:
+                    self._pending.setdefault(transition.camera_id, transition)
+            return []
+        if not transitions:
+            return []
+        # UPDATE inti tidak memicu event mapper, jadi cache kamera diinvalidasi manual
+        lookup_cache.invalidate({('cameras', t.owner_id) for t in transitions})
+        log.info('Persisted %d camera status transitions (%d offline)',
+                 len(transitions), sum(not t.online for t in transitions))
+        self._publish(transitions)
+        return transitions
+
+    def _publish(self, transitions):
+        from app.models import NotificationType
+        from app.services.notifications import notification_dispatcher, user_channel
+
+        for transition in transitions:
+            for callback in self._listeners:
+                try:
+                    callback(transition)
+                except Exception:
+                    log.exception('Camera health listener failed')
+            try:
+                if transition.online:
+                    notification_dispatcher.trigger(
+                        [user_channel(transition.owner_id)], 'camera_status', transition.to_dict()
+                    )
+                else:
+                    notification_dispatcher.notify(
+                        [transition.owner_id],
+                        title='Camera offline',
+                        message=f'{transition.name} is not responding',
+                        notification_type=NotificationType.SYSTEM,
+                        reference_id=transition.camera_id,
+                        data=transition.to_dict(),
+                        event='camera_status',
+                    )
+            except Exception:
+                log.exception('Unable to queue status event for camera %s', transition.camera_id)
+
+    def stats(self):
+        values = sorted(self._latencies)
+        elapsed = time.monotonic() - self.started_at if self.started_at else None
+        return {
+            'cameras': len(self.targets),
+            'online': sum(target.online for target in self.targets.values()),
+            'probes': self.probes,
+            'probe_failures': self.probe_failures,
+            'transitions': self.transitions,
+            'probes_per_second': round(self.probes / elapsed, 1) if elapsed else None,
+            'p50_ms': round(values[len(values) // 2] * 1000, 1) if values else None,
+            'p99_ms': round(values[min(len(values) - 1, int(0.99 * len(values)))] * 1000, 1) if values else None,
+        }
+
+
+camera_health_monitor = CameraHealthMonitor()
@@ -0,0 +1,265 @@
+import itertools
+import logging
+import multiprocessing
+import queue
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+
+log = logging.getLogger('tangkapin.inference')
+
+
+class InferenceBusy(Exception):
+    """Semua slot frame sedang dipakai dan antrian penuh"""
+
+
+def _worker_main(model_path, device, slot_names, task_queue, result_queue, batch_size):
+    """Entry point proses inference. Model dimuat sekali per proses.
+
+    Pesan ke result_queue: ('taken', pid, [request_id]) sebelum batch diproses,
+    lalu ('result', request_id, detections, error) per frame. Dengan 'taken'
+    parent tahu request mana yang hilang bila proses ini mati di tengah batch.
+    """
+    import numpy as np
+    from app.services.detection import YoloBackend
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    backend = YoloBackend(model_path, device)
+    backend.load()
+
+    running = True
+    try:
+        while running:
+            task = task_queue.get()
+            if task is None:
+                break
+            tasks = [task]
+            while len(tasks) < batch_size:
+                try:
+                    task = task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if task is None:
+                    running = False
+                    break
+                tasks.append(task)
+
+            result_queue.put(('taken', os.getpid(), [request_id for request_id, *_ in tasks]))
+            images = [
+                np.ndarray(shape, dtype=np.dtype(dtype), buffer=slots[slot_index].buf)
+                for _, slot_index, shape, dtype in tasks
+            ]
+            try:
+                results = backend.predict(images)
+            except Exception as e:
+                for request_id, *_ in tasks:
+                    result_queue.put(('result', request_id, None, repr(e)))
+                continue
+            finally:
+                # View harus dilepas sebelum slot ditutup
+                del images
+            for (request_id, *_), detections in zip(tasks, results):
+                result_queue.put(('result', request_id, detections, None))
+    finally:
+        for slot in slots:
+            slot.close()
+
+
+class InferenceEngine:
+    """Pool proses inference dengan frame dikirim lewat shared memory.
+
+    Proses pemanggil tidak pernah mengimpor torch/ultralytics; frame disalin ke
+    slot shared memory dan hanya metadata kecil yang melewati antrian. Jumlah slot
+    membatasi frame yang sedang diproses sehingga pemanggil tertahan (backpressure)
+    ketika pool penuh.
+
+    Slot dikembalikan saat hasil diterima atau saat request timeout (worker hanya
+    membaca slot, jadi slot aman dipakai ulang walau hasil lama datang belakangan).
+    Thread watchdog menyalakan ulang proses yang mati dan menggagalkan request
+    yang sedang dipegangnya.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._in_flight = {}  # pid -> set(request_id) yang sedang diproses
+        self._ids = itertools.count()
+        self._stopping = threading.Event()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.configure(app.config)
+        app.extensions['inference_engine'] = self
+
+    def configure(self, config):
+        self.model_path = config['ML_MODEL_PATH']
+        self.device = config.get('DETECTION_DEVICE', 'cpu')
+        self.workers = config.get('INFERENCE_WORKERS', 2)
+        self.queue_size = config.get('INFERENCE_QUEUE_SIZE', 32)
+        self.max_frame_bytes = config.get('INFERENCE_MAX_FRAME_BYTES', 1920 * 1080 * 3)
+        self.batch_size = config.get('DETECTION_BATCH_SIZE', 8)
+        self.timeout = config.get('INFERENCE_TIMEOUT', 10)
+        self.restart_backoff = config.get('INFERENCE_RESTART_BACKOFF', 5)
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            # spawn: proses anak tidak mewarisi thread/koneksi DB dari parent
+            ctx = multiprocessing.get_context('spawn')
+            self._slots = [
+                shared_memory.SharedMemory(create=True, size=self.max_frame_bytes)
+                for _ in range(self.queue_size)
+            ]
+            self._free_slots = queue.Queue()
+            for index in range(self.queue_size):
+                self._free_slots.put(index)
+            self._tasks = ctx.Queue()
+            self._results = ctx.Queue()
+            self._ctx = ctx
+            self._stopping.clear()
+            self._processes = [self._spawn(i) for i in range(self.workers)]
+            self._router = threading.Thread(target=self._route_results, name='inference-router', daemon=True)
+            self._router.start()
+            self._watchdog = threading.Thread(target=self._watch_workers, name='inference-watchdog', daemon=True)
+            self._watchdog.start()
+            self._started = True
+            log.info('Inference engine started: %d workers, %d frame slots', self.workers, self.queue_size)
+
+    def _spawn(self, index):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.model_path, self.device, [s.name for s in self._slots],
+                  self._tasks, self._results, self.batch_size),
+            name=f'inference-{index}',
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _watch_workers(self):
+        restarted_at = {}
+        while not self._stopping.wait(1.0):
+            for index, process in enumerate(self._processes):
+                if process.is_alive() or self._stopping.is_set():
+                    continue
+                # Request yang sudah diambil proses ini tidak akan pernah dijawab
+                with self._pending_lock:
+                    lost = self._in_flight.pop(process.pid, set())
+                for request_id in lost:
+                    self._finish(request_id, error=f'inference worker exited with code {process.exitcode}')
+                # Model yang gagal dimuat membuat proses langsung mati; jangan restart terus-menerus
+                if time.monotonic() - restarted_at.get(index, 0) < self.restart_backoff:
+                    continue
+                log.error('Inference worker %s exited with code %s, restarting (%d requests failed)',
+                          process.name, process.exitcode, len(lost))
+                restarted_at[index] = time.monotonic()
+                self._processes[index] = self._spawn(index)
+
+    def _finish(self, request_id, detections=None, error=None):
+        """Lepas slot dan selesaikan future milik request_id (bila masih menunggu)"""
+        with self._pending_lock:
+            slot_index, future = self._pending.pop(request_id, (None, None))
+            for requests in self._in_flight.values():
+                requests.discard(request_id)
+        if slot_index is not None:
+            self._free_slots.put(slot_index)
+        if future is None or future.done():
+            return
+        if error:
+            future.set_exception(RuntimeError(f'Inference failed: {error}'))
+        else:
+            future.set_result(detections)
+
+    def _route_results(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            if message[0] == 'taken':
+                _, pid, request_ids = message
+                with self._pending_lock:
+                    self._in_flight.setdefault(pid, set()).update(
+                        request_id for request_id in request_ids if request_id in self._pending
+                    )
+                continue
+            _, request_id, detections, error = message
+            self._finish(request_id, detections, error)
+
+    def submit(self, image, timeout=None):
+        """Kirim satu frame, mengembalikan Future berisi list Detection"""
+        import numpy as np
+
+        self.start()
+        if image.nbytes > self.max_frame_bytes:
+            raise ValueError(f'Frame of {image.nbytes} bytes exceeds INFERENCE_MAX_FRAME_BYTES')
+        try:
+            slot_index = self._free_slots.get(timeout=self.timeout if timeout is None else timeout)
+        except queue.Empty:
+            raise InferenceBusy('Inference queue is full')
+
+        view = np.ndarray(image.shape, dtype=image.dtype, buffer=self._slots[slot_index].buf)
+        view[...] = image
+        del view
+
+        request_id = next(self._ids)
+        future = Future()
+        future.request_id = request_id
+        with self._pending_lock:
+            self._pending[request_id] = (slot_index, future)
+        self._tasks.put((request_id, slot_index, image.shape, image.dtype.str))
+        return future
+
+    def predict(self, images):
+        """Interface yang sama dengan YoloBackend.predict"""
+        futures = [self.submit(image) for image in images]
+        deadline = time.monotonic() + self.timeout
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(max(0, deadline - time.monotonic())))
+            except FutureTimeout:
+                # Slot dikembalikan agar timeout berulang tidak menghabiskan pool
+                for pending in futures:
+                    self._finish(pending.request_id, error='timed out')
+                raise
+        return results
+
+    def load(self):
+        self.start()
+
+    def stop(self):
+        with self._start_lock:
+            if not self._started:
+                return
+            self._stopping.set()
+            self._watchdog.join(5)
+            for _ in self._processes:
+                self._tasks.put(None)
+            for process in self._processes:
+                process.join(10)
+                if process.is_alive():
+                    process.terminate()
+            self._results.put(None)
+            self._router.join(5)
+            with self._pending_lock:
+                for _, future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(RuntimeError('Inference engine stopped'))
+                self._pending.clear()
+                self._in_flight.clear()
+            for slot in self._slots:
+                slot.close()
+                slot.unlink()
+            self._started = False
+
+
+inference_engine = InferenceEngine()
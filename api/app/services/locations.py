@@ -0,0 +1,277 @@
+import atexit
+import csv
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from app.utils.ids import uuid7, uuid7_floor
+
+log = logging.getLogger('tangkapin.locations')
+
+LOCATION_COLUMNS = ('id', 'user_id', 'latitude', 'longitude', 'accuracy', 'is_active', 'created_at')
+
+
+@dataclass
+class OfficerPosition:
+    user_id: str
+    latitude: float
+    longitude: float
+    accuracy: float
+    recorded_at: datetime
+    is_active: bool = True
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'accuracy': self.accuracy,
+            'recorded_at': self.recorded_at.isoformat(),
+            'is_active': self.is_active,
+        }
+
+
+class LocationTracker:
+    """Ingestion GPS petugas dengan write-behind buffer dan posisi terakhir di memori.
+
+    Ping tidak langsung di-INSERT; ping dikumpulkan lalu ditulis sekaligus (COPY di
+    PostgreSQL, executemany di database lain) oleh thread flusher. Peta membaca dari
+    tabel posisi terakhir di memori, yang juga diperbarui secara inkremental dari
+    database agar ping yang diterima worker gunicorn lain ikut terlihat. Sinkronisasi
+    memakai id UUIDv7 (dibuat server saat ping diterima) sebagai watermark, bukan
+    waktu dari perangkat, jadi hanya ping beberapa detik terakhir yang dibaca.
+    Filter created_at (dengan toleransi LOCATION_CLOCK_SKEW untuk jam perangkat
+    yang tertinggal) ikut dipasang agar PostgreSQL hanya memindai partisi terbaru
+    dan baris lama ber-id UUIDv4, yang urutan string-nya acak, tidak ikut terbaca.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._latest = {}
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._synced_at = None
+        self.pings_received = 0
+        self.rows_written = 0
+        self.flushes = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_size = app.config.get('LOCATION_FLUSH_SIZE', 500)
+        self.flush_interval = app.config.get('LOCATION_FLUSH_INTERVAL', 1.0)
+        self.refresh_interval = app.config.get('LOCATION_REFRESH_INTERVAL', 2.0)
+        self.stale_after = app.config.get('LOCATION_STALE_AFTER', 3600)
+        # Ping dari worker lain baru terlihat setelah di-flush; overlap menutup jeda tersebut
+        self.refresh_margin = app.config.get('LOCATION_REFRESH_MARGIN', 30)
+        self.clock_skew = app.config.get('LOCATION_CLOCK_SKEW', 300)
+        app.extensions['location_tracker'] = self
+
+    def subscribe(self, callback):
+        """callback(position) dipanggil setiap posisi terakhir petugas berubah"""
+        self._listeners.append(callback)
+
+    def _publish(self, position):
+        for callback in self._listeners:
+            try:
+                callback(position)
+            except Exception:
+                log.exception('Location listener failed')
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='location-flusher', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        self.refresh_latest()
+        last_refresh = time.time()
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.time() - last_refresh >= self.refresh_interval:
+                    self.refresh_latest()
+                    last_refresh = time.time()
+            except Exception:
+                log.exception('Location flush failed')
+
+    def ingest(self, user_id, pings):
+        """Terima batch ping dari satu petugas. Mengembalikan jumlah ping yang diterima."""
+        self.start()
+        rows = []
+        with self._lock:
+            current = self._latest.get(user_id)
+            is_active = current.is_active if current else True
+            newest = None
+            for ping in sorted(pings, key=lambda p: p['recorded_at']):
+                rows.append({
+                    'id': uuid7(),
+                    'user_id': user_id,
+                    'latitude': ping['latitude'],
+                    'longitude': ping['longitude'],
+                    'accuracy': ping.get('accuracy'),
+                    'is_active': is_active,
+                    'created_at': ping['recorded_at'],
+                })
+                newest = ping
+            self._buffer.extend(rows)
+            self.pings_received += len(rows)
+            position = None
+            if newest and (current is None or newest['recorded_at'] >= current.recorded_at):
+                position = OfficerPosition(
+                    user_id, newest['latitude'], newest['longitude'], newest.get('accuracy'),
+                    newest['recorded_at'], is_active,
+                )
+                self._latest[user_id] = position
+            if len(self._buffer) >= self.flush_size:
+                self._wakeup.set()
+        if position:
+            self._publish(position)
+        return len(rows)
+
+    def set_active(self, user_id, is_active):
+        """Ubah status bertugas petugas tanpa UPDATE ke riwayat lokasi.
+
+        Status ditulis sebagai ping baru di posisi terakhir sehingga worker lain
+        ikut melihatnya pada sinkronisasi berikutnya.
+        """
+        with self._lock:
+            current = self._latest.get(user_id)
+            if current is None:
+                return None
+            position = OfficerPosition(
+                user_id, current.latitude, current.longitude, current.accuracy,
+                max(datetime.utcnow(), current.recorded_at), is_active,
+            )
+            self._latest[user_id] = position
+            self._buffer.append({
+                'id': uuid7(),
+                'user_id': user_id,
+                'latitude': position.latitude,
+                'longitude': position.longitude,
+                'accuracy': position.accuracy,
+                'is_active': is_active,
+                'created_at': position.recorded_at,
+            })
+            self._wakeup.set()
+        self.start()
+        self._publish(position)
+        return position
+
+    def latest(self, user_id):
+        return self._latest.get(user_id)
+
+    def positions(self, active_only=True):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        with self._lock:
+            return [
+                p for p in self._latest.values()
+                if p.recorded_at >= cutoff and (p.is_active or not active_only)
+            ]
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception:
+                # Kembalikan ke buffer agar dicoba lagi pada flush berikutnya
+                with self._lock:
+                    self._buffer[:0] = rows
+                raise
+            self.rows_written += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+    def _write(self, rows):
+        from sqlalchemy import insert
+        from app import db
+        from app.models import Location
+
+        with self.app.app_context():
+            if db.engine.dialect.name == 'postgresql':
+                self._copy(db.engine, rows)
+            else:
+                db.session.execute(insert(Location), rows)
+                db.session.commit()
+
+    def _copy(self, engine, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                '' if row[column] is None else row[column]
+                for column in LOCATION_COLUMNS
+            ])
+        buffer.seek(0)
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY locations ({', '.join(LOCATION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def refresh_latest(self):
+        """Muat ping yang ditulis sejak sinkronisasi terakhir dan perbarui posisi terbaru"""
+        from app import db
+        from app.models import Location
+
+        started = time.time()
+        if self._synced_at is None:
+            since = started - self.stale_after
+        else:
+            since = self._synced_at - self.refresh_margin
+        with self.app.app_context():
+            rows = db.session.query(
+                Location.user_id, Location.latitude, Location.longitude, Location.accuracy,
+                Location.created_at, Location.is_active,
+            ).filter(
+                Location.created_at >= datetime.utcfromtimestamp(since - self.clock_skew),
+                Location.id >= uuid7_floor(since),
+            ).all()
+            db.session.remove()
+
+        newest = {}
+        for row in rows:
+            if row.user_id not in newest or row.created_at > newest[row.user_id].created_at:
+                newest[row.user_id] = row
+
+        changed = []
+        with self._lock:
+            for row in newest.values():
+                current = self._latest.get(row.user_id)
+                if current is not None and current.recorded_at >= row.created_at:
+                    continue
+                position = OfficerPosition(
+                    row.user_id, row.latitude, row.longitude, row.accuracy, row.created_at, row.is_active,
+                )
+                self._latest[row.user_id] = position
+                changed.append(position)
+            # Watermark selalu maju, walau tidak ada ping yang lebih baru dari posisi lokal
+            self._synced_at = started
+        for position in changed:
+            self._publish(position)
+        return len(changed)
+
+location_tracker = LocationTracker()
@@ -0,0 +1,300 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+log = logging.getLogger('tangkapin.notifications')
+
+PUSHER_MAX_BATCH_EVENTS = 10
+PUSHER_MAX_CHANNELS = 100
+
+
+class NotificationQueueFull(Exception):
+    """Antrian notifikasi penuh (NOTIFICATION_QUEUE_SIZE)"""
+
+
+@dataclass
+class PushMessage:
+    channels: list
+    event: str
+    data: dict
+    # Baris Notification yang ikut disimpan (opsional)
+    user_ids: list = field(default_factory=list)
+    title: str = None
+    message: str = None
+    notification_type: object = None
+    reference_id: str = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def user_channel(user_id):
+    return f'user-{user_id}'
+
+
+class NotificationDispatcher:
+    """Mengirim notifikasi dari event loop asyncio di thread terpisah.
+
+    Thread request hanya memasukkan pesan ke antrian terbatas. Consumer
+    mengumpulkan beberapa pesan sekaligus, menyimpan baris Notification dengan
+    satu bulk insert, lalu mengirim ke Pusher lewat batch_events/multi-channel
+    trigger memakai satu HTTP client yang di-pool. Kegagalan HTTP di-retry dengan
+    exponential backoff sampai NOTIFICATION_RETRY_ATTEMPTS.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._client = None
+        self._start_lock = threading.Lock()
+        self._latencies = deque(maxlen=10000)
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.persist_failed = 0
+        self.http_calls = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.configure(app.config)
+        app.extensions['notification_dispatcher'] = self
+
+    def configure(self, config):
+        self.app_id = config.get('PUSHER_APP_ID')
+        self.key = config.get('PUSHER_KEY')
+        self.secret = config.get('PUSHER_SECRET')
+        self.host = config.get('PUSHER_HOST') or f"https://api-{config.get('PUSHER_CLUSTER')}.pusher.com"
+        self.queue_size = config.get('NOTIFICATION_QUEUE_SIZE', 1000)
+        self.retry_attempts = config.get('NOTIFICATION_RETRY_ATTEMPTS', 3)
+        self.retry_backoff = config.get('NOTIFICATION_RETRY_BACKOFF', 0.5)
+        self.batch_size = config.get('NOTIFICATION_BATCH_SIZE', 50)
+        self.batch_timeout = config.get('NOTIFICATION_BATCH_TIMEOUT', 0.02)
+        self.concurrency = config.get('NOTIFICATION_CONCURRENCY', 8)
+        self.http_timeout = config.get('NOTIFICATION_HTTP_TIMEOUT', 5)
+        self.persist = config.get('NOTIFICATION_PERSIST', True)
+
+    # Producer side (dipanggil dari thread mana saja)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), name='notification-dispatcher', daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def enqueue(self, message, timeout=1.0):
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._put(message), self._loop)
+        future.result(timeout)
+
+    def notify(self, user_ids, title, message, notification_type, reference_id=None, data=None, event='notification'):
+        """Simpan Notification untuk setiap user dan push ke channel masing-masing"""
+        payload = {'title': title, 'message': message, 'reference_id': reference_id}
+        payload.update(data or {})
+        self.enqueue(PushMessage(
+            channels=[user_channel(user_id) for user_id in user_ids],
+            event=event,
+            data=payload,
+            user_ids=list(user_ids),
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            reference_id=reference_id,
+        ))
+
+    def trigger(self, channels, event, data):
+        """Push event tanpa menyimpan baris Notification"""
+        self.enqueue(PushMessage(channels=list(channels), event=event, data=data))
+
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def latency_percentiles(self):
+        values = sorted(self._latencies)
+        if not values:
+            return {'p50': None, 'p99': None, 'count': 0}
+        p50, p99 = (values[min(len(values) - 1, int(pct / 100.0 * len(values)))] for pct in (50, 99))
+        return {'p50': p50, 'p99': p99, 'count': len(values)}
+
+    def stop(self, timeout=10):
+        with self._start_lock:
+            if self._thread is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Event loop side
+
+    def _run_loop(self, ready):
+        import httpx
+
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=self.http_timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        self._inflight = set()
+        self._consumer = self._loop.create_task(self._consume())
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            raise NotificationQueueFull(f'Notification queue is full ({self.queue_size})')
+
+    async def _consume(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.batch_timeout
+            while len(batch) < self.batch_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._semaphore.acquire()
+            task = self._loop.create_task(self._deliver(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _shutdown(self):
+        # Beri kesempatan consumer menyerahkan batch yang sedang dikumpulkan
+        await asyncio.sleep(self.batch_timeout * 2)
+        while not self._queue.empty() or self._inflight:
+            await asyncio.sleep(0.05)
+        self._consumer.cancel()
+        await self._client.aclose()
+
+    async def _deliver(self, batch):
+        try:
+            if self.persist:
+                rows = self._notification_rows(batch)
+                if rows:
+                    try:
+                        await self._loop.run_in_executor(None, self._persist_rows, rows)
+                    except Exception:
+                        # Riwayat notifikasi hilang, tapi alert real-time tetap harus sampai
+                        self.persist_failed += len(rows)
+                        log.exception('Failed to persist %d notifications; sending push anyway', len(rows))
+
+            calls = self._pusher_calls(batch)
+            results = await asyncio.gather(*(self._post_with_retry(path, body) for path, body, _ in calls))
+            now = time.monotonic()
+            failed_messages = set()
+            for ok, (_, _, messages) in zip(results, calls):
+                if not ok:
+                    failed_messages.update(id(m) for m in messages)
+            for message in batch:
+                if id(message) in failed_messages:
+                    self.failed += 1
+                else:
+                    self.delivered += 1
+                    self._latencies.append(now - message.enqueued_at)
+        except Exception:
+            self.failed += len(batch)
+            log.exception('Failed to dispatch %d notifications', len(batch))
+        finally:
+            self._semaphore.release()
+
+    def _notification_rows(self, batch):
+        return [
+            {
+                'user_id': user_id,
+                'title': message.title,
+                'message': message.message,
+                'notification_type': message.notification_type,
+                'reference_id': message.reference_id,
+            }
+            for message in batch
+            for user_id in message.user_ids
+        ]
+
+    def _persist_rows(self, rows):
+        from sqlalchemy import insert
+        from app import db
+        from app.models import Notification
+
+        with self.app.app_context():
+            db.session.execute(insert(Notification), rows)
+            db.session.commit()
+
+    def _pusher_calls(self, batch):
+        """Kelompokkan pesan: multi-channel via /events, satu channel via /batch_events"""
+        base = f'/apps/{self.app_id}'
+        calls = []
+        single = []
+        for message in batch:
+            data = json.dumps(message.data, default=str)
+            if len(message.channels) == 1:
+                single.append((message, {'channel': message.channels[0], 'name': message.event, 'data': data}))
+                continue
+            for i in range(0, len(message.channels), PUSHER_MAX_CHANNELS):
+                body = {'name': message.event, 'channels': message.channels[i:i + PUSHER_MAX_CHANNELS], 'data': data}
+                calls.append((f'{base}/events', body, [message]))
+        for i in range(0, len(single), PUSHER_MAX_BATCH_EVENTS):
+            chunk = single[i:i + PUSHER_MAX_BATCH_EVENTS]
+            calls.append((f'{base}/batch_events', {'batch': [event for _, event in chunk]}, [m for m, _ in chunk]))
+        return calls
+
+    def _signed_url(self, path, body):
+        params = {
+            'auth_key': self.key,
+            'auth_timestamp': str(int(time.time())),
+            'auth_version': '1.0',
+            'body_md5': hashlib.md5(body).hexdigest(),
+        }
+        query = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+        signature = hmac.new(self.secret.encode(), f'POST\n{path}\n{query}'.encode(), hashlib.sha256).hexdigest()
+        return f'{self.host}{path}?{query}&auth_signature={signature}'
+
+    async def _post_with_retry(self, path, payload):
+        body = json.dumps(payload).encode()
+        # NOTIFICATION_RETRY_ATTEMPTS adalah jumlah percobaan total, termasuk yang pertama
+        attempts = max(1, self.retry_attempts)
+        for attempt in range(attempts):
+            try:
+                self.http_calls += 1
+                response = await self._client.post(
+                    self._signed_url(path, body), content=body, headers={'Content-Type': 'application/json'}
+                )
+                if response.status_code < 300:
+                    return True
+                # 4xx selain rate limit tidak akan berhasil bila diulang
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    log.error('Pusher rejected %s: %s %s', path, response.status_code, response.text)
+                    return False
+                log.warning('Pusher %s returned %s (attempt %d)', path, response.status_code, attempt + 1)
+            except Exception as e:
+                log.warning('Pusher %s failed: %s (attempt %d)', path, e, attempt + 1)
+            if attempt < attempts - 1:
+                self.retries += 1
+                delay = self.retry_backoff * (2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        return False
+
+
+notification_dispatcher = NotificationDispatcher()
@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Camera, Report, ReportPriority, ReportStatus
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(report):
+    payload = json.dumps([report.created_at.isoformat(), report.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, report_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), report_id
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def report_to_dict(report):
+    return {
+        'id': report.id,
+        'title': report.title,
+        'description': report.description,
+        'status': report.status.value,
+        'priority': report.priority.value,
+        'detection_confidence': report.detection_confidence,
+        'weapon_type': report.weapon_type,
+        'detection_image_url': report.detection_image_url,
+        'is_automatic': report.is_automatic,
+        'created_at': report.created_at.isoformat(),
+        'updated_at': report.updated_at.isoformat(),
+        'camera': {
+            'id': report.camera.id,
+            'name': report.camera.name,
+            'location': report.camera.location,
+            'latitude': report.camera.latitude,
+            'longitude': report.camera.longitude,
+        },
+        'reporter': {
+            'id': report.reporter.id,
+            'name': report.reporter.name,
+        },
+    }
+
+
+def feed_query(statuses=None, priorities=None, owner_id=None, camera_id=None, created_from=None, created_to=None):
+    """Query Report terfilter, urut (created_at, id) menurun.
+
+    Urutan dan filter sengaja mengikuti index komposit di Report agar setiap
+    halaman menjadi satu range scan.
+    """
+    query = Report.query.options(joinedload(Report.camera), joinedload(Report.reporter))
+    query = apply_filters(query, statuses, priorities, owner_id, camera_id, created_from, created_to)
+    return query.order_by(Report.created_at.desc(), Report.id.desc())
+
+
+def apply_filters(query, statuses=None, priorities=None, owner_id=None, camera_id=None, created_from=None,
+                  created_to=None):
+    """Filter feed untuk Query ORM maupun select() (dipakai juga oleh export)"""
+    if camera_id:
+        query = query.filter(Report.camera_id == camera_id)
+    if owner_id:
+        owned = db.session.query(Camera.id).filter(Camera.owner_id == owner_id)
+        query = query.filter(Report.camera_id.in_(owned.scalar_subquery()))
+    if statuses:
+        query = query.filter(Report.status.in_(statuses))
+    if priorities:
+        query = query.filter(Report.priority.in_(priorities))
+    if created_from:
+        query = query.filter(Report.created_at >= created_from)
+    if created_to:
+        query = query.filter(Report.created_at < created_to)
+    return query
+
+
+def paginate(query, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Keyset pagination: halaman berikutnya dimulai setelah (created_at, id) terakhir"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        created_at, report_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Report.created_at < created_at,
+            and_(Report.created_at == created_at, Report.id < report_id),
+        ))
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'items': [report_to_dict(report) for report in rows],
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def parse_enum_list(enum_cls, value):
+    if not value:
+        return None
+    try:
+        return [enum_cls(item.strip().upper()) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValueError(f'Invalid {enum_cls.__name__} value: {value}')
+
+
+def parse_filters(args):
+    return {
+        'statuses': parse_enum_list(ReportStatus, args.get('status')),
+        'priorities': parse_enum_list(ReportPriority, args.get('priority')),
+        'camera_id': args.get('camera_id'),
+        'owner_id': args.get('owner_id'),
+        'created_from': datetime.fromisoformat(args['created_from']) if args.get('created_from') else None,
+        'created_to': datetime.fromisoformat(args['created_to']) if args.get('created_to') else None,
+    }
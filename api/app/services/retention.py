@@ -0,0 +1,309 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, select, text
+
+log = logging.getLogger('tangkapin.retention')
+
+PARTITIONED_TABLES = ('locations', 'notifications', 'timeline_events')
+_RANGE_BOUND = re.compile(r"FROM \((?P<lower>[^)]*)\) TO \((?P<upper>[^)]*)\)")
+
+
+@dataclass
+class PartitionPolicy:
+    table: str
+    interval: str = 'month'  # 'day' atau 'month'
+    retention_days: int = None  # None = simpan selamanya
+    archive: bool = False  # Pindahkan partisi lama ke skema arsip alih-alih DROP
+
+    def floor(self, moment):
+        if self.interval == 'day':
+            return datetime(moment.year, moment.month, moment.day)
+        return datetime(moment.year, moment.month, 1)
+
+    def next(self, start):
+        if self.interval == 'day':
+            return start + timedelta(days=1)
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+    def partition_name(self, start):
+        return f"{self.table}_p{start.strftime('%Y%m%d' if self.interval == 'day' else '%Y%m')}"
+
+
+@dataclass
+class Partition:
+    name: str
+    lower: datetime = None  # None = MINVALUE
+    upper: datetime = None  # None = MAXVALUE
+    is_default: bool = False
+
+    def overlaps(self, start, end):
+        return not self.is_default and (self.lower is None or self.lower < end) \
+            and (self.upper is None or self.upper > start)
+
+
+def _parse_bound(value):
+    value = value.strip()
+    if value in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+class RetentionManager:
+    """Partisi range per created_at dan retensi untuk tabel append-only.
+
+    Di Postgres, locations, notifications dan timeline_events adalah tabel
+    partisi (lihat __table_args__ di models). Job maintenance membuat partisi
+    beberapa interval ke depan dan membuang partisi yang seluruh isinya sudah
+    melewati masa retensi: DROP TABLE, atau DETACH lalu pindah ke skema arsip
+    untuk tabel yang perlu disimpan (timeline laporan). Membuang partisi tidak
+    meninggalkan dead tuple atau index bloat seperti DELETE massal.
+
+    Di database tanpa partisi (SQLite saat development, atau sebelum
+    `flask retention partition` dijalankan) retensi memakai DELETE per batch.
+    token_blacklist tidak dipartisi: lookup jti butuh unique index global,
+    dan barisnya sudah dihapus begitu token expire (token_revocation.compact).
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.policies = {}
+        self._tables = {}
+        self._listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import Location, Notification, TimelineEvent
+
+        self.app = app
+        self.configure(app.config)
+        self._tables = {model.__tablename__: model.__table__ for model in (Location, Notification, TimelineEvent)}
+        if not self._listening:
+            # Tabel partisi baru (db.create_all / partition_table) langsung mendapat partisinya
+            for table in self._tables.values():
+                event.listen(table, 'after_create', self._table_created)
+            self._listening = True
+        app.extensions['retention_manager'] = self
+
+    def configure(self, config):
+        self.premake = config.get('PARTITION_PREMAKE', 3)
+        self.delete_batch = config.get('RETENTION_DELETE_BATCH', 5000)
+        self.archive_schema = config.get('RETENTION_ARCHIVE_SCHEMA', 'archive')
+        # Tabel tanpa konfigurasi tetap dipartisi bulanan dan disimpan selamanya
+        options = config.get('RETENTION_POLICIES', {})
+        self.policies = {table: PartitionPolicy(table, **options.get(table, {})) for table in PARTITIONED_TABLES}
+
+    def _table_created(self, target, connection, **kw):
+        if connection.dialect.name == 'postgresql':
+            self.ensure_partitions(connection, self.policies[target.name])
+
+    # Introspeksi
+
+    def is_partitioned(self, connection, table):
+        if connection.dialect.name != 'postgresql':
+            return False
+        return connection.execute(text(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = :table AND pg_table_is_visible(c.oid)'
+        ), {'table': table}).first() is not None
+
+    def partitions(self, connection, table):
+        rows = connection.execute(text(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass) '
+            'ORDER BY c.relname'
+        ), {'table': table})
+        partitions = []
+        for name, bound in rows:
+            if bound == 'DEFAULT':
+                partitions.append(Partition(name, is_default=True))
+                continue
+            match = _RANGE_BOUND.search(bound)
+            partitions.append(Partition(name, _parse_bound(match['lower']), _parse_bound(match['upper'])))
+        return partitions
+
+    # Maintenance
+
+    def ensure_partitions(self, connection, policy, now=None, dry_run=False):
+        """Buat partisi default dan partisi dari interval berjalan sampai PARTITION_PREMAKE ke depan"""
+        now = now or datetime.utcnow()
+        existing = self.partitions(connection, policy.table)
+        default = next((p.name for p in existing if p.is_default), None)
+        created = []
+        if default is None:
+            # Penampung baris di luar semua rentang agar insert tidak gagal bila job terlambat
+            default = f'{policy.table}_default'
+            if not dry_run:
+                connection.execute(text(f'CREATE TABLE {default} PARTITION OF {policy.table} DEFAULT'))
+            created.append(default)
+        start = policy.floor(now)
+        for _ in range(self.premake + 1):
+            end = policy.next(start)
+            if not any(p.overlaps(start, end) for p in existing):
+                name = policy.partition_name(start)
+                if not dry_run:
+                    self._create_partition(connection, policy.table, default, name, start, end)
+                created.append(name)
+            start = end
+        return created
+
+    def _create_partition(self, connection, table, default, name, start, end):
+        connection.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+        # ATTACH gagal bila partisi default masih memuat baris dalam rentang baru
+        moved = connection.execute(text(
+            f'WITH moved AS (DELETE FROM {default} WHERE created_at >= :start AND created_at < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ), {'start': start, 'end': end}).rowcount
+        connection.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{end.isoformat(' ')}')"
+        ))
+        log.info('Created partition %s [%s, %s) with %d rows from %s', name, start, end, moved, default)
+
+    def expire_partitions(self, connection, policy, now=None, dry_run=False):
+        """DROP atau arsipkan partisi yang batas atasnya sudah lewat masa retensi"""
+        if policy.retention_days is None:
+            return []
+        cutoff = (now or datetime.utcnow()) - timedelta(days=policy.retention_days)
+        partitions = self.partitions(connection, policy.table)
+        expired = [p.name for p in partitions if not p.is_default and p.upper is not None and p.upper <= cutoff]
+        if dry_run:
+            return expired
+        if not policy.archive:
+            # Baris lama yang tertampung di partisi default (ping offline yang sangat terlambat)
+            for partition in partitions:
+                if partition.is_default:
+                    connection.execute(text(f'DELETE FROM {partition.name} WHERE created_at < :cutoff'),
+                                       {'cutoff': cutoff})
+        for name in expired:
+            if policy.archive:
+                connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS {self.archive_schema}'))
+                connection.execute(text(f'ALTER TABLE {policy.table} DETACH PARTITION {name}'))
+                connection.execute(text(f'ALTER TABLE {name} SET SCHEMA {self.archive_schema}'))
+                log.info('Archived partition %s to schema %s', name, self.archive_schema)
+            else:
+                connection.execute(text(f'DROP TABLE {name}'))
+                log.info('Dropped partition %s', name)
+        return expired
+
+    def delete_expired(self, engine, policy, now=None, dry_run=False):
+        """Retensi untuk tabel yang belum dipartisi: DELETE per batch, satu transaksi per batch"""
+        if policy.retention_days is None:
+            return 0
+        if policy.archive:
+            log.warning('%s is not partitioned; archive retention skipped', policy.table)
+            return 0
+        table = self._tables[policy.table]
+        cutoff = (now or datetime.utcnow()) - timedelta(days=policy.retention_days)
+        if dry_run:
+            with engine.connect() as connection:
+                return connection.execute(
+                    select(func.count()).select_from(table).where(table.c.created_at < cutoff)
+                ).scalar()
+        total = 0
+        while True:
+            batch = select(table.c.id).where(table.c.created_at < cutoff).limit(self.delete_batch)
+            with engine.begin() as connection:
+                deleted = connection.execute(delete(table).where(table.c.id.in_(batch))).rowcount
+            total += deleted
+            if deleted < self.delete_batch:
+                break
+        if total:
+            log.info('Deleted %d expired rows from %s', total, policy.table)
+        return total
+
+    def run(self, now=None, dry_run=False):
+        """Satu putaran maintenance untuk semua tabel; dijalankan dari cron lewat `flask retention run`"""
+        from app import db
+        from app.services.revocation import token_revocation
+
+        now = now or datetime.utcnow()
+        results = {}
+        with self.app.app_context():
+            engine = db.engine
+            for table, policy in self.policies.items():
+                with engine.begin() as connection:
+                    partitioned = self.is_partitioned(connection, table)
+                    if partitioned:
+                        created = self.ensure_partitions(connection, policy, now, dry_run)
+                        expired = self.expire_partitions(connection, policy, now, dry_run)
+                if partitioned:
+                    results[table] = {'created': created, 'expired': expired}
+                else:
+                    results[table] = {'deleted': self.delete_expired(engine, policy, now, dry_run)}
+            if not dry_run:
+                results['token_blacklist'] = {'deleted': token_revocation.compact()}
+        return results
+
+    def partition_table(self, connection, table, now=None):
+        """Ubah tabel biasa yang sudah ada menjadi tabel partisi (Postgres).
+
+        Data lama tidak disalin: tabelnya di-rename menjadi {table}_legacy dan
+        dipasang sebagai satu partisi untuk rentang sebelum interval berjalan,
+        lalu ikut dibuang oleh retensi setelah masa retensinya lewat. Hanya
+        baris interval berjalan yang dipindahkan. Membutuhkan lock eksklusif
+        pada tabel dan membangun primary key (id, created_at) untuk data lama,
+        jadi jalankan di jendela maintenance. Dipanggil oleh
+        `flask retention partition` atau dari migrasi Alembic lewat op.get_bind().
+        """
+        if connection.dialect.name != 'postgresql':
+            raise ValueError('Table partitioning requires PostgreSQL')
+        if self.is_partitioned(connection, table):
+            return False
+        policy = self.policies[table]
+        model_table = self._tables[table]
+        legacy = f'{table}_legacy'
+        boundary = policy.floor(now or datetime.utcnow())
+
+        connection.execute(text(f'ALTER TABLE {table} RENAME TO {legacy}'))
+        # Nama index bersifat global per skema; beri nama baru agar index tabel induk bisa dibuat
+        indexes = connection.execute(text(
+            'SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()'
+        ), {'table': legacy}).scalars().all()
+        for index in indexes:
+            connection.execute(text(f'ALTER INDEX {index} RENAME TO {(index + "_legacy")[:63]}'))
+        primary_key = connection.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'p'"
+        ), {'table': legacy}).scalar()
+        if primary_key:
+            connection.execute(text(f'ALTER TABLE {legacy} DROP CONSTRAINT {primary_key}'))
+        connection.execute(text(f'ALTER TABLE {legacy} ADD PRIMARY KEY (id, created_at)'))
+
+        # Memicu _table_created: partisi default dan partisi interval berjalan
+        model_table.create(connection, checkfirst=True)
+        columns = ', '.join(column.name for column in model_table.columns)
+        moved = connection.execute(text(
+            f'WITH moved AS (DELETE FROM {legacy} WHERE created_at >= :boundary RETURNING {columns}) '
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM moved'
+        ), {'boundary': boundary}).rowcount
+        connection.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat(' ')}')"
+        ))
+        log.info('Partitioned %s; %d current rows moved, older rows kept in %s', table, moved, legacy)
+        return True
+
+    def status(self, connection, table):
+        """Partisi beserta perkiraan jumlah baris dan ukuran (data + index)"""
+        if not self.is_partitioned(connection, table):
+            count = connection.execute(text(f'SELECT count(*) FROM {table}')).scalar()
+            return {'partitioned': False, 'rows': count}
+        partitions = []
+        for partition in self.partitions(connection, table):
+            rows, size = connection.execute(text(
+                'SELECT reltuples::bigint, pg_total_relation_size(oid) FROM pg_class WHERE relname = :name'
+            ), {'name': partition.name}).one()
+            partitions.append({
+                'name': partition.name,
+                'from': partition.lower.isoformat() if partition.lower else None,
+                'to': partition.upper.isoformat() if partition.upper else None,
+                'default': partition.is_default,
+                'rows': max(rows, 0),
+                'bytes': size,
+            })
+        return {'partitioned': True, 'partitions': partitions}
+
+
+retention_manager = RetentionManager()
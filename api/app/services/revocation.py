@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+log = logging.getLogger('tangkapin.revocation')
+
+
+class TokenRevocation:
+    """Blocklist JTI di memori untuk token_in_blocklist_loader.
+
+    Set JTI dimuat saat startup lalu disinkronkan setiap
+    TOKEN_REVOCATION_SYNC_INTERVAL dengan membaca baris token_blacklist yang
+    dibuat sejak sinkronisasi terakhir dikurangi TOKEN_REVOCATION_SYNC_MARGIN.
+    Watermark berbasis waktu dengan overlap dipakai, bukan id, karena id
+    sequence bisa ter-commit tidak berurutan. Setiap
+    TOKEN_REVOCATION_FULL_SYNC_INTERVAL seluruh set dimuat ulang sehingga baris
+    yang sudah di-compact di proses lain ikut hilang dari memori.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._revoked = {}  # jti -> expires_at (None bila token tidak expire)
+        self._synced_at = None
+        self._full_synced_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loaded = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app import jwt
+
+        self.app = app
+        self.sync_interval = app.config.get('TOKEN_REVOCATION_SYNC_INTERVAL', 2)
+        self.sync_margin = timedelta(seconds=app.config.get('TOKEN_REVOCATION_SYNC_MARGIN', 60))
+        self.full_sync_interval = timedelta(seconds=app.config.get('TOKEN_REVOCATION_FULL_SYNC_INTERVAL', 300))
+        jwt.token_in_blocklist_loader(self._blocklist_loader)
+        app.extensions['token_revocation'] = self
+
+    def _blocklist_loader(self, jwt_header, jwt_payload):
+        return self.is_revoked(jwt_payload['jti'])
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='token-revocation-sync', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception:
+                log.exception('Token revocation sync failed')
+
+    def is_revoked(self, jti):
+        if not self._loaded:
+            self.sync()
+            self.start()
+        return jti in self._revoked
+
+    def sync(self, full=None):
+        """Ambil JTI yang dicabut sejak sinkronisasi terakhir (dengan overlap), atau seluruhnya"""
+        from app import db
+        from app.models import Token
+
+        now = datetime.utcnow()
+        if full is None:
+            full = self._full_synced_at is None or now - self._full_synced_at >= self.full_sync_interval
+        with self.app.app_context():
+            query = db.session.query(Token.jti, Token.expires_at).filter(
+                (Token.expires_at.is_(None)) | (Token.expires_at > now),
+            )
+            if not full:
+                # Baris dengan created_at sebelum sinkronisasi lalu bisa baru ter-commit sekarang
+                query = query.filter(Token.created_at >= self._synced_at - self.sync_margin)
+            rows = query.all()
+            db.session.remove()
+        with self._lock:
+            if full:
+                self._revoked = dict(rows)
+                self._full_synced_at = now
+            else:
+                self._revoked.update(rows)
+                for jti in [jti for jti, expires_at in self._revoked.items()
+                            if expires_at is not None and expires_at <= now]:
+                    del self._revoked[jti]
+            self._synced_at = now
+            self._loaded = True
+        return len(rows)
+
+    def revoke(self, jwt_payload):
+        """Cabut token dari payload JWT yang sedang dipakai"""
+        from app import db
+        from app.models import Token
+
+        jti = jwt_payload['jti']
+        exp = jwt_payload.get('exp')
+        expires_at = datetime.utcfromtimestamp(exp) if exp else None
+        db.session.add(Token(jti=jti, user_id=jwt_payload['sub'], expires_at=expires_at))
+        db.session.commit()
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def compact(self, leeway=60):
+        """Hapus baris token yang sudah melewati exp dan tidak mungkin valid lagi.
+
+        Worker lain membuang JTI yang sudah expire saat sinkronisasi berikutnya
+        dan membuang baris yang hilang dari tabel saat full sync.
+        """
+        from app import db
+        from app.models import Token
+
+        cutoff = datetime.utcnow() - timedelta(seconds=leeway)
+        deleted = Token.query.filter(Token.expires_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        with self._lock:
+            for jti in [jti for jti, expires_at in self._revoked.items()
+                        if expires_at is not None and expires_at < cutoff]:
+                del self._revoked[jti]
+        log.info('Compacted %d expired revoked tokens', deleted)
+        return deleted
+
+    def migrate_schema(self, connection):
+        """Ubah token_blacklist lama (kolom token berisi JWT utuh) ke skema jti/expires_at.
+
+        JTI dan exp dibaca dari payload token tanpa verifikasi signature. Baris
+        yang payload-nya tidak bisa dibaca (misalnya token terpotong di
+        VARCHAR(255)) diberi jti 'legacy-<id>' dan dihitung sebagai unreadable;
+        token tersebut tidak lagi bisa diblokir dan harus dicabut dengan
+        mengganti JWT_SECRET_KEY. Mengembalikan None bila skema sudah baru.
+        """
+        import jwt as pyjwt
+        from sqlalchemy import inspect, text
+
+        columns = {column['name'] for column in inspect(connection).get_columns('token_blacklist')}
+        if 'token' not in columns:
+            return None
+        if 'jti' not in columns:
+            connection.execute(text('ALTER TABLE token_blacklist ADD COLUMN jti VARCHAR(36)'))
+        if 'expires_at' not in columns:
+            connection.execute(text('ALTER TABLE token_blacklist ADD COLUMN expires_at TIMESTAMP'))
+
+        migrated = unreadable = 0
+        rows = connection.execute(text('SELECT id, token FROM token_blacklist WHERE jti IS NULL')).all()
+        seen = set()
+        for row_id, token in rows:
+            try:
+                claims = pyjwt.decode(token, options={'verify_signature': False, 'verify_exp': False})
+                jti = str(claims['jti'])
+                exp = claims.get('exp')
+            except (pyjwt.InvalidTokenError, KeyError):
+                jti, exp = None, None
+            if jti is None:
+                unreadable += 1
+            if jti is None or jti in seen:
+                # Duplikat tetap diberi jti unik agar unique index bisa dibuat
+                jti = f'legacy-{row_id}'
+            seen.add(jti)
+            connection.execute(text('UPDATE token_blacklist SET jti = :jti, expires_at = :expires_at WHERE id = :id'), {
+                'jti': jti, 'expires_at': datetime.utcfromtimestamp(exp) if exp else None, 'id': row_id,
+            })
+            migrated += 1
+
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text('ALTER TABLE token_blacklist ALTER COLUMN jti SET NOT NULL'))
+        connection.execute(text('ALTER TABLE token_blacklist DROP COLUMN token'))
+        connection.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_token_blacklist_jti ON token_blacklist (jti)'))
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_token_blacklist_expires_at ON token_blacklist (expires_at)'
+        ))
+        return {'migrated': migrated, 'unreadable': unreadable}
+
+
+token_revocation = TokenRevocation()
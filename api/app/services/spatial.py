@@ -0,0 +1,318 @@
+import heapq
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import event, select
+
+log = logging.getLogger('tangkapin.spatial')
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """Index titik dalam grid lat/lon berukuran tetap.
+
+    Pencarian k-terdekat memeriksa cincin sel dari dalam ke luar dan berhenti
+    setelah jarak minimum cincin berikutnya melebihi kandidat ke-k, sehingga
+    biaya query sebanding dengan kepadatan sekitar titik, bukan jumlah total titik.
+    """
+
+    def __init__(self, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self._cells = {}
+        self._points = {}
+        self._bounds = None  # (min_x, max_x, min_y, max_y) sel terisi, dihitung ulang saat dibutuhkan
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def upsert(self, key, lat, lon):
+        current = self._points.get(key)
+        cell = self._cell(lat, lon)
+        if current is not None:
+            old_cell = self._cell(current[0], current[1])
+            if old_cell != cell:
+                self._discard(old_cell, key)
+        self._points[key] = (lat, lon)
+        if cell not in self._cells:
+            self._bounds = None
+            self._cells[cell] = set()
+        self._cells[cell].add(key)
+
+    def remove(self, key):
+        current = self._points.pop(key, None)
+        if current is not None:
+            self._discard(self._cell(*current), key)
+
+    def _discard(self, cell, key):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self._cells[cell]
+                self._bounds = None
+
+    def get(self, key):
+        return self._points.get(key)
+
+    def _cell_bounds(self):
+        if self._bounds is None and self._cells:
+            xs = [x for x, _ in self._cells]
+            ys = [y for _, y in self._cells]
+            self._bounds = (min(xs), max(xs), min(ys), max(ys))
+        return self._bounds
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest(self, lat, lon, k=5, max_km=None, predicate=None):
+        """List (jarak_km, key) terurut, paling banyak k"""
+        if not self._points:
+            return []
+        cx, cy = self._cell(lat, lon)
+        # Lebar sel terkecil (arah longitude menyempit mengikuti lintang)
+        cell_km = self.cell_deg * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + self.cell_deg, 89.9))), 0.01)
+        max_ring = None
+        if max_km is not None:
+            max_ring = int(math.ceil(max_km / cell_km)) + 1
+
+        # Cincin di luar bounding box sel terisi pasti kosong
+        min_x, max_x, min_y, max_y = self._cell_bounds()
+        last_ring = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy, 0)
+        if max_ring is not None:
+            last_ring = min(last_ring, max_ring)
+
+        heap = []  # max-heap via jarak negatif
+        seen = 0
+        r = 0
+        while True:
+            if (2 * r + 1) ** 2 > len(self._points):
+                # Sel yang harus diperiksa sudah lebih banyak dari jumlah titik: scan linear lebih murah
+                return self._linear_nearest(lat, lon, k, max_km, predicate)
+            for cell in self._ring(cx, cy, r):
+                for key in self._cells.get(cell, ()):
+                    seen += 1
+                    if predicate is not None and not predicate(key):
+                        continue
+                    plat, plon = self._points[key]
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if max_km is not None and distance > max_km:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, key))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, key))
+            # Titik di luar cincin r berjarak minimal r * cell_km
+            if len(heap) == k and -heap[0][0] <= r * cell_km:
+                break
+            if seen >= len(self._points) or r >= last_ring:
+                break
+            r += 1
+        return sorted((-d, key) for d, key in heap)
+
+    def _linear_nearest(self, lat, lon, k, max_km, predicate):
+        candidates = []
+        for key, (plat, plon) in self._points.items():
+            if predicate is not None and not predicate(key):
+                continue
+            distance = haversine_km(lat, lon, plat, plon)
+            if max_km is None or distance <= max_km:
+                candidates.append((distance, key))
+        return heapq.nsmallest(k, candidates)
+
+    def within(self, lat, lon, radius_km, predicate=None):
+        return self.nearest(lat, lon, k=len(self._points) or 1, max_km=radius_km, predicate=predicate)
+
+
+class SpatialIndex:
+    """Index lokasi petugas, kamera, dan insiden aktif untuk query kedekatan.
+
+    Posisi petugas mengikuti LocationTracker secara langsung; kamera, insiden
+    aktif, dan petugas yang sedang punya Assignment aktif dimuat ulang dari
+    database setiap SPATIAL_REFRESH_INTERVAL.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.officers = GridIndex()
+        self.cameras = GridIndex()
+        self.incidents = GridIndex()
+        self.busy_officers = set()
+        self._lock = threading.RLock()
+        self._thread = None
+        self._listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import Assignment
+        from app.services.locations import location_tracker
+
+        self.app = app
+        cell_deg = app.config.get('SPATIAL_CELL_DEGREES', 0.01)
+        self.officers = GridIndex(cell_deg)
+        self.cameras = GridIndex(cell_deg)
+        self.incidents = GridIndex(cell_deg)
+        self.refresh_interval = app.config.get('SPATIAL_REFRESH_INTERVAL', 30)
+        location_tracker.subscribe(self._on_position)
+        if not self._listening:
+            event.listen(Assignment, 'after_insert', self._assignment_changed)
+            event.listen(Assignment, 'after_update', self._assignment_changed)
+            event.listen(Assignment, 'after_delete', self._assignment_deleted)
+            self._listening = True
+        app.extensions['spatial_index'] = self
+
+    def _on_position(self, position):
+        with self._lock:
+            if position.is_active:
+                self.officers.upsert(position.user_id, position.latitude, position.longitude)
+            else:
+                self.officers.remove(position.user_id)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, name='spatial-refresh', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception:
+                log.exception('Spatial index refresh failed')
+
+    def refresh(self):
+        from app import db
+        from app.models import Assignment, AssignmentStatus, Camera, Report, ReportStatus
+        from app.services.locations import location_tracker
+
+        active_reports = (ReportStatus.NEW, ReportStatus.VERIFIED, ReportStatus.ASSIGNED, ReportStatus.IN_PROGRESS)
+        active_assignments = (AssignmentStatus.PENDING, AssignmentStatus.ACCEPTED, AssignmentStatus.IN_PROGRESS)
+        with self.app.app_context():
+            cameras = db.session.query(Camera.id, Camera.latitude, Camera.longitude).filter(
+                Camera.is_active.is_(True), Camera.latitude.isnot(None), Camera.longitude.isnot(None),
+            ).all()
+            incidents = db.session.query(Report.id, Camera.latitude, Camera.longitude).join(Camera).filter(
+                Report.status.in_(active_reports), Report.is_active.is_(True), Camera.latitude.isnot(None),
+            ).all()
+            busy = {
+                officer_id for (officer_id,) in db.session.query(Assignment.officer_id).filter(
+                    Assignment.status.in_(active_assignments)
+                ).distinct()
+            }
+
+        camera_index = GridIndex(self.cameras.cell_deg)
+        for camera_id, lat, lon in cameras:
+            camera_index.upsert(camera_id, lat, lon)
+        incident_index = GridIndex(self.incidents.cell_deg)
+        for report_id, lat, lon in incidents:
+            incident_index.upsert(report_id, lat, lon)
+        # Dibangun ulang, bukan di-upsert, agar petugas yang posisinya sudah basi
+        # (lewat LOCATION_STALE_AFTER) tidak lagi disarankan untuk dispatch
+        officer_index = GridIndex(self.officers.cell_deg)
+        for position in location_tracker.positions(active_only=True):
+            officer_index.upsert(position.user_id, position.latitude, position.longitude)
+        with self._lock:
+            self.cameras = camera_index
+            self.incidents = incident_index
+            self.officers = officer_index
+            self.busy_officers = busy
+        log.debug('Spatial index refreshed: %d cameras, %d incidents, %d officers, %d busy officers',
+                  len(camera_index), len(incident_index), len(officer_index), len(busy))
+
+    def _assignment_changed(self, mapper, connection, target):
+        """Status busy diperbarui langsung di worker ini, tidak menunggu refresh berikutnya"""
+        from app.models import AssignmentStatus
+
+        if target.status in (AssignmentStatus.PENDING, AssignmentStatus.ACCEPTED, AssignmentStatus.IN_PROGRESS):
+            self.mark_busy(target.officer_id)
+        else:
+            self._release(connection, target)
+
+    def _assignment_deleted(self, mapper, connection, target):
+        self._release(connection, target)
+
+    def _release(self, connection, target):
+        from app.models import Assignment, AssignmentStatus
+
+        # Petugas tetap busy selama masih punya Assignment aktif lain
+        other = connection.execute(
+            select(Assignment.id).where(
+                Assignment.officer_id == target.officer_id,
+                Assignment.id != target.id,
+                Assignment.status.in_((AssignmentStatus.PENDING, AssignmentStatus.ACCEPTED,
+                                       AssignmentStatus.IN_PROGRESS)),
+            ).limit(1)
+        ).first()
+        if other is None:
+            self.mark_available(target.officer_id)
+
+    def mark_busy(self, officer_id):
+        with self._lock:
+            self.busy_officers.add(officer_id)
+
+    def mark_available(self, officer_id):
+        with self._lock:
+            self.busy_officers.discard(officer_id)
+
+    def report_location(self, report_id):
+        from app import db
+        from app.models import Camera, Report
+
+        point = self.incidents.get(report_id)
+        if point is not None:
+            return point
+        with self.app.app_context():
+            row = db.session.query(Camera.latitude, Camera.longitude).join(Report).filter(Report.id == report_id).first()
+        if row is None or row.latitude is None:
+            return None
+        return row.latitude, row.longitude
+
+    def nearest_available_officers(self, lat, lon, k=5, max_km=None):
+        self.start()
+        with self._lock:
+            busy = self.busy_officers
+            return self.officers.nearest(lat, lon, k, max_km, predicate=lambda key: key not in busy)
+
+    def nearest_incidents(self, lat, lon, k=10, max_km=None):
+        self.start()
+        with self._lock:
+            return self.incidents.nearest(lat, lon, k, max_km)
+
+    def nearest_cameras(self, lat, lon, k=10, max_km=None):
+        self.start()
+        with self._lock:
+            return self.cameras.nearest(lat, lon, k, max_km)
+
+
+spatial_index = SpatialIndex()
@@ -0,0 +1,459 @@
+import hashlib
+import io
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from app.utils.lazy import lazy
+
+log = logging.getLogger('tangkapin.storage')
+
+KNOWN_HASHES = 10000
+
+
+class UploadQueueFull(Exception):
+    """Antrian upload penuh (UPLOAD_QUEUE_SIZE)"""
+
+
+class UploadTooLarge(Exception):
+    """File upload melebihi UPLOAD_MAX_BYTES"""
+
+
+class LocalStorage:
+    """Backend filesystem lokal, dipakai saat development dan benchmark"""
+
+    def __init__(self, root, public_url=None, chunk_size=1024 * 1024):
+        self.root = root
+        self.public_url = public_url
+        self.chunk_size = chunk_size
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, key)
+
+    def exists(self, bucket, key):
+        return os.path.exists(self._path(bucket, key))
+
+    def put(self, bucket, key, fileobj, content_type):
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                shutil.copyfileobj(fileobj, fh, self.chunk_size)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def url(self, bucket, key):
+        if self.public_url:
+            return f'{self.public_url.rstrip("/")}/{bucket}/{key}'
+        return self._path(bucket, key)
+
+
+class S3Storage:
+    """Backend S3-compatible (Supabase Storage /storage/v1/s3, MinIO, AWS).
+
+    Satu client boto3 dipakai bersama oleh semua worker upload; pool koneksinya
+    sebesar UPLOAD_WORKERS. File di atas UPLOAD_CHUNK_SIZE dikirim sebagai
+    multipart upload per chunk sehingga video tidak pernah dibaca utuh ke memori.
+    """
+
+    def __init__(self, endpoint, access_key, secret_key, region, public_url=None,
+                 max_connections=4, chunk_size=8 * 1024 * 1024):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config as BotoConfig
+
+        self.endpoint = endpoint
+        self.public_url = public_url
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+            config=BotoConfig(
+                max_pool_connections=max_connections,
+                retries={'max_attempts': 3, 'mode': 'standard'},
+                s3={'addressing_style': 'path'},
+            ),
+        )
+        self.transfer = TransferConfig(
+            multipart_threshold=chunk_size, multipart_chunksize=chunk_size, max_concurrency=1, use_threads=False
+        )
+
+    def exists(self, bucket, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def put(self, bucket, key, fileobj, content_type):
+        self.client.upload_fileobj(fileobj, bucket, key, ExtraArgs={'ContentType': content_type}, Config=self.transfer)
+
+    def url(self, bucket, key):
+        return f'{(self.public_url or self.endpoint).rstrip("/")}/{bucket}/{key}'
+
+
+@dataclass
+class UploadJob:
+    bucket: str
+    extension: str
+    content_type: str
+    image: object = None  # Frame numpy (di-encode JPEG di worker) atau bytes JPEG siap upload
+    path: str = None  # File spool (mis. video), dihapus setelah upload
+    report_id: str = None  # Report.detection_image_url yang diisi
+    evidence_id: str = None  # Evidence.file_url yang diisi
+    submitted_at: float = field(default_factory=time.monotonic)
+    seq: int = 0
+    attempts: int = 0
+
+    @property
+    def target(self):
+        return self.report_id, self.evidence_id
+
+
+class UploadPipeline:
+    """Encode dan upload file evidence/deteksi di pool thread latar belakang.
+
+    Report dan Evidence di-commit lebih dulu dengan URL kosong; worker lalu
+    meng-encode frame, menghitung SHA-256, dan hanya meng-upload bila objek
+    dengan hash yang sama belum ada. Setelah selesai, URL diisi dengan UPDATE.
+    Job untuk target yang sama dengan job lebih baru (frame terbaik yang
+    diganti) dilewati.
+
+    Upload yang gagal dicoba ulang dengan backoff eksponensial; file spool tetap
+    disimpan selama percobaan. Setelah UPLOAD_MAX_ATTEMPTS, file dan metadata
+    job dipindah ke direktori failed/ di spool dan bisa dikirim ulang dengan
+    `flask uploads retry`.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._inflight = 0
+        self._latest = {}
+        self._seq = itertools.count(1)
+        self._known = OrderedDict()  # (bucket, sha256) -> url
+        self._latencies = deque(maxlen=10000)
+        self.uploaded = 0
+        self.deduplicated = 0
+        self.superseded = 0
+        self.failed = 0
+        self.retried = 0
+        self.bytes_uploaded = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.configure(app.config)
+        app.extensions['upload_pipeline'] = self
+
+    def configure(self, config):
+        self.config = config
+        self.workers = config.get('UPLOAD_WORKERS', 4)
+        self.queue_size = config.get('UPLOAD_QUEUE_SIZE', 500)
+        self.chunk_size = config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+        self.jpeg_quality = config.get('UPLOAD_JPEG_QUALITY', 85)
+        self.spool_directory = config.get('UPLOAD_SPOOL_DIRECTORY') or tempfile.gettempdir()
+        self.failed_directory = os.path.join(self.spool_directory, 'failed')
+        self.max_bytes = config.get('UPLOAD_MAX_BYTES')
+        self.max_attempts = config.get('UPLOAD_MAX_ATTEMPTS', 5)
+        self.retry_backoff = config.get('UPLOAD_RETRY_BACKOFF', 2.0)
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        # boto3 baru diimpor saat upload pertama, di proses yang melakukan upload
+        lazy.register('storage', lambda: self._create_backend(config))
+
+    def _create_backend(self, config):
+        if config.get('STORAGE_BACKEND', 'local') == 's3':
+            return S3Storage(
+                config.get('STORAGE_S3_ENDPOINT'),
+                config.get('STORAGE_S3_ACCESS_KEY'),
+                config.get('STORAGE_S3_SECRET_KEY'),
+                config.get('STORAGE_S3_REGION'),
+                public_url=config.get('STORAGE_PUBLIC_URL'),
+                max_connections=self.workers,
+                chunk_size=self.chunk_size,
+            )
+        return LocalStorage(
+            config.get('STORAGE_DIRECTORY', 'storage'),
+            public_url=config.get('STORAGE_PUBLIC_URL'),
+            chunk_size=self.chunk_size,
+        )
+
+    # Producer side
+
+    def reserve(self):
+        """Pesan satu slot antrian sebelum request body dibaca; lepas dengan release()"""
+        if not self._slots.acquire(blocking=False):
+            raise UploadQueueFull(f'Upload queue is full ({self.queue_size})')
+
+    def release(self):
+        self._slots.release()
+
+    def submit(self, job, reserved=False):
+        if not reserved:
+            self.reserve()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='upload')
+            job.seq = next(self._seq)
+            self._latest[job.target] = job.seq
+            self._inflight += 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def submit_frame(self, image, bucket, report_id=None, evidence_id=None):
+        """Upload frame deteksi sebagai JPEG lalu isi URL Report/Evidence"""
+        return self.submit(UploadJob(
+            bucket=bucket, extension='.jpg', content_type='image/jpeg',
+            image=image, report_id=report_id, evidence_id=evidence_id,
+        ))
+
+    def submit_file(self, path, bucket, content_type, evidence_id=None, report_id=None, reserved=False):
+        """Upload file spool secara streaming per chunk; file dihapus setelah berhasil"""
+        return self.submit(UploadJob(
+            bucket=bucket, extension=os.path.splitext(path)[1].lower(), content_type=content_type,
+            path=path, report_id=report_id, evidence_id=evidence_id,
+        ), reserved=reserved)
+
+    def spool(self, stream, extension=''):
+        """Salin upload request ke file spool per chunk, kembalikan path-nya"""
+        os.makedirs(self.spool_directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.spool_directory, suffix=extension)
+        written = 0
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                    written += len(chunk)
+                    if self.max_bytes and written > self.max_bytes:
+                        raise UploadTooLarge(f'Upload exceeds {self.max_bytes} bytes')
+                    fh.write(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    def drain(self, timeout=None):
+        """Tunggu sampai semua job selesai; False bila timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    def stop(self, timeout=30):
+        self.drain(timeout)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    # Worker side
+
+    def _is_latest(self, job):
+        with self._lock:
+            return self._latest.get(job.target) == job.seq
+
+    def _run(self, job):
+        retrying = False
+        try:
+            if not self._is_latest(job):
+                self._count('superseded')
+                return
+            url, digest = self._upload(job)
+            if self._is_latest(job):
+                self._apply(job, url, digest)
+            else:
+                self._count('superseded')
+            self._latencies.append(time.monotonic() - job.submitted_at)
+        except Exception:
+            job.attempts += 1
+            if job.attempts < self.max_attempts:
+                delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                log.warning('Upload failed for report=%s evidence=%s (attempt %d), retrying in %.1fs',
+                            job.report_id, job.evidence_id, job.attempts, delay, exc_info=True)
+                retrying = True
+                self._count('retried')
+                timer = threading.Timer(delay, self._retry, (job,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._count('failed')
+                log.exception('Upload failed for report=%s evidence=%s after %d attempts',
+                              job.report_id, job.evidence_id, job.attempts)
+                self._park(job)
+        finally:
+            if not retrying:
+                self._finish(job)
+
+    def _retry(self, job):
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            self._park(job)
+            self._finish(job)
+            return
+        executor.submit(self._run, job)
+
+    def _finish(self, job):
+        if job.path:
+            try:
+                os.unlink(job.path)
+            except OSError:
+                pass
+        self._slots.release()
+        with self._idle:
+            if self._latest.get(job.target) == job.seq:
+                del self._latest[job.target]
+            self._inflight -= 1
+            self._idle.notify_all()
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _park(self, job):
+        """Simpan job yang gagal permanen ke failed/ agar bisa dikirim ulang"""
+        try:
+            os.makedirs(self.failed_directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=self.failed_directory, suffix=job.extension)
+            os.close(fd)
+            if job.path:
+                shutil.move(job.path, path)
+                job.path = None
+            else:
+                with open(path, 'wb') as fh:
+                    fh.write(self._encode(job))
+            with open(path + '.json', 'w') as fh:
+                json.dump({
+                    'bucket': job.bucket, 'content_type': job.content_type,
+                    'report_id': job.report_id, 'evidence_id': job.evidence_id,
+                }, fh)
+        except Exception:
+            log.exception('Unable to keep failed upload for report=%s evidence=%s', job.report_id, job.evidence_id)
+
+    def failed_jobs(self):
+        """Path file upload yang gagal permanen beserta metadata job-nya"""
+        if not os.path.isdir(self.failed_directory):
+            return []
+        jobs = []
+        for name in sorted(os.listdir(self.failed_directory)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.failed_directory, name)) as fh:
+                    jobs.append((os.path.join(self.failed_directory, name[:-5]), json.load(fh)))
+        return jobs
+
+    def retry_failed(self):
+        """Kirim ulang semua upload di failed/; mengembalikan jumlah job"""
+        submitted = 0
+        for path, meta in self.failed_jobs():
+            os.unlink(path + '.json')
+            self.submit_file(path, meta['bucket'], meta['content_type'],
+                             evidence_id=meta['evidence_id'], report_id=meta['report_id'])
+            submitted += 1
+        return submitted
+
+    def _upload(self, job):
+        backend = lazy.get('storage')
+        if job.image is not None:
+            # Hasil encode disimpan di job agar percobaan ulang tidak meng-encode lagi
+            job.image = data = self._encode(job)
+            digest = hashlib.sha256(data).hexdigest()
+            size = len(data)
+            open_source = lambda: io.BytesIO(data)  # noqa: E731
+        else:
+            digest = self._file_digest(job.path)
+            size = os.path.getsize(job.path)
+            open_source = lambda: open(job.path, 'rb')  # noqa: E731
+
+        key = f'{digest[:2]}/{digest}{job.extension}'
+        with self._lock:
+            url = self._known.get((job.bucket, digest))
+        if url is None and backend.exists(job.bucket, key):
+            url = backend.url(job.bucket, key)
+        if url is not None:
+            self._count('deduplicated')
+        else:
+            with open_source() as source:
+                backend.put(job.bucket, key, source, job.content_type)
+            url = backend.url(job.bucket, key)
+            with self._lock:
+                self.uploaded += 1
+                self.bytes_uploaded += size
+        with self._lock:
+            self._known[(job.bucket, digest)] = url
+            self._known.move_to_end((job.bucket, digest))
+            if len(self._known) > KNOWN_HASHES:
+                self._known.popitem(last=False)
+        return url, digest
+
+    def _encode(self, job):
+        if isinstance(job.image, bytes):
+            # Frame yang sudah ter-encode (rekaman/replay) tidak butuh OpenCV
+            return job.image
+        import cv2
+
+        ok, encoded = cv2.imencode('.jpg', job.image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError('Unable to encode detection frame')
+        return encoded.tobytes()
+
+    def _file_digest(self, path):
+        sha = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(self.chunk_size), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def _apply(self, job, url, digest):
+        if self.app is None:
+            return
+        from sqlalchemy import update
+        from app import db
+        from app.models import Evidence, Report
+
+        with self.app.app_context():
+            if job.evidence_id:
+                db.session.execute(
+                    update(Evidence).where(Evidence.id == job.evidence_id).values(file_url=url, content_hash=digest)
+                )
+            if job.report_id:
+                db.session.execute(
+                    update(Report).where(Report.id == job.report_id).values(detection_image_url=url)
+                )
+            db.session.commit()
+
+    def stats(self):
+        values = sorted(self._latencies)
+        return {
+            'inflight': self._inflight,
+            'uploaded': self.uploaded,
+            'deduplicated': self.deduplicated,
+            'superseded': self.superseded,
+            'failed': self.failed,
+            'retried': self.retried,
+            'failed_pending': len(self.failed_jobs()),
+            'bytes_uploaded': self.bytes_uploaded,
+            'p50_ms': round(values[len(values) // 2] * 1000, 1) if values else None,
+            'p99_ms': round(values[min(len(values) - 1, int(0.99 * len(values)))] * 1000, 1) if values else None,
+        }
+
+
+upload_pipeline = UploadPipeline()
@@ -1,3 +1,7 @@
 from app.utils.logger import logger
+from app.utils.query_stats import query_instrumentation, query_budget
+from app.utils.cache import lookup_cache, get_current_user
+from app.utils.database import read_replica, replica_reads
 
-__all__ = ['logger'] 
\ No newline at end of file
+__all__ = ['logger', 'query_instrumentation', 'query_budget', 'lookup_cache', 'get_current_user',
+           'read_replica', 'replica_reads']
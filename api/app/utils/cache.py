@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.utils.database import primary_reads
+from app.utils.lazy import lazy
+from app.utils.metrics import CACHE_EVENTS
+
+log = logging.getLogger('tangkapin.cache')
+
+_MISSING = object()
+INVALIDATION_CHANNEL = 'tangkapin:cache:invalidate'
+
+
+class TTLCache:
+    """LRU in-process dengan TTL per entri.
+
+    generation(key) berubah setiap key tersebut di-delete (atau cache di-clear);
+    set() dengan generation lama diabaikan agar hasil loader yang dimulai
+    sebelum invalidasi tidak menimpa invalidasi tersebut. Invalidasi key lain
+    tidak memengaruhi set() ini.
+    """
+
+    def __init__(self, name, maxsize=10000, ttl=60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Hitungan delete per key; epoch naik saat clear() atau saat dict ini dipangkas
+        self._deleted = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_EVENTS.labels(self.name, 'miss').inc()
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                CACHE_EVENTS.labels(self.name, 'expired').inc()
+                CACHE_EVENTS.labels(self.name, 'miss').inc()
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            CACHE_EVENTS.labels(self.name, 'hit').inc()
+            return value
+
+    def generation(self, key):
+        with self._lock:
+            return self._epoch, self._deleted.get(key, 0)
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._deleted.get(key, 0)):
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+                CACHE_EVENTS.labels(self.name, 'eviction').inc()
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._deleted[key] = self._deleted.get(key, 0) + 1
+            if len(self._deleted) > self.maxsize:
+                # Dipangkas; epoch baru membatalkan semua loader yang sedang berjalan sekali ini
+                self._deleted.clear()
+                self._epoch += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._deleted.clear()
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+@dataclass
+class CachedUser:
+    id: str
+    email: str
+    name: str
+    role: object  # UserRole
+    is_active: bool
+
+    def to_json(self):
+        data = asdict(self)
+        data['role'] = self.role.value
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        from app.models import UserRole
+
+        return cls(**{**data, 'role': UserRole(data['role'])})
+
+
+def _camera_to_dict(camera):
+    return {
+        'id': camera.id,
+        'name': camera.name,
+        'description': camera.description,
+        'location': camera.location,
+        'latitude': camera.latitude,
+        'longitude': camera.longitude,
+        'status': camera.status.value,
+        'is_active': camera.is_active,
+        'last_online': camera.last_online.isoformat() if camera.last_online else None,
+    }
+
+
+class LookupCache:
+    """Read-through cache untuk User dan daftar Camera milik owner.
+
+    Lapisan pertama adalah LRU in-process; bila CACHE_REDIS_URL diisi, Redis
+    dipakai sebagai lapisan bersama antar worker. Invalidasi dijalankan setelah
+    commit untuk setiap User/Camera yang berubah, dan disebarkan ke worker lain
+    lewat pub/sub Redis.
+
+    Nilai di Redis disimpan per generation (`tangkapin:<ns>:<key>:<n>`) dan
+    invalidasi menaikkan `tangkapin:<ns>:<key>:generation`. Loader yang membaca
+    baris lama sebelum commit menulis ke generation yang sudah ditinggalkan,
+    jadi tidak bisa menghidupkan kembali nilai basi.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.users = TTLCache('users')
+        self.cameras = TTLCache('cameras')
+        self.redis_url = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+        self._listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import Camera, User
+
+        self.app = app
+        self.enabled = app.config.get('CACHE_ENABLED', True)
+        size = app.config.get('CACHE_MAX_ENTRIES', 10000)
+        self.users = TTLCache('users', size, app.config.get('CACHE_USER_TTL', 300))
+        self.cameras = TTLCache('cameras', size, app.config.get('CACHE_CAMERA_TTL', 30))
+        self.shared_ttl = app.config.get('CACHE_SHARED_TTL', 300)
+
+        self.redis_url = app.config.get('CACHE_REDIS_URL')
+        if self.redis_url:
+            lazy.register('cache_redis', self._connect)
+
+        if not self._listening:
+            for model in (User, Camera):
+                event.listen(model, 'after_insert', self._mark_dirty)
+                event.listen(model, 'after_update', self._mark_dirty)
+                event.listen(model, 'after_delete', self._mark_dirty)
+            event.listen(Session, 'after_commit', self._flush_dirty)
+            event.listen(Session, 'after_rollback', self._discard_dirty)
+            self._listening = True
+        app.extensions['lookup_cache'] = self
+
+    def _connect(self):
+        import redis
+
+        return redis.Redis.from_url(self.redis_url)
+
+    def _shared(self):
+        """Client Redis proses ini (dibuat saat pertama dipakai), None bila tidak dikonfigurasi"""
+        if not self.redis_url:
+            return None
+        client = lazy.get('cache_redis')
+        if self._listener_pid != os.getpid():
+            with self._listener_lock:
+                if self._listener_pid != os.getpid():
+                    self._listener_pid = os.getpid()
+                    threading.Thread(target=self._listen_invalidations, name='cache-invalidation', daemon=True).start()
+        return client
+
+    # Invalidation
+
+    def _mark_dirty(self, mapper, connection, target):
+        from app.models import Camera
+
+        session = Session.object_session(target)
+        if session is None:
+            return
+        keys = session.info.setdefault('cache_invalidations', set())
+        if isinstance(target, Camera):
+            keys.add(('cameras', target.owner_id))
+            # Kamera yang dipindah ke owner lain
+            for owner_id in inspect(target).attrs.owner_id.history.deleted or ():
+                keys.add(('cameras', owner_id))
+        else:
+            keys.add(('users', target.id))
+            keys.add(('cameras', target.id))
+
+    def _flush_dirty(self, session):
+        keys = session.info.pop('cache_invalidations', None)
+        if keys:
+            self.invalidate(keys)
+
+    def _discard_dirty(self, session):
+        session.info.pop('cache_invalidations', None)
+
+    def invalidate(self, keys):
+        for namespace, key in keys:
+            getattr(self, namespace).delete(key)
+        client = self._shared()
+        if client is not None:
+            try:
+                pipeline = client.pipeline(transaction=False)
+                for namespace, key in keys:
+                    # Tanpa TTL: bila counter hilang dan mulai dari 0 lagi, nilai lama bisa terbaca
+                    pipeline.incr(f'tangkapin:{namespace}:{key}:generation')
+                pipeline.publish(INVALIDATION_CHANNEL, json.dumps(list(keys)))
+                pipeline.execute()
+            except Exception:
+                log.exception('Redis invalidation failed')
+
+    def _listen_invalidations(self):
+        while True:
+            try:
+                pubsub = lazy.get('cache_redis').pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    for namespace, key in json.loads(message['data']):
+                        getattr(self, namespace).delete(key)
+            except Exception:
+                log.exception('Cache invalidation listener disconnected')
+                time.sleep(1)
+
+    # Read-through
+
+    def _read_through(self, cache, key, loader, encode, decode):
+        if not self.enabled:
+            return loader()
+        # Diambil sebelum loader; invalidasi selama loader berjalan membatalkan cache.set
+        generation = cache.generation(key)
+        value = cache.get(key)
+        if value is not _MISSING:
+            return value
+
+        shared_key = None
+        client = self._shared()
+        if client is not None:
+            try:
+                base = f'tangkapin:{cache.name}:{key}'
+                shared_key = f'{base}:{int(client.get(f"{base}:generation") or 0)}'
+                raw = client.get(shared_key)
+                if raw is not None:
+                    value = decode(json.loads(raw))
+                    cache.set(key, value, generation)
+                    return value
+            except Exception:
+                log.exception('Redis read failed for %s:%s', cache.name, key)
+
+        # Hasil loader dibagi ke request lain, jadi jangan dibaca dari replica yang bisa tertinggal
+        with primary_reads():
+            value = loader()
+        if value is None:
+            return None
+        cache.set(key, value, generation)
+        if shared_key is not None:
+            try:
+                client.set(shared_key, json.dumps(encode(value)), ex=self.shared_ttl)
+            except Exception:
+                log.exception('Redis write failed for %s', shared_key)
+        return value
+
+    def get_user(self, user_id):
+        from app import db
+        from app.models import User
+
+        def load():
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            return CachedUser(user.id, user.email, user.name, user.role, user.is_active)
+
+        return self._read_through(self.users, user_id, load, CachedUser.to_json, CachedUser.from_json)
+
+    def get_owner_cameras(self, owner_id):
+        from app.models import Camera
+
+        def load():
+            cameras = Camera.query.filter(Camera.owner_id == owner_id).order_by(Camera.name).all()
+            return [_camera_to_dict(camera) for camera in cameras]
+
+        return self._read_through(self.cameras, owner_id, load, lambda value: value, lambda value: value)
+
+    def stats(self):
+        return {'users': self.users.stats(), 'cameras': self.cameras.stats()}
+
+
+lookup_cache = LookupCache()
+
+
+def get_current_user():
+    """User dari identity JWT, lewat cache. None bila tidak ada atau nonaktif."""
+    from flask_jwt_extended import get_jwt_identity
+
+    user = lookup_cache.get_user(get_jwt_identity())
+    if user is None or not user.is_active:
+        return None
+    return user
@@ -0,0 +1,138 @@
+import functools
+import logging
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.utils.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT
+
+log = logging.getLogger('tangkapin.database')
+
+REPLICA_BIND = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+_timed_pools = {}
+pool_wait_samples = defaultdict(lambda: deque(maxlen=10000))
+
+
+def _timed_pool(bind):
+    """Subclass QueuePool per bind yang mencatat lama menunggu koneksi"""
+    if bind not in _timed_pools:
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return QueuePool._do_get(self)
+            except PoolTimeout:
+                DB_POOL_TIMEOUTS.labels(bind).inc()
+                raise
+            finally:
+                waited = time.perf_counter() - started
+                DB_POOL_WAIT.labels(bind).observe(waited)
+                pool_wait_samples[bind].append(waited)
+                if has_request_context() and g.get('query_stats') is not None:
+                    g.query_stats.pool_wait += waited
+
+        _timed_pools[bind] = type(f'TimedQueuePool_{bind}', (QueuePool,), {'_do_get': _do_get})
+    return _timed_pools[bind]
+
+
+def engine_options(config, url, bind='primary'):
+    """SQLALCHEMY_ENGINE_OPTIONS untuk satu URL database dari konfigurasi DB_*"""
+    if not url:
+        return {}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite' and parsed.database in (None, '', ':memory:'):
+        # SQLite in-memory memakai SingletonThreadPool; opsi pool tidak berlaku
+        return {}
+    options = {
+        'poolclass': _timed_pool(bind),
+        'pool_size': config.get('DB_POOL_SIZE', 8),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 4),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+    }
+    if parsed.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'application_name': f"tangkapin-{bind}"}
+    return options
+
+
+def configure_engines(app):
+    """Isi opsi engine primary dan bind replica sebelum db.init_app"""
+    config = app.config
+    options = config.get('SQLALCHEMY_ENGINE_OPTIONS') or engine_options(config, config.get('SQLALCHEMY_DATABASE_URI'))
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    replica_url = config.get('DB_REPLICA_URL')
+    if replica_url:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {'url': replica_url, **engine_options(config, replica_url, REPLICA_BIND)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def install_statement_timeout(engine, timeout_ms):
+    """Batasi durasi query per koneksi Postgres (DB_STATEMENT_TIMEOUT_MS)"""
+    if not timeout_ms or engine.dialect.name != 'postgresql':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_statement_timeout(dbapi_connection, connection_record):
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f'SET statement_timeout = {int(timeout_ms)}')
+        dbapi_connection.commit()
+
+
+class RoutingSession(Session):
+    """Session yang mengarahkan SELECT ke replica di dalam blok read_replica.
+
+    Begitu session melakukan flush atau DML, semua query berikutnya di session
+    yang sama (satu request) tetap ke primary agar perubahan sendiri langsung
+    terbaca. SELECT ... FOR UPDATE selalu ke primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _use_replica.get() and not self.info.get('wrote'):
+            if clause is not None and getattr(clause, 'is_select', False) \
+                    and getattr(clause, '_for_update_arg', None) is None:
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads():
+    """Blok yang boleh membaca dari replica (data dengan sedikit lag masih dapat diterima)"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Blok yang selalu membaca dari primary, juga di dalam read_replica"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view):
+    """Decorator untuk endpoint baca (dashboard, riwayat, feed)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,77 @@
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger('tangkapin.lazy')
+
+_MISSING = object()
+_fork_callbacks = []
+
+
+def after_fork(callback):
+    """callback() dijalankan di proses anak setelah fork (gunicorn --preload)"""
+    if not _fork_callbacks:
+        os.register_at_fork(after_in_child=_run_fork_callbacks)
+    _fork_callbacks.append(callback)
+
+
+def _run_fork_callbacks():
+    for callback in _fork_callbacks:
+        try:
+            callback()
+        except Exception:
+            log.exception('After-fork callback %r failed', callback)
+
+
+class LazyRegistry:
+    """Komponen berat (client Redis, backend storage, ...) yang dibuat saat pertama dipakai.
+
+    Factory hanya didaftarkan di create_app; import library dan koneksi terjadi
+    pada get() pertama. Instance dicatat per proses: setelah fork, worker membuat
+    instance sendiri alih-alih memakai socket atau pool milik master.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.load_times = {}
+        after_fork(self.reset)
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        if self._pid != os.getpid():
+            self.reset()
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name, _MISSING)
+            if instance is _MISSING:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self.load_times[name] = time.perf_counter() - started
+                self._instances[name] = instance
+                log.info('Loaded %s in %.3fs (pid %d)', name, self.load_times[name], self._pid)
+        return instance
+
+    def registered(self, name):
+        return name in self._factories
+
+    def loaded(self):
+        return sorted(self._instances)
+
+    def reset(self):
+        # Lock bisa saja sedang dipegang thread master saat fork terjadi
+        self._lock = threading.Lock()
+        self._instances = {}
+        self._pid = os.getpid()
+
+
+lazy = LazyRegistry()
@@ -1,15 +1,49 @@
 import os
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import uuid
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import time
-import traceback
-from flask import request, g
+from flask import request, g, has_request_context
+from werkzeug.exceptions import HTTPException
 import sys
 
+from app.utils.lazy import after_fork
+
+
+class RequestIdFilter(logging.Filter):
+    """Menambahkan request_id ke setiap record (dijalankan di thread pemanggil)"""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
 class Logger:
     def __init__(self, app=None):
         self.app = app
         self.logger = logging.getLogger('tangkapin')
+        self.listener = None
+        self._fork_hook = False
         
         if app is not None:
             self.init_app(app)
@@ -22,6 +56,8 @@ class Logger:
         log_level_name = app.config.get('LOG_LEVEL', 'INFO')
         log_max_size = app.config.get('LOG_MAX_SIZE', 10 * 1024 * 1024)  # 10MB
         log_backup_count = app.config.get('LOG_BACKUP_COUNT', 10)
+        log_format = app.config.get('LOG_FORMAT', 'text')
+        log_queue = app.config.get('LOG_QUEUE', True)
         
         # Map string log level to logging constant
         log_level = getattr(logging, log_level_name.upper(), logging.INFO)
@@ -34,6 +70,7 @@ class Logger:
         self.logger.setLevel(log_level)
         
         # Clear any existing handlers
+        self._stop_listener()
         if self.logger.handlers:
             self.logger.handlers.clear()
         
@@ -45,9 +82,12 @@ class Logger:
         )
         
         # Set format for handlers
-        formatter = logging.Formatter(
-            '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-        )
+        if log_format == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '[%(asctime)s] %(levelname)s in %(module)s [%(request_id)s]: %(message)s'
+            )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(log_level)
         
@@ -56,9 +96,26 @@ class Logger:
         console_handler.setFormatter(formatter)
         console_handler.setLevel(log_level)
         
-        # Add handlers to logger
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        request_id_filter = RequestIdFilter()
+        if log_queue:
+            # I/O dan rotasi file berjalan di thread listener, bukan di thread request
+            log_queue_handler = QueueHandler(queue.SimpleQueue())
+            log_queue_handler.addFilter(request_id_filter)
+            self.listener = QueueListener(
+                log_queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self._stop_listener)
+            if not self._fork_hook:
+                # Thread listener tidak ikut ter-fork ke worker gunicorn (--preload)
+                after_fork(self._restart_listener)
+                self._fork_hook = True
+            self.logger.addHandler(log_queue_handler)
+        else:
+            file_handler.addFilter(request_id_filter)
+            console_handler.addFilter(request_id_filter)
+            self.logger.addHandler(file_handler)
+            self.logger.addHandler(console_handler)
         
         # Register request logger
         app.before_request(self._log_request_start)
@@ -70,24 +127,50 @@ class Logger:
         # Make logger available in app context
         app.logger = self.logger
         
-        self.logger.info('Logger initialized with level: %s', log_level_name)
+        self.logger.info('Logger initialized with level: %s (format=%s, queued=%s)', log_level_name, log_format, log_queue)
+    
+    def _stop_listener(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+    
+    def _restart_listener(self):
+        if self.listener is not None:
+            self.listener = QueueListener(
+                self.listener.queue, *self.listener.handlers, respect_handler_level=True
+            )
+            self.listener.start()
     
     def _log_request_start(self):
         g.start_time = time.time()
-        self.logger.info(f"Request started: {request.method} {request.path}")
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        self.logger.info("Request started: %s %s", request.method, request.path)
     
     def _log_request_end(self, response):
         if hasattr(g, 'start_time'):
             elapsed_time = time.time() - g.start_time
-            self.logger.info(
-                f"Request completed: {request.method} {request.path} "
-                f"- Status: {response.status_code} - Duration: {elapsed_time:.4f}s"
-            )
+            query_stats = g.get('query_stats')
+            if query_stats:
+                self.logger.info(
+                    "Request completed: %s %s - Status: %s - Duration: %.4fs - Queries: %d (%.4fs)",
+                    request.method, request.path, response.status_code, elapsed_time,
+                    query_stats.count, query_stats.duration,
+                )
+            else:
+                self.logger.info(
+                    "Request completed: %s %s - Status: %s - Duration: %.4fs",
+                    request.method, request.path, response.status_code, elapsed_time,
+                )
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
         return response
     
     def _log_exception(self, exception):
-        self.logger.error(f"Exception on {request.path}: {str(exception)}\n{traceback.format_exc()}")
+        # Error HTTP (404, 413 dari MAX_CONTENT_LENGTH, ...) dikembalikan apa adanya, bukan 500
+        if isinstance(exception, HTTPException):
+            return exception
+        self.logger.exception("Exception on %s: %s", request.path, exception)
         return {"error": "Internal server error"}, 500
 
 # Create a global logger instance
-logger = Logger() 
\ No newline at end of file
+logger = Logger()
@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# Di gunicorn, PROMETHEUS_MULTIPROC_DIR di-set oleh gunicorn.conf.py sebelum app
+# dimuat agar nilai setiap worker ditulis ke file dan dijumlahkan saat /metrics dibaca.
+
+log = logging.getLogger('tangkapin.metrics')
+
+REQUEST_LATENCY = Histogram(
+    'tangkapin_http_request_duration_seconds',
+    'HTTP request latency',
+    ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'tangkapin_http_request_db_queries',
+    'Database queries per HTTP request',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'tangkapin_db_pool_checked_out', 'Connections checked out of the pool', multiprocess_mode='livesum'
+)
+DB_POOL_SIZE = Gauge('tangkapin_db_pool_size', 'Configured pool size', multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = Gauge('tangkapin_db_pool_overflow', 'Overflow connections in use', multiprocess_mode='livesum')
+DB_POOL_WAIT = Histogram(
+    'tangkapin_db_pool_wait_seconds',
+    'Time spent waiting for a pooled connection',
+    ['bind'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_TIMEOUTS = Counter('tangkapin_db_pool_timeouts_total', 'Pool checkouts that hit pool_timeout', ['bind'])
+
+REPORTS_CREATED = Counter('tangkapin_reports_created_total', 'Reports created', ['automatic'])
+DETECTIONS_OVER_THRESHOLD = Counter(
+    'tangkapin_detections_over_threshold_total', 'Raw detections above DETECTION_CONFIDENCE_THRESHOLD', ['weapon_type']
+)
+NOTIFICATION_QUEUE_DEPTH = Gauge(
+    'tangkapin_notification_queue_depth', 'Messages waiting in the notification queue', multiprocess_mode='livesum'
+)
+EVENT_STREAM_SUBSCRIBERS = Gauge(
+    'tangkapin_event_stream_subscribers', 'Open SSE connections', multiprocess_mode='livesum'
+)
+CACHE_EVENTS = Counter('tangkapin_cache_events_total', 'Lookup cache hits, misses and evictions', ['cache', 'event'])
+REPORT_TO_ASSIGNMENT = Histogram(
+    'tangkapin_report_to_first_assignment_seconds',
+    'Time from Report.created_at until the report is first ASSIGNED',
+    buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
+
+
+def _record_report_created(mapper, connection, target):
+    REPORTS_CREATED.labels(automatic=str(bool(target.is_automatic)).lower()).inc()
+
+
+def _record_first_assignment(mapper, connection, target):
+    """Report yang berpindah dari NEW/VERIFIED ke ASSIGNED; tanpa query tambahan per Assignment"""
+    from app.models import ReportStatus
+    from app.services.aggregates import _history
+
+    old_status, new_status = _history(target, 'status')
+    if new_status == ReportStatus.ASSIGNED and old_status in (ReportStatus.NEW, ReportStatus.VERIFIED) \
+            and target.created_at is not None:
+        REPORT_TO_ASSIGNMENT.observe(max(0.0, (datetime.utcnow() - target.created_at).total_seconds()))
+
+
+class Metrics:
+    """Registry metrik Prometheus dan endpoint /metrics"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self._listening = False
+        self._sampler_pid = None
+        self._sampler_lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import Report
+
+        self.app = app
+        self.sample_interval = app.config.get('METRICS_SAMPLE_INTERVAL', 15)
+        app.after_request(self._observe_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self.export)
+
+        if not self._listening:
+            event.listen(Report, 'after_insert', _record_report_created)
+            event.listen(Report, 'after_update', _record_first_assignment)
+            self._listening = True
+
+    def _observe_request(self, response):
+        if request.endpoint == 'metrics':
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        if 'start_time' in g:
+            REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(time.time() - g.start_time)
+        query_stats = g.get('query_stats')
+        if query_stats is not None:
+            DB_QUERIES.labels(route).observe(query_stats.count)
+        if self._sampler_pid != os.getpid() and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            self._start_sampler()
+        return response
+
+    def _start_sampler(self):
+        """Scrape hanya sampai ke satu worker; worker lain menyegarkan gauge-nya sendiri"""
+        with self._sampler_lock:
+            if self._sampler_pid == os.getpid():
+                return
+            self._sampler_pid = os.getpid()
+        threading.Thread(target=self._run_sampler, name='metrics-sampler', daemon=True).start()
+
+    def _run_sampler(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self._sample_gauges()
+            except Exception:
+                log.exception('Gauge sampling failed')
+            time.sleep(self.sample_interval)
+
+    def _sample_gauges(self):
+        from app import db
+        from app.services.events import event_gateway
+        from app.services.notifications import notification_dispatcher
+
+        pool = db.engine.pool
+        if hasattr(pool, 'checkedout'):
+            DB_POOL_CHECKED_OUT.set(pool.checkedout())
+            DB_POOL_SIZE.set(pool.size())
+            DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+        NOTIFICATION_QUEUE_DEPTH.set(notification_dispatcher.depth())
+        EVENT_STREAM_SUBSCRIBERS.set(event_gateway.subscriber_count())
+
+    def export(self):
+        self._sample_gauges()
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+metrics = Metrics()
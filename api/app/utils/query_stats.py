@@ -0,0 +1,126 @@
+import logging
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger('tangkapin.queries')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.pool_wait = 0.0
+        self.statements = Counter()
+
+    def repeated(self, threshold):
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+
+def query_budget(limit):
+    """Decorator: batas jumlah query untuk satu endpoint"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class QueryInstrumentation:
+    """Menghitung query dan waktu DB per request lewat event SQLAlchemy.
+
+    Statement identik yang berulang di satu request (pola N+1 dari relasi
+    lazy='dynamic') dicatat sebagai warning. Bila QUERY_BUDGET_ENFORCE aktif,
+    request yang melewati budget-nya akan gagal dengan QueryBudgetExceeded.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.repeat_threshold = app.config.get('QUERY_REPEAT_THRESHOLD', 5)
+        self.default_budget = app.config.get('QUERY_BUDGET')
+        self.enforce = app.config.get('QUERY_BUDGET_ENFORCE', app.testing)
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            self._listening = True
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context():
+            return
+        started = conn.info.get('query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = g.get('query_stats')
+        if stats is None:
+            return
+        stats.count += 1
+        stats.duration += elapsed
+        stats.statements[statement] += 1
+
+    def _handle_error(self, context):
+        # Statement yang gagal tidak sampai ke after_cursor_execute; buang waktu mulainya
+        # agar tidak terpasang ke query berikutnya di koneksi (pool) yang sama
+        connection = context.connection
+        if connection is None:
+            return
+        started = connection.info.get('query_started')
+        if started:
+            started.pop()
+
+    def _start_request(self):
+        g.query_stats = QueryStats()
+
+    def _budget_for_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, 'query_budget', self.default_budget)
+
+    def _finish_request(self, response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        repeated = stats.repeated(self.repeat_threshold)
+        for statement, n in repeated:
+            log.warning('Possible N+1 on %s %s: statement executed %d times: %s',
+                        request.method, request.path, n, ' '.join(statement.split())[:300])
+
+        timing = [f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"']
+        if stats.pool_wait:
+            timing.append(f'pool;dur={stats.pool_wait * 1000:.2f}')
+        if 'start_time' in g:
+            timing.append(f'app;dur={(time.time() - g.start_time) * 1000:.2f}')
+        response.headers.add('Server-Timing', ', '.join(timing))
+
+        budget = self._budget_for_request()
+        if budget is not None and stats.count > budget:
+            message = f'{request.method} {request.path} ran {stats.count} queries (budget {budget})'
+            if self.enforce:
+                raise QueryBudgetExceeded(message)
+            log.warning('Query budget exceeded: %s', message)
+        return response
+
+
+query_instrumentation = QueryInstrumentation()
@@ -0,0 +1,72 @@
+"""DB round-trips and latency per authenticated request with and without the lookup cache.
+
+    python -m benchmarks.cache_lookup --owners 200 --requests 5000
+"""
+import argparse
+import random
+import re
+import time
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks.common import create_bench_app, emit, latency_summary
+from benchmarks.seed import seed_cameras, seed_users
+from app import db
+from app.models import UserRole
+
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def run(database_url, cache_enabled, owner_ids, requests, seed):
+    app = create_bench_app(database_url, CACHE_ENABLED=cache_enabled, LOG_LEVEL='WARNING')
+    with app.app_context():
+        tokens = {owner_id: create_access_token(identity=owner_id) for owner_id in owner_ids}
+    client = app.test_client()
+    rng = random.Random(seed)
+    # Owner aktif mengikuti distribusi miring seperti aplikasi yang polling
+    hot = owner_ids[:max(1, len(owner_ids) // 10)]
+
+    latencies, queries = [], []
+    for _ in range(requests):
+        owner_id = rng.choice(hot) if rng.random() < 0.8 else rng.choice(owner_ids)
+        started = time.perf_counter()
+        response = client.get('/api/cameras', headers={'Authorization': f'Bearer {tokens[owner_id]}'})
+        latencies.append(time.perf_counter() - started)
+        match = QUERY_COUNT.search(response.headers.get('Server-Timing', ''))
+        queries.append(int(match.group(1)) if match else 0)
+
+    from app.utils.cache import lookup_cache
+    return {
+        'queries_per_request': round(sum(queries) / len(queries), 3),
+        'latency': latency_summary(latencies),
+        'cache': lookup_cache.stats() if cache_enabled else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default='sqlite:///benchmarks_cache.db')
+    parser.add_argument('--owners', type=int, default=200)
+    parser.add_argument('--cameras-per-owner', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url, LOG_LEVEL='WARNING')
+    with app.app_context():
+        db.create_all()
+        rng = random.Random(args.seed)
+        owner_ids = seed_users(args.owners, UserRole.OWNER, rng)
+        seed_cameras(owner_ids, args.cameras_per_owner, rng)
+
+    emit({
+        'owners': args.owners,
+        'requests': args.requests,
+        'uncached': run(args.database_url, False, owner_ids, args.requests, args.seed),
+        'cached': run(args.database_url, True, owner_ids, args.requests, args.seed),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
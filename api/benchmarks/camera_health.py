@@ -0,0 +1,139 @@
+"""Probe throughput of the camera health monitor against local fake RTSP/HTTP endpoints.
+
+    python -m benchmarks.camera_health --cameras 5000 --rounds 3 --hang-rate 0.05 --dead-rate 0.05
+
+Setiap kamera mendapat alamat loopback sendiri (127.0.x.y) agar batas per host
+berlaku seperti pada deployment dengan banyak NVR.
+"""
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+
+from benchmarks.common import emit, latency_summary
+from app.services.health import CameraHealthMonitor, ProbeTarget
+from config import Config
+
+
+async def _rtsp_handler(reader, writer):
+    request = await reader.readuntil(b'\r\n\r\n')
+    cseq = next((line.split(b':', 1)[1].strip() for line in request.split(b'\r\n') if line.startswith(b'CSeq')), b'1')
+    writer.write(b'RTSP/1.0 200 OK\r\nCSeq: ' + cseq + b'\r\nPublic: OPTIONS, DESCRIBE, SETUP, PLAY\r\n\r\n')
+    await writer.drain()
+    writer.close()
+
+
+async def _http_handler(reader, writer):
+    await reader.readuntil(b'\r\n\r\n')
+    # Seperti kamera MJPEG: header lalu body yang tidak pernah selesai
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=frame\r\n\r\n--frame\r\n')
+    await writer.drain()
+    await asyncio.sleep(1)
+    writer.close()
+
+
+async def _hang_handler(reader, writer):
+    await asyncio.sleep(3600)
+
+
+def start_fake_endpoints():
+    """Jalankan server RTSP, HTTP dan server yang tidak pernah menjawab di thread terpisah"""
+    loop = asyncio.new_event_loop()
+    ports = {}
+    ready = threading.Event()
+
+    async def serve():
+        for name, handler in (('rtsp', _rtsp_handler), ('http', _http_handler), ('hang', _hang_handler)):
+            server = await asyncio.start_server(handler, '0.0.0.0', 0, backlog=4096)
+            ports[name] = server.sockets[0].getsockname()[1]
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, name='fake-cameras', daemon=True).start()
+    ready.wait()
+    return ports
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def build_targets(count, ports, hang_rate, dead_rate, http_share):
+    dead_port = unused_port()
+    targets = []
+    for i in range(count):
+        host = f'127.0.{i // 250}.{i % 250 + 1}'
+        roll = random.random()
+        if roll < hang_rate:
+            url = f'rtsp://{host}:{ports["hang"]}/stream'
+        elif roll < hang_rate + dead_rate:
+            url = f'rtsp://{host}:{dead_port}/stream'
+        elif random.random() < http_share:
+            url = f'http://{host}:{ports["http"]}/video.mjpg'
+        else:
+            url = f'rtsp://{host}:{ports["rtsp"]}/stream'
+        targets.append(ProbeTarget(f'cam-{i}', f'owner-{i % 100}', f'Camera {i}', url, online=True))
+    return targets
+
+
+async def run_rounds(monitor, targets, rounds):
+    await monitor.open()
+    durations = []
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await monitor.probe_round(targets)
+            durations.append(time.perf_counter() - started)
+    finally:
+        await monitor.close()
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cameras', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=Config.HEALTH_CHECK_CONCURRENCY)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    parser.add_argument('--hang-rate', type=float, default=0.05, help='Endpoints that accept but never answer')
+    parser.add_argument('--dead-rate', type=float, default=0.05, help='Endpoints that refuse connections')
+    parser.add_argument('--http-share', type=float, default=0.3, help='Share of live cameras using HTTP/MJPEG')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    ports = start_fake_endpoints()
+    targets = build_targets(args.cameras, ports, args.hang_rate, args.dead_rate, args.http_share)
+
+    config = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    config.update({'HEALTH_CHECK_CONCURRENCY': args.concurrency, 'HEALTH_CHECK_TIMEOUT': args.timeout})
+    monitor = CameraHealthMonitor()
+    monitor.configure(config)
+    monitor.started_at = time.monotonic()
+
+    durations = asyncio.run(run_rounds(monitor, targets, args.rounds))
+    stats = monitor.stats()
+    emit({
+        'cameras': args.cameras,
+        'rounds': args.rounds,
+        'concurrency': args.concurrency,
+        'timeout_s': args.timeout,
+        'round_seconds': [round(d, 3) for d in durations],
+        'probes_per_second': round(args.cameras * args.rounds / sum(durations), 1),
+        'probe_latency': latency_summary(list(monitor._latencies)),
+        'probe_failures': stats['probe_failures'],
+        # Hanya perubahan status yang akan ditulis ke database
+        'pending_transitions': len(monitor._pending),
+        'offline': sum(1 for t in targets if not t.online),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
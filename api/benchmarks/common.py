@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+
+# Benchmark dijalankan dari direktori api/: python -m benchmarks.<nama>
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def create_bench_app(database_url=None, **overrides):
+    from app import create_app
+
+    overrides['SQLALCHEMY_DATABASE_URI'] = database_url or os.environ.get('DATABASE_URL') or 'sqlite:///benchmarks.db'
+    overrides.setdefault('LOG_DIRECTORY', os.path.join('logs', 'benchmarks'))
+    return create_app(overrides)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def latency_summary(values):
+    """Ringkasan p50/p95/p99 dalam milidetik"""
+    return {
+        'count': len(values),
+        'p50_ms': _ms(percentile(values, 50)),
+        'p95_ms': _ms(percentile(values, 95)),
+        'p99_ms': _ms(percentile(values, 99)),
+        'max_ms': _ms(max(values) if values else None),
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+def emit(result, output=None):
+    text = json.dumps(result, indent=2, default=str)
+    if output:
+        with open(output, 'w') as fh:
+            fh.write(text)
+    print(text)
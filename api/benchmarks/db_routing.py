@@ -0,0 +1,121 @@
+"""Check read-replica routing and measure pool wait under thread contention.
+
+    python -m benchmarks.db_routing --threads 16 --pool-size 8 --queries 200
+
+Primary dan replica memakai dua file SQLite terpisah (atau DATABASE_URL /
+DATABASE_REPLICA_URL) sehingga terlihat query mana yang dilayani replica.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, select, text
+
+from benchmarks.common import create_bench_app, emit, latency_summary
+
+
+def _counting(engine, counter, name):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter[name] += 1
+
+
+def check_routing(app):
+    from app import db
+    from app.models import User, UserRole
+    from app.utils.database import replica_reads
+
+    counter = {'primary': 0, 'replica': 0}
+    with app.app_context():
+        _counting(db.engines[None], counter, 'primary')
+        _counting(db.engines['replica'], counter, 'replica')
+
+    def routed(fn):
+        before = dict(counter)
+        with app.app_context():
+            fn()
+            db.session.rollback()
+        return {k: counter[k] - before[k] for k in counter}
+
+    results = {}
+    results['outside_block'] = routed(lambda: db.session.execute(select(User)).all())
+    with replica_reads():
+        results['read_only'] = routed(lambda: db.session.execute(select(User)).all())
+        results['for_update'] = routed(lambda: db.session.execute(select(User).with_for_update()).all())
+
+        def write_then_read():
+            db.session.add(User(email=f'bench-{time.time_ns()}@example.com', password_hash='x',
+                                name='Bench', role=UserRole.OWNER))
+            db.session.flush()
+            db.session.execute(select(User)).all()
+
+        results['read_after_write'] = routed(write_then_read)
+    return results
+
+
+def contend(app, threads, queries, hold):
+    from app import db
+    from app.utils.database import pool_wait_samples
+
+    pool_wait_samples.clear()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        for _ in range(queries):
+            with app.app_context():
+                db.session.execute(text('SELECT 1')).all()
+                time.sleep(hold)  # Simulasi kerja request selama koneksi dipegang
+                db.session.remove()
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    samples = list(pool_wait_samples['primary'])
+    return {
+        'threads': threads,
+        'checkouts': len(samples),
+        'throughput_qps': round(threads * queries / elapsed, 1),
+        'pool_wait': latency_summary(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--max-overflow', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--hold-ms', type=float, default=2.0)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='db-routing-')
+    primary = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(workdir, "primary.db")}'
+    replica = os.environ.get('DATABASE_REPLICA_URL') or f'sqlite:///{os.path.join(workdir, "replica.db")}'
+    app = create_bench_app(
+        primary, DB_REPLICA_URL=replica, DB_POOL_SIZE=args.pool_size, DB_MAX_OVERFLOW=args.max_overflow,
+    )
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            db.metadata.create_all(engine)
+
+    emit({
+        'routing': check_routing(app),
+        'pool_size': args.pool_size,
+        'max_overflow': args.max_overflow,
+        'contention': [contend(app, n, args.queries, args.hold_ms / 1000)
+                       for n in sorted({args.pool_size, args.threads})],
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
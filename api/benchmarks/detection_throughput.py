@@ -0,0 +1,106 @@
+"""Throughput benchmark for the detection pipeline using recorded video files.
+
+Each video file is played back as a separate camera. Example:
+
+    python -m benchmarks.detection_throughput videos/*.mp4 --duration 60
+"""
+import argparse
+import time
+
+from benchmarks.common import emit, latency_summary
+from app.services.detection import CameraStream, DetectionPipeline, YoloBackend
+from app.services.inference import InferenceEngine
+from config import Config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('videos', nargs='+', help='Recorded video files, one per simulated camera')
+    parser.add_argument('--cameras', type=int, default=0, help='Simulated cameras (videos are reused round-robin)')
+    parser.add_argument('--model', default=Config.ML_MODEL_PATH)
+    parser.add_argument('--device', default=Config.DETECTION_DEVICE)
+    parser.add_argument('--threshold', type=float, default=Config.DETECTION_CONFIDENCE_THRESHOLD)
+    parser.add_argument('--workers', type=int, default=0, help='Inference processes (0 = in-thread model)')
+    parser.add_argument('--batch-size', type=int, default=Config.DETECTION_BATCH_SIZE)
+    parser.add_argument('--batch-timeout', type=float, default=Config.DETECTION_BATCH_TIMEOUT)
+    parser.add_argument('--max-fps', type=float, default=Config.DETECTION_MAX_FPS)
+    parser.add_argument('--motion-threshold', type=float, default=Config.DETECTION_MOTION_THRESHOLD)
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--no-realtime', action='store_true', help='Read files as fast as possible')
+    parser.add_argument('--output', help='Write JSON result to this file')
+    args = parser.parse_args()
+
+    if args.workers:
+        backend = InferenceEngine()
+        backend.configure({
+            'ML_MODEL_PATH': args.model,
+            'DETECTION_DEVICE': args.device,
+            'DETECTION_BATCH_SIZE': args.batch_size,
+            'INFERENCE_WORKERS': args.workers,
+            'INFERENCE_QUEUE_SIZE': Config.INFERENCE_QUEUE_SIZE,
+            'INFERENCE_MAX_FRAME_BYTES': Config.INFERENCE_MAX_FRAME_BYTES,
+            'INFERENCE_TIMEOUT': Config.INFERENCE_TIMEOUT,
+        })
+    else:
+        backend = YoloBackend(args.model, args.device)
+    load_started = time.time()
+    backend.load()
+    load_seconds = time.time() - load_started
+
+    pipeline = DetectionPipeline(
+        backend,
+        lambda frame, detection: None,
+        threshold=args.threshold,
+        batch_size=args.batch_size,
+        batch_timeout=args.batch_timeout,
+        concurrency=max(1, args.workers),
+    )
+    pipeline.start()
+
+    count = args.cameras or len(args.videos)
+    streams = [
+        CameraStream(
+            f'bench-{i}', args.videos[i % len(args.videos)], pipeline,
+            max_fps=args.max_fps,
+            motion_threshold=args.motion_threshold,
+            idle_interval=Config.DETECTION_IDLE_INTERVAL,
+            realtime=not args.no_realtime,
+        )
+        for i in range(count)
+    ]
+    started = time.time()
+    for stream in streams:
+        stream.start()
+
+    deadline = started + args.duration
+    while time.time() < deadline and any(stream.alive for stream in streams):
+        time.sleep(0.5)
+    for stream in streams:
+        stream.stop()
+    for stream in streams:
+        stream.join(5)
+    pipeline.stop(timeout=30)
+    if args.workers:
+        backend.stop()
+    elapsed = time.time() - started
+
+    stats = pipeline.stats.snapshot()
+    emit({
+        'cameras': count,
+        'workers': args.workers,
+        'batch_size': args.batch_size,
+        'max_fps': args.max_fps,
+        'elapsed_s': round(elapsed, 3),
+        'model_load_s': round(load_seconds, 3),
+        'frames_read_per_s': round(stats['frames_read'] / elapsed, 2),
+        'frames_inferred_per_s': round(stats['frames_inferred'] / elapsed, 2),
+        'avg_batch': round(stats['frames_inferred'] / stats['batches'], 2) if stats['batches'] else 0,
+        'inference_busy_ratio': round(stats['inference_seconds'] / elapsed, 3),
+        'counters': {k: v for k, v in stats.items() if not k.endswith('latencies')},
+        'frame_latency': latency_summary(stats['frame_latencies']),
+        'alert_latency': latency_summary(stats['alert_latencies']),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
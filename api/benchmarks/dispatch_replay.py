@@ -0,0 +1,379 @@
+"""End-to-end replay of detections and GPS pings through detection -> Report -> Assignment -> Notification.
+
+    python -m benchmarks.dispatch_replay --owners 2000 --officers 500 --duration 300 --incidents 400 --speed 10
+    python -m benchmarks.dispatch_replay --record traces/city.jsonl --duration 600 --incidents 1000
+    python -m benchmarks.dispatch_replay --trace traces/city.jsonl --output results.json --compare baseline.json
+
+Berjalan tanpa jaringan: database SQLite baru di direktori temp (atau
+--database-url), Pusher diganti server HTTP lokal yang mencatat waktu terima
+tiap event, dan storage memakai backend local. Deteksi masuk lewat
+detection_coalescer.handle seperti dari DetectionPipeline (tanpa model ML);
+laporan baru di-assign ke petugas terdekat dari spatial_index seperti yang
+dilakukan admin, lalu petugas dinotifikasi lewat notification_dispatcher.
+
+Latensi dihitung dari jadwal event di trace (bukan saat event benar-benar
+diproses), jadi antrian akibat sistem yang lambat ikut terukur. Dengan
+--compare, p95 dan throughput tiap stage dibandingkan dengan hasil sebelumnya
+dan proses keluar dengan kode 1 bila ada regresi di atas --tolerance.
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import create_bench_app, emit, latency_summary
+from benchmarks.seed import seed_cameras, seed_users
+from benchmarks.traces import generate_trace, read_trace, synthetic_frames, write_trace
+
+SCHEMA_VERSION = 1
+
+
+class LocalPusher(BaseHTTPRequestHandler):
+    """Pengganti Pusher HTTP API; mencatat kapan event pertama untuk tiap (event, reference_id) diterima"""
+
+    received = {}
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        now = time.monotonic()
+        events = body.get('batch') or [body]
+        with self.lock:
+            LocalPusher.requests += 1
+            for event in events:
+                reference_id = json.loads(event['data']).get('reference_id')
+                self.received.setdefault((event['name'], reference_id), now)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def summary(self, elapsed):
+        return {
+            stage: {'per_second': round(len(values) / elapsed, 2), **latency_summary(values)}
+            for stage, values in sorted(self.samples.items())
+        }
+
+
+class Replay:
+    def __init__(self, app, cameras, officers, admin_id, frames, args):
+        from app.services import detection_coalescer, location_tracker, notification_dispatcher, spatial_index
+
+        self.app = app
+        self.cameras = cameras
+        self.officers = officers
+        self.admin_id = admin_id
+        self.frames = frames
+        self.speed = args.speed
+        self.dispatch_radius = args.dispatch_radius
+        self.assignment_seconds = args.assignment_seconds
+        self.coalescer = detection_coalescer
+        self.locations = location_tracker
+        self.notifications = notification_dispatcher
+        self.spatial = spatial_index
+        self.timer = StageTimer()
+        self.workers = ThreadPoolExecutor(args.threads, thread_name_prefix='replay')
+        self.dispatch_queue = queue.Queue()
+        self.dispatchers = [
+            threading.Thread(target=self._dispatch_loop, name=f'dispatch-{i}', daemon=True)
+            for i in range(args.dispatch_threads)
+        ]
+        self.reports = {}  # report_id -> waktu jadwal deteksi pertama
+        self.assigned = {}  # report_id -> waktu commit Assignment
+        self.unassigned = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def run(self, events):
+        from app.services.detection import Detection, Frame
+
+        for thread in self.dispatchers:
+            thread.start()
+        self.spatial.start()
+        base_epoch = time.time()
+        started = time.monotonic()
+        for event in events:
+            due = started + (event['t'] / self.speed if self.speed else 0)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if event['kind'] == 'detection':
+                frame = Frame(
+                    self.cameras[event['camera'] % len(self.cameras)],
+                    self.frames[event.get('frame', 0) % len(self.frames)],
+                    # Window coalescer mengikuti waktu trace, tidak bergantung pada --speed
+                    captured_at=base_epoch + event['t'],
+                )
+                detection = Detection(event['label'], event['confidence'], (0, 0, 0, 0))
+                self.workers.submit(self._detect, frame, detection, due)
+            elif event['kind'] == 'pings':
+                self.workers.submit(self._ping, self.officers[event['officer'] % len(self.officers)],
+                                    event['pings'], due)
+        self.workers.shutdown(wait=True)
+        self.dispatch_queue.join()
+        return time.monotonic() - started
+
+    def _detect(self, frame, detection, due):
+        try:
+            report_id = self.coalescer.handle(frame, detection)
+            done = time.monotonic()
+            if report_id is None:
+                return
+            with self._lock:
+                new = report_id not in self.reports
+                if new:
+                    self.reports[report_id] = due
+            if new:
+                self.timer.record('detection_to_report', done - due)
+                self.dispatch_queue.put((report_id, done))
+            else:
+                self.timer.record('detection_coalesced', done - due)
+        except Exception:
+            self.errors += 1
+            self.app.logger.exception('Detection replay failed for camera %s', frame.camera_id)
+
+    def _ping(self, officer_id, pings, due):
+        now = datetime.utcnow()
+        batch = [
+            {'latitude': lat, 'longitude': lon, 'accuracy': accuracy, 'recorded_at': now + timedelta(seconds=offset)}
+            for offset, lat, lon, accuracy in pings
+        ]
+        try:
+            self.locations.ingest(officer_id, batch)
+        except Exception:
+            self.errors += 1
+            self.app.logger.exception('Ping replay failed for officer %s', officer_id)
+            return
+        self.timer.record('ping_ingest', time.monotonic() - due)
+
+    def _dispatch_loop(self):
+        while True:
+            report_id, created = self.dispatch_queue.get()
+            try:
+                self._assign(report_id, created)
+            except Exception:
+                self.errors += 1
+                self.app.logger.exception('Dispatch failed for %s', report_id)
+            finally:
+                self.dispatch_queue.task_done()
+
+    def _assign(self, report_id, created):
+        from app import db
+        from app.models import Assignment, NotificationType, Report, ReportStatus
+
+        location = self.spatial.report_location(report_id)
+        candidates = self.spatial.nearest_available_officers(*location, k=1, max_km=self.dispatch_radius) \
+            if location else []
+        if not candidates:
+            with self._lock:
+                self.unassigned += 1
+            return
+        distance, officer_id = candidates[0]
+        self.spatial.mark_busy(officer_id)
+        with self.app.app_context():
+            report = db.session.get(Report, report_id)
+            title = report.title
+            report.status = ReportStatus.ASSIGNED
+            db.session.add(Assignment(report_id=report_id, officer_id=officer_id, assigned_by=self.admin_id))
+            db.session.commit()
+        committed = time.monotonic()
+        with self._lock:
+            self.assigned[report_id] = committed
+        self.timer.record('report_to_assignment', committed - created)
+        self.notifications.notify(
+            [officer_id], title=f'Assignment: {title}', message=f'{distance:.2f} km away',
+            notification_type=NotificationType.ASSIGNMENT, reference_id=report_id, event='assignment',
+        )
+        # Petugas kembali tersedia setelah tugas selesai (dalam waktu trace)
+        release = threading.Timer(self.assignment_seconds / (self.speed or 1), self.spatial.mark_available, [officer_id])
+        release.daemon = True
+        release.start()
+
+    def notification_stages(self):
+        """Gabungkan waktu terima di LocalPusher dengan waktu deteksi/assignment"""
+        with LocalPusher.lock:
+            received = dict(LocalPusher.received)
+        for report_id, due in self.reports.items():
+            alert = received.get(('detection_alert', report_id))
+            if alert is not None:
+                self.timer.record('detection_to_owner_alert', alert - due)
+            notified = received.get(('assignment', report_id))
+            if notified is not None:
+                self.timer.record('assignment_to_officer_push', notified - self.assigned[report_id])
+                self.timer.record('detection_to_officer_push', notified - due)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(result, baseline, tolerance):
+    """Stage yang p95-nya naik atau throughput-nya turun lebih dari tolerance"""
+    regressions = []
+    for stage, current in result['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        if previous.get('p95_ms') and current['p95_ms'] is not None \
+                and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append({'stage': stage, 'metric': 'p95_ms',
+                                'baseline': previous['p95_ms'], 'current': current['p95_ms']})
+        if previous.get('per_second') and current['per_second'] < previous['per_second'] * (1 - tolerance):
+            regressions.append({'stage': stage, 'metric': 'per_second',
+                                'baseline': previous['per_second'], 'current': current['per_second']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Default: SQLite baru di direktori temp')
+    parser.add_argument('--owners', type=int, default=2000)
+    parser.add_argument('--cameras-per-owner', type=int, default=3)
+    parser.add_argument('--officers', type=int, default=500)
+    parser.add_argument('--trace', help='Replay a recorded JSONL trace instead of generating one')
+    parser.add_argument('--record', help='Only generate a trace to this path and exit')
+    parser.add_argument('--duration', type=float, default=300, help='Trace length in seconds')
+    parser.add_argument('--incidents', type=int, default=400)
+    parser.add_argument('--ping-interval', type=float, default=5.0)
+    parser.add_argument('--pings-per-batch', type=int, default=1)
+    parser.add_argument('--speed', type=float, default=10, help='Replay speed-up; 0 = as fast as possible')
+    parser.add_argument('--threads', type=int, default=8, help='Threads handling detections and pings')
+    parser.add_argument('--dispatch-threads', type=int, default=2)
+    parser.add_argument('--dispatch-radius', type=float, default=None, help='Max km to an officer')
+    parser.add_argument('--assignment-seconds', type=float, default=600, help='Trace seconds an officer stays busy')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    parser.add_argument('--compare', help='Previous result JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    cameras_total = args.owners * args.cameras_per_owner
+    if args.record:
+        events = generate_trace(cameras_total, args.officers, args.duration, args.incidents,
+                                args.ping_interval, args.pings_per_batch, seed=args.seed)
+        write_trace(args.record, events)
+        print(f'Wrote {len(events)} events to {args.record}', file=sys.stderr)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='dispatch-replay-')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LocalPusher)
+    threading.Thread(target=server.serve_forever, name='local-pusher', daemon=True).start()
+    app = create_bench_app(
+        args.database_url or f'sqlite:///{os.path.join(workdir, "replay.db")}',
+        LOG_DIRECTORY=os.path.join(workdir, 'logs'),
+        LOG_LEVEL='WARNING',
+        PUSHER_HOST=f'http://127.0.0.1:{server.server_port}',
+        STORAGE_BACKEND='local',
+        STORAGE_DIRECTORY=os.path.join(workdir, 'storage'),
+        STORAGE_PUBLIC_URL=None,
+        UPLOAD_SPOOL_DIRECTORY=os.path.join(workdir, 'spool'),
+        NOTIFICATION_RETRY_BACKOFF=0.05,
+    )
+
+    from app import db
+    from app.models import CameraStatus, UserRole
+    from app.services import detection_coalescer, location_tracker, notification_dispatcher, upload_pipeline
+
+    rng = random.Random(args.seed)
+    seed_started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        owner_ids = seed_users(args.owners, UserRole.OWNER, rng)
+        cameras = seed_cameras(owner_ids, args.cameras_per_owner, rng, online_ratio=1.0)
+        officer_ids = seed_users(args.officers, UserRole.OFFICER, rng)
+        admin_id = seed_users(1, UserRole.ADMIN, rng)[0]
+        dialect = db.engine.dialect.name
+    seed_seconds = time.perf_counter() - seed_started
+
+    if args.trace:
+        events = read_trace(args.trace)
+    else:
+        events = generate_trace(cameras_total, args.officers, args.duration, args.incidents,
+                                args.ping_interval, args.pings_per_batch, seed=args.seed)
+
+    replay = Replay(app, [camera_id for camera_id, _ in cameras], officer_ids, admin_id,
+                    synthetic_frames(64, seed=args.seed), args)
+    elapsed = replay.run(events)
+
+    # Tutup semua insiden dan kosongkan antrian latar belakang sebelum menghitung hasil
+    detection_coalescer.flush()
+    upload_pipeline.drain(timeout=120)
+    location_tracker.flush()
+    notification_dispatcher.stop(timeout=120)
+    replay.notification_stages()
+    server.shutdown()
+
+    for latency in upload_pipeline._latencies:
+        replay.timer.record('frame_upload', latency)
+    uploads = upload_pipeline.stats()
+    result = {
+        'schema': SCHEMA_VERSION,
+        'revision': git_revision(),
+        'dialect': dialect,
+        'dataset': {
+            'owners': args.owners,
+            'cameras': len(cameras),
+            'officers': len(officer_ids),
+            'seed_seconds': round(seed_seconds, 2),
+        },
+        'trace': {
+            'source': args.trace or 'generated',
+            'events': len(events),
+            'detections': sum(1 for e in events if e['kind'] == 'detection'),
+            'ping_batches': sum(1 for e in events if e['kind'] == 'pings'),
+            'duration_s': events[-1]['t'] if events else 0,
+            'speed': args.speed,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'stages': replay.timer.summary(elapsed),
+        'counters': {
+            'reports': len(replay.reports),
+            'assignments': len(replay.assigned),
+            'unassigned': replay.unassigned,
+            'errors': replay.errors,
+            'coalescer': detection_coalescer.snapshot(),
+            'pings_written': location_tracker.rows_written,
+            'notifications_delivered': notification_dispatcher.delivered,
+            'notifications_failed': notification_dispatcher.failed,
+            'pusher_requests': LocalPusher.requests,
+            'uploads': {k: v for k, v in uploads.items() if k not in ('p50_ms', 'p99_ms')},
+        },
+    }
+    if args.compare:
+        with open(args.compare) as fh:
+            result['regressions'] = compare(result, json.load(fh), args.tolerance)
+    emit(result, args.output)
+    if result.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
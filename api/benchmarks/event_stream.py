@@ -0,0 +1,100 @@
+"""Fan-out latency and backpressure of the SSE event gateway, plus request volume versus polling.
+
+    python -m benchmarks.event_stream --subscribers 2000 --officers 200 --duration 10 --slow-share 0.05
+
+Consumer dijalankan oleh satu thread yang menguras semua subscription setiap
+--drain-interval (seperti satu worker gevent); sebagian subscription sengaja
+dikuras 10x lebih lambat untuk menguji penggabungan update lokasi.
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import emit, latency_summary
+from app.services.events import EventGateway
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--reports', type=int, default=500, help='Distinct report channels')
+    parser.add_argument('--officers', type=int, default=200)
+    parser.add_argument('--location-rate', type=float, default=1.0, help='Pings per officer per second')
+    parser.add_argument('--status-rate', type=float, default=20, help='Report status changes per second')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--drain-interval', type=float, default=0.05)
+    parser.add_argument('--slow-share', type=float, default=0.05)
+    parser.add_argument('--queue-size', type=int, default=100)
+    parser.add_argument('--poll-interval', type=float, default=5, help='Polling interval the stream replaces')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    gateway = EventGateway()
+    gateway.queue_size = args.queue_size
+    gateway.heartbeat = 15
+
+    subscriptions = []
+    for i in range(args.subscribers):
+        # Owner: satu laporan + petugas yang menanganinya; sebagian memantau peta semua petugas
+        channels = [f'report:{i % args.reports}', f'officer:{i % args.officers}']
+        if i % 10 == 0:
+            channels.append('officers')
+        subscriptions.append((gateway.subscribe(channels), random.random() < args.slow_share))
+
+    latencies = []
+    received = [0]
+    stop = threading.Event()
+
+    def drain():
+        rounds = 0
+        while not stop.is_set():
+            rounds += 1
+            now = time.time()
+            for subscription, slow in subscriptions:
+                if slow and rounds % 10:
+                    continue
+                for event in subscription.get(0):
+                    received[0] += 1
+                    latencies.append(now - event.published_at)
+            time.sleep(args.drain_interval)
+
+    consumer = threading.Thread(target=drain, daemon=True)
+    consumer.start()
+
+    published = 0
+    tick = 0.1
+    started = time.time()
+    while time.time() - started < args.duration:
+        for officer in range(args.officers):
+            if random.random() < args.location_rate * tick:
+                data = {'user_id': f'officer-{officer}', 'latitude': -6.2, 'longitude': 106.8}
+                key = f'location:officer-{officer}'
+                gateway.publish('officers', 'location', data, key=key, broadcast=False)
+                gateway.publish(f'officer:{officer}', 'location', data, key=key, broadcast=False)
+                published += 2
+        for _ in range(int(args.status_rate * tick)):
+            report = random.randrange(args.reports)
+            gateway.publish(f'report:{report}', 'report_status', {'report_id': report, 'status': 'ASSIGNED'})
+            published += 1
+        time.sleep(tick)
+    stop.set()
+    consumer.join()
+
+    elapsed = time.time() - started
+    emit({
+        'subscribers': args.subscribers,
+        'duration_s': round(elapsed, 2),
+        'events_published': published,
+        'events_received': received[0],
+        'delivery_latency': latency_summary(latencies),
+        'stale_locations_dropped': sum(s.dropped for s, _ in subscriptions),
+        'overflowed_subscriptions': sum(s.overflowed for s, _ in subscriptions),
+        # Satu koneksi SSE per client menggantikan polling periodik
+        'polling_requests_equivalent': int(args.subscribers * elapsed / args.poll_interval),
+        'stream_requests': args.subscribers,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Request throughput with direct log handlers versus the QueueHandler setup.
+
+    python -m benchmarks.logging_throughput --threads 32 --requests 20000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from benchmarks.common import emit, latency_summary
+from flask import Flask
+
+from app.utils.logger import Logger
+
+
+def build_app(log_dir, queued, log_format, level):
+    app = Flask(__name__)
+    app.config.update(LOG_DIRECTORY=log_dir, LOG_QUEUE=queued, LOG_FORMAT=log_format, LOG_LEVEL=level)
+    # Rotasi kecil supaya biaya rollover ikut terukur
+    app.config['LOG_MAX_SIZE'] = 1024 * 1024
+    app.config['LOG_BACKUP_COUNT'] = 2
+    log = Logger(app)
+
+    @app.route('/ping')
+    def ping():
+        return {'ok': True}
+
+    return app, log
+
+
+def run(app, threads, requests_per_thread):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        local = []
+        for _ in range(requests_per_thread):
+            started = time.perf_counter()
+            client.get('/ping')
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=20000, help='Total requests per mode')
+    parser.add_argument('--format', default='text', choices=('text', 'json'))
+    parser.add_argument('--level', default='INFO')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    per_thread = max(1, args.requests // args.threads)
+    results = {}
+    for mode, queued in (('direct', False), ('queued', True)):
+        log_dir = tempfile.mkdtemp(prefix=f'tangkapin-log-{mode}-')
+        # stdout dialihkan agar terminal tidak menjadi bottleneck
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        saved_stdout = os.dup(1)
+        os.dup2(devnull, 1)
+        try:
+            app, log = build_app(log_dir, queued, args.format, args.level)
+            elapsed, latencies = run(app, args.threads, per_thread)
+            log._stop_listener()
+        finally:
+            os.dup2(saved_stdout, 1)
+            os.close(devnull)
+            os.close(saved_stdout)
+        shutil.rmtree(log_dir, ignore_errors=True)
+        results[mode] = {
+            'requests_per_s': round(len(latencies) / elapsed, 1),
+            'latency': latency_summary(latencies),
+        }
+
+    emit({
+        'threads': args.threads,
+        'requests': per_thread * args.threads,
+        'format': args.format,
+        'level': args.level,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Enqueue-to-delivery latency of the notification dispatcher against a local fake Pusher.
+
+    python -m benchmarks.notification_dispatch --messages 5000 --rate 500 --fail-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import emit, latency_summary
+from app.services.notifications import NotificationDispatcher, PushMessage
+from config import Config
+
+
+class FakePusher(BaseHTTPRequestHandler):
+    fail_rate = 0.0
+    delay = 0.0
+    requests = 0
+    events = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.delay:
+            time.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            self.send_response(503)
+            self.end_headers()
+            return
+        with self.lock:
+            FakePusher.requests += 1
+            FakePusher.events += len(body.get('batch', [])) or len(body.get('channels', []))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=500, help='Enqueued messages per second')
+    parser.add_argument('--fanout', type=int, default=1, help='Channels per message')
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--server-delay', type=float, default=0.005)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    FakePusher.fail_rate = args.fail_rate
+    FakePusher.delay = args.server_delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakePusher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    config = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    config.update({
+        'PUSHER_HOST': f'http://127.0.0.1:{server.server_port}',
+        'NOTIFICATION_PERSIST': False,
+        'NOTIFICATION_RETRY_BACKOFF': 0.05,
+    })
+    dispatcher = NotificationDispatcher()
+    dispatcher.configure(config)
+    dispatcher.start()
+
+    enqueue_times = []
+    rejected = 0
+    interval = 1.0 / args.rate
+    started = time.time()
+    for i in range(args.messages):
+        channels = [f'user-{(i + j) % 1000}' for j in range(args.fanout)]
+        before = time.perf_counter()
+        try:
+            dispatcher.enqueue(PushMessage(channels=channels, event='bench', data={'seq': i}))
+        except Exception:
+            rejected += 1
+        enqueue_times.append(time.perf_counter() - before)
+        sleep = started + (i + 1) * interval - time.time()
+        if sleep > 0:
+            time.sleep(sleep)
+    dispatcher.stop(timeout=60)
+    elapsed = time.time() - started
+    server.shutdown()
+
+    emit({
+        'messages': args.messages,
+        'fanout': args.fanout,
+        'elapsed_s': round(elapsed, 3),
+        'delivered': dispatcher.delivered,
+        'failed': dispatcher.failed,
+        'rejected': rejected,
+        'retries': dispatcher.retries,
+        'http_calls': dispatcher.http_calls,
+        'server_requests': FakePusher.requests,
+        'events_per_request': round(FakePusher.events / FakePusher.requests, 2) if FakePusher.requests else 0,
+        'enqueue_call': latency_summary(enqueue_times),
+        'enqueue_to_delivery': latency_summary(list(dispatcher._latencies)),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
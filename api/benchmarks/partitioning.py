@@ -0,0 +1,161 @@
+"""Insert rate, index size and retention cost: uuid4 vs UUIDv7 keys, plain vs partitioned tables.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.partitioning --rows 500000 --days 30 --expire-days 10
+
+Tabel scratch berbentuk seperti locations diisi dengan created_at yang terus
+bertambah (seperti ingest ping). Varian:
+  uuid4        tabel biasa, primary key uuid4 (sebelum perubahan)
+  uuid7        tabel biasa, primary key UUIDv7
+  partitioned  tabel partisi harian per created_at, UUIDv7 (hanya PostgreSQL)
+Retensi membuang data `--expire-days` hari tertua: DELETE untuk tabel biasa,
+DROP partisi untuk tabel partisi. Ukuran index dibaca lagi setelahnya.
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, MetaData, String, Table, create_engine, insert, text
+
+from benchmarks.common import emit
+from app.utils.ids import uuid7
+
+ID_FACTORIES = {'uuid4': lambda: str(uuid.uuid4()), 'uuid7': uuid7}
+
+
+def build_table(metadata, name, partitioned):
+    return Table(
+        name, metadata,
+        Column('id', String(36), primary_key=True),
+        Column('user_id', String(36), nullable=False),
+        Column('latitude', Float, nullable=False),
+        Column('longitude', Float, nullable=False),
+        Column('is_active', Boolean, nullable=False),
+        Column('created_at', DateTime, primary_key=partitioned, nullable=False),
+        Index(f'ix_{name}_user_id', 'user_id'),
+        Index(f'ix_{name}_created_at', 'created_at'),
+        **({'postgresql_partition_by': 'RANGE (created_at)'} if partitioned else {}),
+    )
+
+
+def create_partitions(connection, name, start, days):
+    for day in range(days + 1):
+        lower = start + timedelta(days=day)
+        connection.execute(text(
+            f"CREATE TABLE {name}_p{lower:%Y%m%d} PARTITION OF {name} "
+            f"FOR VALUES FROM ('{lower.isoformat(' ')}') TO ('{(lower + timedelta(days=1)).isoformat(' ')}')"
+        ))
+
+
+def index_bytes(connection, name):
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        return int(connection.execute(text(
+            'SELECT coalesce(sum(pg_indexes_size(inhrelid)), 0) FROM pg_inherits '
+            'WHERE inhparent = CAST(:name AS regclass)'
+        ), {'name': name}).scalar() or connection.execute(
+            text('SELECT pg_indexes_size(CAST(:name AS regclass))'), {'name': name}
+        ).scalar())
+    if dialect == 'sqlite':
+        try:
+            return connection.execute(text(
+                "SELECT sum(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name)"
+            ), {'name': name}).scalar()
+        except Exception:
+            return None  # SQLite tanpa SQLITE_ENABLE_DBSTAT_VTAB
+    return None
+
+
+def run_variant(engine, variant, rows, batch, start, days, expire_days):
+    name = f'bench_locations_{variant}'
+    partitioned = variant == 'partitioned'
+    new_id = ID_FACTORIES['uuid4' if variant == 'uuid4' else 'uuid7']
+    metadata = MetaData()
+    table = build_table(metadata, name, partitioned)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    if partitioned:
+        with engine.begin() as connection:
+            create_partitions(connection, name, start, days)
+
+    users = [str(uuid.uuid4()) for _ in range(200)]
+    step = timedelta(days=days) / rows
+    batch_rates = []
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        chunk = [{
+            'id': new_id(),
+            'user_id': random.choice(users),
+            'latitude': random.uniform(-6.4, -6.1),
+            'longitude': random.uniform(106.7, 107.0),
+            'is_active': True,
+            'created_at': start + step * (offset + i),
+        } for i in range(min(batch, rows - offset))]
+        batch_started = time.perf_counter()
+        with engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+        batch_rates.append(len(chunk) / (time.perf_counter() - batch_started))
+    elapsed = time.perf_counter() - started
+    tenth = max(1, len(batch_rates) // 10)
+
+    with engine.connect() as connection:
+        size_before = index_bytes(connection, name)
+
+    cutoff = start + timedelta(days=expire_days)
+    expire_started = time.perf_counter()
+    with engine.begin() as connection:
+        if partitioned:
+            for day in range(expire_days):
+                connection.execute(text(f'DROP TABLE {name}_p{start + timedelta(days=day):%Y%m%d}'))
+        else:
+            connection.execute(table.delete().where(table.c.created_at < cutoff))
+    expire_seconds = time.perf_counter() - expire_started
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if connection.dialect.name == 'postgresql' and not partitioned:
+            # VACUUM hanya menandai halaman kosong untuk dipakai ulang; ukuran index tidak turun
+            connection.execute(text(f'VACUUM {name}'))
+        size_after = index_bytes(connection, name)
+    metadata.drop_all(engine)
+
+    return {
+        'rows': rows,
+        'rows_per_second': round(rows / elapsed, 1),
+        # Penurunan laju insert saat index membesar (10% batch pertama vs terakhir)
+        'first_tenth_rows_per_second': round(sum(batch_rates[:tenth]) / tenth, 1),
+        'last_tenth_rows_per_second': round(sum(batch_rates[-tenth:]) / tenth, 1),
+        'index_bytes': size_before,
+        'expire_seconds': round(expire_seconds, 3),
+        'index_bytes_after_expire': size_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--expire-days', type=int, default=10)
+    parser.add_argument('--variants', default='uuid4,uuid7,partitioned')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    url = os.environ.get('DATABASE_URL') or 'sqlite:///benchmarks.db'
+    engine = create_engine(url)
+    variants = [v for v in args.variants.split(',') if v != 'partitioned' or engine.dialect.name == 'postgresql']
+    start = datetime(datetime.utcnow().year, 1, 1)
+    emit({
+        'dialect': engine.dialect.name,
+        'days': args.days,
+        'expire_days': args.expire_days,
+        'variants': {
+            variant: run_variant(engine, variant, args.rows, args.batch, start, args.days, args.expire_days)
+            for variant in variants
+        },
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Peak memory of report exports: streaming (yield_per + batched joins) vs naive ORM load.
+
+Seeds the database on first run (reuse it afterwards with the same URL):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.report_export --reports 200000 --sizes 10000,50000,200000
+
+Setiap pengukuran berjalan di proses terpisah dan peak RSS (VmHWM) di-reset
+setelah aplikasi dimuat, jadi angka tidak terbawa dari import atau run lain.
+RSS dipakai, bukan tracemalloc, karena tanpa server-side cursor psycopg2
+menampung seluruh hasil query di memori libpq yang tidak terlihat oleh
+tracemalloc. Mode:
+  streaming  report_batches() + csv/parquet chunk, seperti GET /api/reports/export
+  naive      Report.query.all() lalu relationship dynamic per laporan
+"""
+import argparse
+import csv
+import gc
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import create_bench_app, emit
+from app import db
+from app.models import Report, UserRole
+from app.services.export import REPORT_COLUMNS, export_chunks, report_batches
+from benchmarks.seed import seed_feed_dataset, seed_report_details, seed_users
+
+
+class CountingSink:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+
+def reset_peak_rss():
+    """Reset VmHWM (Linux) agar peak setelah import aplikasi tidak menutupi pemakaian export"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Linux melaporkan ru_maxrss dalam KB, macOS dalam bytes
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024 / 1024
+
+
+def export_streaming(limit, fmt, batch_size, sink):
+    for chunk in export_chunks(report_batches(limit=limit, batch_size=batch_size), REPORT_COLUMNS, fmt):
+        sink.write(chunk)
+
+
+def export_naive(limit, fmt, batch_size, sink):
+    """Cara lama: semua laporan dimuat sebagai objek ORM, data terkait lewat relationship dynamic"""
+    reports = Report.query.order_by(Report.created_at.desc(), Report.id.desc()).limit(limit).all()
+    rows = []
+    for report in reports:
+        evidences = report.evidences.all()
+        assignments = report.assignments.order_by('created_at').all()
+        events = report.timeline_events.order_by('created_at').all()
+        rows.append({
+            'id': report.id, 'created_at': report.created_at, 'updated_at': report.updated_at,
+            'title': report.title, 'status': report.status.value, 'priority': report.priority.value,
+            'is_automatic': report.is_automatic, 'weapon_type': report.weapon_type,
+            'detection_confidence': report.detection_confidence, 'detection_image_url': report.detection_image_url,
+            'camera_id': report.camera_id, 'camera_name': report.camera.name,
+            'camera_location': report.camera.location, 'latitude': report.camera.latitude,
+            'longitude': report.camera.longitude, 'reporter_id': report.reporter_id,
+            'reporter_name': report.reporter.name, 'evidence_count': len(evidences),
+            'evidence_urls': ' '.join(e.file_url for e in evidences) or None,
+            'assignment_count': len(assignments),
+            'officer_ids': ' '.join(dict.fromkeys(a.officer_id for a in assignments)) or None,
+            'assignment_status': assignments[-1].status.value if assignments else None,
+            'response_time': assignments[-1].response_time if assignments else None,
+            'timeline_count': len(events),
+            'last_event_type': events[-1].event_type if events else None,
+            'last_event_at': events[-1].created_at if events else None,
+        })
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, [name for name, _ in REPORT_COLUMNS])
+    writer.writeheader()
+    writer.writerows(rows)
+    sink.write(buffer.getvalue().encode())
+
+
+MODES = {'streaming': export_streaming, 'naive': export_naive}
+
+
+def measure(args):
+    """Satu pengukuran di proses ini; hasil dicetak sebagai satu baris JSON"""
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        queries = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+        # Koneksi dan metadata dipanaskan dulu agar baseline tidak ikut menghitungnya
+        next(report_batches(limit=1), None)
+        db.session.rollback()
+        queries.clear()
+        gc.collect()
+        reset_peak_rss()
+        baseline = peak_rss_mb()
+        sink = CountingSink()
+        started = time.perf_counter()
+        MODES[args.measure](args.limit, args.format, args.batch_size, sink)
+        elapsed = time.perf_counter() - started
+        peak = peak_rss_mb()
+    print(json.dumps({
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(args.limit / elapsed, 1),
+        'peak_rss_mb': round(peak, 1),
+        'rss_growth_mb': round(peak - baseline, 1),
+        'queries': len(queries),
+        'bytes': sink.bytes,
+    }))
+
+
+def run_child(args, mode, size):
+    command = [sys.executable, '-m', 'benchmarks.report_export', '--measure', mode, '--limit', str(size),
+               '--format', args.format, '--batch-size', str(args.batch_size)]
+    if args.database_url:
+        command += ['--database-url', args.database_url]
+    output = subprocess.run(command, check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url')
+    parser.add_argument('--reports', type=int, default=200000)
+    parser.add_argument('--owners', type=int, default=200)
+    parser.add_argument('--cameras-per-owner', type=int, default=4)
+    parser.add_argument('--officers', type=int, default=50)
+    parser.add_argument('--sizes', default='10000,50000,200000')
+    parser.add_argument('--modes', default='streaming,naive')
+    parser.add_argument('--naive-max', type=int, default=50000,
+                        help='Skip naive runs above this size (N+1 queries make them very slow)')
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--output')
+    parser.add_argument('--measure', choices=tuple(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--limit', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args)
+        return
+
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(Report.id).count()
+        if existing < args.reports:
+            seed_feed_dataset(
+                args.owners, args.cameras_per_owner, args.reports - existing,
+                progress=lambda n: print(f'seeded {n} reports', file=sys.stderr),
+            )
+            rng = random.Random(7)
+            officers = seed_users(args.officers, UserRole.OFFICER, rng)
+            seed_report_details(officers, rng, progress=lambda n: print(f'seeded details for {n} reports',
+                                                                        file=sys.stderr))
+        total = db.session.query(Report.id).count()
+        dialect = db.engine.dialect.name
+
+    results = {}
+    for mode in args.modes.split(','):
+        rows = []
+        for size in (int(s) for s in args.sizes.split(',')):
+            if size > total or (mode == 'naive' and size > args.naive_max):
+                continue
+            print(f'{mode} {size}', file=sys.stderr)
+            rows.append({'rows': size, **run_child(args, mode, size)})
+        results[mode] = rows
+
+    emit({
+        'dialect': dialect,
+        'reports': total,
+        'format': args.format,
+        'batch_size': args.batch_size,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
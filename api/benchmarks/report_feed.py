@@ -0,0 +1,79 @@
+"""Page latency of the report feed: OFFSET pagination versus keyset cursors.
+
+Seeds the database on first run (reuse it afterwards with the same URL):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.report_feed --reports 2000000
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.common import create_bench_app, emit, latency_summary
+from app import db
+from app.models import Report, ReportStatus
+from app.services.report_feed import encode_cursor, feed_query, paginate
+from benchmarks.seed import seed_feed_dataset
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url')
+    parser.add_argument('--reports', type=int, default=1000000)
+    parser.add_argument('--owners', type=int, default=500)
+    parser.add_argument('--cameras-per-owner', type=int, default=4)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--depths', default='0,1000,10000,100000,500000')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(Report.id).count()
+        if existing < args.reports:
+            seed_feed_dataset(
+                args.owners, args.cameras_per_owner, args.reports - existing,
+                progress=lambda n: print(f'seeded {n} reports', file=sys.stderr),
+            )
+        total = db.session.query(Report.id).count()
+        dialect = db.engine.dialect.name
+
+        results = {}
+        for filters_name, filters in (('all', {}), ('status', {'statuses': [ReportStatus.NEW]})):
+            rows = []
+            for depth in (int(d) for d in args.depths.split(',')):
+                if depth >= total:
+                    continue
+                query = feed_query(**filters)
+                anchor = query.offset(depth).limit(1).first()
+                if anchor is None:
+                    continue
+                cursor = encode_cursor(anchor) if depth else None
+                rows.append({
+                    'depth': depth,
+                    'offset': timed(lambda: query.offset(depth).limit(args.page_size).all(), args.repeat),
+                    'keyset': timed(lambda: paginate(feed_query(**filters), cursor, args.page_size), args.repeat),
+                })
+                db.session.expunge_all()
+            results[filters_name] = rows
+
+    emit({
+        'dialect': dialect,
+        'reports': total,
+        'page_size': args.page_size,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
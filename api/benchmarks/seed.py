@@ -0,0 +1,147 @@
+"""Synthetic data generator shared by the database benchmarks.
+
+Rows are written with Core executemany in chunks so seeding millions of
+reports stays fast on both SQLite and PostgreSQL.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, insert, select
+
+from app import db
+from app.models import (
+    Assignment, AssignmentStatus, Camera, CameraStatus, Evidence, EvidenceType, Report, ReportPriority, ReportStatus,
+    TimelineEvent, User, UserRole,
+)
+
+CHUNK = 10000
+PASSWORD_HASH = 'pbkdf2:sha256:600000$bench$0'
+LAT_RANGE = (-6.6, -6.0)
+LON_RANGE = (106.5, 107.2)
+
+
+def _insert_chunks(model, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[i:i + CHUNK])
+    db.session.commit()
+
+
+def seed_users(count, role, rng, prefix=None):
+    prefix = prefix or role.value
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': str(uuid.uuid4()),
+            'email': f'{prefix}-{i}-{uuid.uuid4().hex[:8]}@bench.local',
+            'password_hash': PASSWORD_HASH,
+            'name': f'{prefix.title()} {i}',
+            'role': role,
+            'badge_number': f'B{i:06d}' if role == UserRole.OFFICER else None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        for i in range(count)
+    ]
+    _insert_chunks(User, rows)
+    return [row['id'] for row in rows]
+
+
+def seed_cameras(owner_ids, per_owner, rng, online_ratio=0.9):
+    now = datetime.utcnow()
+    rows = []
+    for owner_id in owner_ids:
+        for i in range(per_owner):
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'name': f'Cam {i}',
+                'location': 'Minimarket',
+                'latitude': rng.uniform(*LAT_RANGE),
+                'longitude': rng.uniform(*LON_RANGE),
+                'stream_url': f'rtsp://127.0.0.1/{owner_id}/{i}',
+                'status': CameraStatus.ONLINE if rng.random() < online_ratio else CameraStatus.OFFLINE,
+                'owner_id': owner_id,
+                'created_at': now,
+                'updated_at': now,
+            })
+    _insert_chunks(Camera, rows)
+    return [(row['id'], row['owner_id']) for row in rows]
+
+
+def seed_reports(cameras, count, rng, days=365, progress=None):
+    statuses = list(ReportStatus)
+    priorities = list(ReportPriority)
+    end = datetime.utcnow()
+    span = days * 86400
+    for start in range(0, count, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, count - start)):
+            camera_id, owner_id = rng.choice(cameras)
+            created_at = end - timedelta(seconds=rng.random() * span)
+            automatic = rng.random() < 0.8
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'title': 'Weapon detected' if automatic else 'Manual report',
+                'camera_id': camera_id,
+                'reporter_id': owner_id,
+                'status': rng.choice(statuses),
+                'priority': rng.choice(priorities),
+                'detection_confidence': rng.uniform(0.7, 1.0) if automatic else None,
+                'weapon_type': rng.choice(('knife', 'pistol')) if automatic else None,
+                'is_automatic': automatic,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+        db.session.execute(insert(Report), rows)
+        db.session.commit()
+        if progress:
+            progress(start + len(rows))
+
+
+def seed_feed_dataset(owners, cameras_per_owner, reports, seed=42, progress=None):
+    rng = random.Random(seed)
+    owner_ids = seed_users(owners, UserRole.OWNER, rng)
+    cameras = seed_cameras(owner_ids, cameras_per_owner, rng)
+    seed_reports(cameras, reports, rng, progress=progress)
+    return owner_ids, cameras
+
+
+def seed_report_details(officer_ids, rng, assigned_ratio=0.5, progress=None):
+    """Evidence, timeline dan assignment untuk laporan yang belum punya evidence"""
+    pending = (
+        select(Report.id, Report.reporter_id, Report.created_at)
+        .where(~exists().where(Evidence.report_id == Report.id))
+    )
+    # Dibaca dulu seluruhnya karena commit per chunk akan menutup cursor yang masih terbuka
+    reports = db.session.execute(pending).all()
+    for start in range(0, len(reports), CHUNK):
+        evidences, events, assignments = [], [], []
+        for report_id, reporter_id, created_at in reports[start:start + CHUNK]:
+            evidences.append({
+                'id': str(uuid.uuid4()), 'report_id': report_id, 'file_type': EvidenceType.IMAGE,
+                'file_url': f'https://storage.bench.local/evidence-files/{report_id}.jpg',
+                'created_by': reporter_id, 'created_at': created_at, 'updated_at': created_at,
+            })
+            events.append({
+                'id': str(uuid.uuid4()), 'report_id': report_id, 'event_type': 'report_created',
+                'event_data': {'source': 'bench'}, 'created_by': reporter_id, 'created_at': created_at,
+            })
+            if rng.random() < assigned_ratio:
+                assigned_at = created_at + timedelta(seconds=rng.uniform(10, 600))
+                officer_id = rng.choice(officer_ids)
+                assignments.append({
+                    'id': str(uuid.uuid4()), 'report_id': report_id, 'officer_id': officer_id,
+                    'assigned_by': reporter_id, 'status': rng.choice(list(AssignmentStatus)),
+                    'response_time': rng.randint(30, 1800), 'created_at': assigned_at, 'updated_at': assigned_at,
+                })
+                events.append({
+                    'id': str(uuid.uuid4()), 'report_id': report_id, 'event_type': 'assignment',
+                    'event_data': {'officer_id': officer_id}, 'created_by': reporter_id, 'created_at': assigned_at,
+                })
+        db.session.execute(insert(Evidence), evidences)
+        db.session.execute(insert(TimelineEvent), events)
+        if assignments:
+            db.session.execute(insert(Assignment), assignments)
+        db.session.commit()
+        if progress:
+            progress(start + len(evidences))
@@ -0,0 +1,101 @@
+"""Build and query cost of the grid spatial index versus a brute-force haversine scan.
+
+    python -m benchmarks.spatial_index --officers 10000 --cameras 100000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import emit, latency_summary
+from app.services.spatial import GridIndex, haversine_km
+
+# Kira-kira kotak Jabodetabek
+LAT_RANGE = (-6.6, -6.0)
+LON_RANGE = (106.5, 107.2)
+
+
+def random_point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+
+def brute_force(points, lat, lon, k, predicate=None):
+    distances = [
+        (haversine_km(lat, lon, plat, plon), key)
+        for key, (plat, plon) in points.items()
+        if predicate is None or predicate(key)
+    ]
+    distances.sort()
+    return distances[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--officers', type=int, default=10000)
+    parser.add_argument('--cameras', type=int, default=100000)
+    parser.add_argument('--busy-ratio', type=float, default=0.3)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--brute-queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--cell', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    officers = {f'officer-{i}': random_point(rng) for i in range(args.officers)}
+    cameras = {f'camera-{i}': random_point(rng) for i in range(args.cameras)}
+    busy = set(rng.sample(sorted(officers), int(args.officers * args.busy_ratio)))
+    available = lambda key: key not in busy
+
+    started = time.perf_counter()
+    officer_index = GridIndex(args.cell)
+    for key, (lat, lon) in officers.items():
+        officer_index.upsert(key, lat, lon)
+    camera_index = GridIndex(args.cell)
+    for key, (lat, lon) in cameras.items():
+        camera_index.upsert(key, lat, lon)
+    build_seconds = time.perf_counter() - started
+
+    camera_keys = list(cameras)
+    grid_officer, grid_camera, brute = [], [], []
+    mismatches = 0
+    for i in range(args.queries):
+        lat, lon = cameras[rng.choice(camera_keys)]
+        t0 = time.perf_counter()
+        result = officer_index.nearest(lat, lon, args.k, predicate=available)
+        grid_officer.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        camera_index.nearest(lat, lon, args.k)
+        grid_camera.append(time.perf_counter() - t0)
+
+        if i < args.brute_queries:
+            t0 = time.perf_counter()
+            expected = brute_force(officers, lat, lon, args.k, available)
+            brute.append(time.perf_counter() - t0)
+            if [key for _, key in result] != [key for _, key in expected]:
+                mismatches += 1
+
+    # Update posisi petugas seperti ping GPS
+    t0 = time.perf_counter()
+    for key in list(officers)[:args.officers]:
+        lat, lon = officers[key]
+        officer_index.upsert(key, lat + rng.uniform(-0.001, 0.001), lon + rng.uniform(-0.001, 0.001))
+    update_seconds = time.perf_counter() - t0
+
+    emit({
+        'officers': args.officers,
+        'cameras': args.cameras,
+        'k': args.k,
+        'cell_degrees': args.cell,
+        'build_s': round(build_seconds, 3),
+        'updates_per_s': round(args.officers / update_seconds),
+        'nearest_available_officers': latency_summary(grid_officer),
+        'nearest_cameras': latency_summary(grid_camera),
+        'brute_force_officers': latency_summary(brute),
+        'result_mismatches': mismatches,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Import time and memory of create_app, per gunicorn-style worker.
+
+    python -m benchmarks.startup --runs 3 --workers 4 --requests 200
+    python -m benchmarks.startup --eager   # import ML/storage/push libraries up front for comparison
+
+Setiap run memakai interpreter baru agar import diukur dalam kondisi dingin.
+Worker disimulasikan dengan os.fork() setelah create_app (seperti --preload);
+memori pribadi worker dibaca dari /proc/<pid>/smaps_rollup, sekali tepat
+setelah fork dan sekali lagi setelah worker melayani --requests request lewat
+test client. Angka tepat setelah fork hampir nol karena semua halaman masih
+dibagi dengan master; angka setelah warm-up menunjukkan berapa banyak yang
+tersalin (copy-on-write) begitu worker benar-benar bekerja.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import emit
+
+HEAVY_MODULES = ('cv2', 'numpy', 'torch', 'ultralytics', 'firebase_admin', 'supabase', 'pusher',
+                 'boto3', 'httpx', 'redis', 'gevent')
+EAGER_IMPORTS = ('cv2', 'ultralytics', 'firebase_admin', 'supabase', 'pusher', 'boto3', 'httpx')
+WARMUP_PATHS = ('/api/cameras', '/api/reports?limit=20', '/api/dashboard/summary', '/api/locations/officers',
+                '/metrics')
+
+
+def _memory_kb(pid='self'):
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                name, _, rest = line.partition(':')
+                if rest.strip().endswith('kB'):
+                    values[name] = int(rest.split()[0])
+    except FileNotFoundError:
+        import resource
+        return {'Rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return values
+
+
+def _private_mb(memory):
+    return round((memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0)) / 1024, 1)
+
+
+def _bench_token(app):
+    """JWT untuk satu owner benchmark, dibuat bila belum ada"""
+    from flask_jwt_extended import create_access_token
+
+    from app import db
+    from app.models import User, UserRole
+
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(email='startup-owner@bench.local').first()
+        if user is None:
+            user = User(email='startup-owner@bench.local', password_hash='-', name='Startup Owner',
+                        role=UserRole.OWNER)
+            db.session.add(user)
+            db.session.commit()
+        token = create_access_token(identity=user.id)
+        db.session.remove()
+    return token
+
+
+def _serve(app, token, requests):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    statuses = {}
+    for path in itertools.islice(itertools.cycle(WARMUP_PATHS), requests):
+        status = client.get(path, headers=headers).status_code
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+
+def _child(args):
+    started = time.perf_counter()
+    if args.eager:
+        for name in EAGER_IMPORTS:
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+    from benchmarks.common import create_bench_app
+    app = create_bench_app(args.database_url)
+    import_seconds = time.perf_counter() - started
+    token = _bench_token(app)
+
+    master = _memory_kb()
+    workers = []
+    for _ in range(args.workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            forked = _memory_kb()
+            statuses = _serve(app, token, args.requests)
+            gc.collect()
+            served = _memory_kb()
+            os.write(write_fd, json.dumps({
+                'rss_kb': served.get('Rss'),
+                'fork_private_mb': _private_mb(forked),
+                'private_mb': _private_mb(served),
+                'statuses': statuses,
+            }).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as fh:
+            workers.append(json.loads(fh.read()))
+        os.waitpid(pid, 0)
+
+    print(json.dumps({
+        'import_seconds': import_seconds,
+        'master_rss_mb': round(master.get('Rss', 0) / 1024, 1),
+        'worker_private_mb_after_fork': [w['fork_private_mb'] for w in workers],
+        'worker_private_mb': [w['private_mb'] for w in workers],
+        'worker_rss_mb': [round(w['rss_kb'] / 1024, 1) for w in workers],
+        'warmup_statuses': workers[0]['statuses'] if workers else {},
+        'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='Requests served by each worker before measuring')
+    parser.add_argument('--eager', action='store_true')
+    parser.add_argument('--database-url')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    command = [sys.executable, '-m', 'benchmarks.startup', '--child', '--workers', str(args.workers),
+               '--requests', str(args.requests)]
+    if args.eager:
+        command.append('--eager')
+    if args.database_url:
+        command += ['--database-url', args.database_url]
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(command, cwd=cwd, check=True, capture_output=True, text=True).stdout
+        # stdout juga berisi log aplikasi dari console handler
+        runs.append(next(json.loads(line) for line in output.splitlines() if line.startswith('{"import_seconds"')))
+
+    imports = sorted(run['import_seconds'] for run in runs)
+    emit({
+        'eager': args.eager,
+        'runs': args.runs,
+        'import_seconds_median': round(imports[len(imports) // 2], 3),
+        'import_seconds_max': round(imports[-1], 3),
+        'master_rss_mb': runs[-1]['master_rss_mb'],
+        'requests_per_worker': args.requests,
+        'worker_private_mb_after_fork': runs[-1]['worker_private_mb_after_fork'],
+        'worker_private_mb': runs[-1]['worker_private_mb'],
+        'worker_rss_mb': runs[-1]['worker_rss_mb'],
+        'warmup_statuses': runs[-1]['warmup_statuses'],
+        'heavy_modules_loaded': runs[-1]['heavy_modules_loaded'],
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Detection and GPS ping traces for the replay harness.
+
+Trace berupa JSONL, satu event per baris, urut berdasarkan `t` (detik sejak
+awal trace). Kamera dan petugas dirujuk dengan nomor urut dataset hasil seed,
+bukan UUID, sehingga satu trace bisa diputar ulang terhadap database baru:
+
+    {"t": 12.5, "kind": "detection", "camera": 17, "label": "knife", "confidence": 0.83, "frame": 3}
+    {"t": 12.6, "kind": "pings", "officer": 4, "pings": [[-2.0, -6.21, 106.84, 5.0], [0.0, -6.2101, 106.8402, 4.0]]}
+
+`frame` adalah nomor frame JPEG sintetis (frame yang sama menghasilkan objek
+storage yang sama). Ping berisi [offset detik relatif waktu kirim, lat, lon, akurasi].
+"""
+import json
+import math
+import random
+
+from benchmarks.seed import LAT_RANGE, LON_RANGE
+
+LABELS = ('knife', 'pistol')
+
+
+def generate_trace(cameras, officers, duration, incidents, ping_interval=5.0, pings_per_batch=1,
+                   frames=64, seed=42):
+    """Trace sintetis: insiden berupa burst deteksi 2 fps per kamera, ping berkala per petugas"""
+    rng = random.Random(seed)
+    events = []
+
+    for _ in range(incidents):
+        camera = rng.randrange(cameras)
+        start = rng.uniform(0, duration)
+        label = rng.choice(LABELS)
+        # Jumlah deteksi per insiden mengikuti distribusi geometrik (rata-rata ~8)
+        count = 1 + int(math.log(1 - rng.random()) / math.log(7 / 8))
+        for i in range(count):
+            t = start + i * 0.5
+            if t > duration:
+                break
+            events.append({
+                't': round(t, 3), 'kind': 'detection', 'camera': camera, 'label': label,
+                'confidence': round(rng.uniform(0.5, 0.97), 3), 'frame': rng.randrange(frames),
+            })
+
+    for officer in range(officers):
+        lat, lon = rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+        t = rng.uniform(0, ping_interval * pings_per_batch)
+        while t <= duration:
+            pings = []
+            for i in range(pings_per_batch):
+                # Jalan acak ~10 m per ping
+                lat += rng.gauss(0, 0.0001)
+                lon += rng.gauss(0, 0.0001)
+                offset = -(pings_per_batch - 1 - i) * ping_interval
+                pings.append([offset, round(lat, 6), round(lon, 6), round(rng.uniform(3, 20), 1)])
+            events.append({'t': round(t, 3), 'kind': 'pings', 'officer': officer, 'pings': pings})
+            t += ping_interval * pings_per_batch
+
+    events.sort(key=lambda event: event['t'])
+    return events
+
+
+def write_trace(path, events):
+    with open(path, 'w') as fh:
+        for event in events:
+            fh.write(json.dumps(event, separators=(',', ':')) + '\n')
+
+
+def read_trace(path):
+    with open(path) as fh:
+        events = [json.loads(line) for line in fh if line.strip()]
+    events.sort(key=lambda event: event['t'])
+    return events
+
+
+def synthetic_frames(count, size=48 * 1024, seed=42):
+    """Payload pengganti JPEG dengan ukuran mirip frame deteksi 640x480"""
+    rng = random.Random(seed)
+    return [b'\xff\xd8\xff\xe0' + rng.randbytes(size) + b'\xff\xd9' for _ in range(count)]
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,15 +9,53 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Database Pool
+    # Per proses gunicorn: 4 worker x (8 + 4) = 48 koneksi maksimum ke primary
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))  # Sama dengan jumlah thread per worker
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 4))  # Untuk thread latar belakang
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))  # Detik menunggu koneksi sebelum error
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Detik, sebelum idle timeout pooler Supabase
+    DB_POOL_PRE_PING = True
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')  # Opsional, untuk endpoint @read_replica
+    
+    # Logging
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # text | json
+    LOG_QUEUE = os.environ.get('LOG_QUEUE', '1') != '0'  # I/O log di thread QueueListener
+    
+    # Lookup Cache
+    CACHE_ENABLED = True
+    CACHE_MAX_ENTRIES = 10000
+    CACHE_USER_TTL = 300  # Detik
+    CACHE_CAMERA_TTL = 30  # Detik, status kamera sering berubah
+    CACHE_SHARED_TTL = 300
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')  # Opsional, cache bersama antar worker
+    
+    # Metrics
+    METRICS_PATH = '/metrics'
+    METRICS_SAMPLE_INTERVAL = 15  # Detik, sampling gauge per worker gunicorn (mode multiprocess)
+    
+    # Query Instrumentation
+    QUERY_REPEAT_THRESHOLD = 5  # Statement identik per request sebelum dicatat sebagai N+1
+    QUERY_BUDGET = None  # Batas default query per request (None = tanpa batas)
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = False  # Token tidak expire otomatis
+    if os.environ.get('JWT_ACCESS_TOKEN_EXPIRES_HOURS'):
+        # Dengan exp, token yang dicabut bisa dihapus dari blocklist setelah kedaluwarsa
+        JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.environ['JWT_ACCESS_TOKEN_EXPIRES_HOURS']))
+    TOKEN_REVOCATION_SYNC_INTERVAL = 2  # Detik, sinkronisasi blocklist antar worker
+    TOKEN_REVOCATION_SYNC_MARGIN = 60  # Detik overlap created_at untuk baris yang ter-commit terlambat
+    TOKEN_REVOCATION_FULL_SYNC_INTERVAL = 300  # Detik, muat ulang seluruh blocklist (membuang baris yang sudah dihapus)
     
     # Pusher Configuration
     PUSHER_APP_ID = "1911283"
     PUSHER_KEY = "ef6ded14f456b73f9a12"
     PUSHER_SECRET = "275efadb307fd2df90b7"
     PUSHER_CLUSTER = "ap1"
+    PUSHER_HOST = os.environ.get('PUSHER_HOST')  # Override untuk fake server lokal
     
     # Supabase Configuration
     SUPABASE_URL = os.environ.get('SUPABASE_URL')
@@ -27,10 +66,95 @@ class Config:
     DETECTION_IMAGES_BUCKET = 'detection-images'  
     EVIDENCE_BUCKET = 'evidence-files' 
     
+    # Storage / Upload Configuration
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')  # 'local' atau 's3'
+    STORAGE_DIRECTORY = os.environ.get('STORAGE_DIRECTORY', 'storage')  # Root backend local
+    STORAGE_S3_ENDPOINT = os.environ.get('STORAGE_S3_ENDPOINT') or (
+        f"{SUPABASE_URL}/storage/v1/s3" if SUPABASE_URL else None
+    )
+    STORAGE_S3_REGION = os.environ.get('STORAGE_S3_REGION', 'ap-southeast-1')
+    STORAGE_S3_ACCESS_KEY = os.environ.get('STORAGE_S3_ACCESS_KEY')
+    STORAGE_S3_SECRET_KEY = os.environ.get('STORAGE_S3_SECRET_KEY')
+    STORAGE_PUBLIC_URL = os.environ.get('STORAGE_PUBLIC_URL')  # Supabase: {SUPABASE_URL}/storage/v1/object/public
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 4))  # Thread upload / koneksi storage
+    UPLOAD_QUEUE_SIZE = 500
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Ukuran part multipart upload (minimal 5MB untuk S3)
+    UPLOAD_JPEG_QUALITY = 85
+    UPLOAD_SPOOL_DIRECTORY = os.environ.get('UPLOAD_SPOOL_DIRECTORY')  # Default: direktori temp sistem
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 200 * 1024 * 1024))  # Batas satu file evidence
+    UPLOAD_MAX_ATTEMPTS = 5  # Percobaan upload sebelum file dipindah ke spool failed/
+    UPLOAD_RETRY_BACKOFF = 2.0  # Detik, digandakan setiap percobaan ulang
+    MAX_CONTENT_LENGTH = UPLOAD_MAX_BYTES + 1024 * 1024  # Body request (file + field form)
+    EXPORTS_BUCKET = 'exports'
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))  # Baris per fetch cursor / row group Parquet
+    
     # ML Detection Configuration
-    ML_MODEL_PATH = os.path.join(os.getcwd(),'app' 'ml_models', 'best.pt')
+    ML_MODEL_PATH = os.path.join(os.getcwd(), 'app', 'ml_models', 'best.pt')
     DETECTION_CONFIDENCE_THRESHOLD = 0.7  # 70% confidence minimum
+    DETECTION_DEVICE = os.environ.get('DETECTION_DEVICE', 'cpu')
+    DETECTION_BATCH_SIZE = int(os.environ.get('DETECTION_BATCH_SIZE', 8))  # Frame per model call
+    DETECTION_BATCH_TIMEOUT = 0.05  # Detik menunggu batch terisi
+    DETECTION_MAX_FPS = float(os.environ.get('DETECTION_MAX_FPS', 2))  # Budget frame per kamera
+    DETECTION_MOTION_THRESHOLD = 4.0  # Rata-rata selisih piksel (0-255) untuk dianggap ada gerakan
+    DETECTION_IDLE_INTERVAL = 10  # Detik, tetap cek frame walau tidak ada gerakan
+    DETECTION_CAMERA_REFRESH_INTERVAL = 30  # Detik, sinkronisasi daftar kamera ONLINE
+    DETECTION_COALESCE_WINDOW = 60  # Detik, deteksi dalam window digabung ke satu Report
+    DETECTION_COALESCE_MAX_AGE = 900  # Detik, batas umur satu insiden sebelum Report baru
+    
+    # Inference Engine (process pool, 0 = inference di thread detection worker)
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 2))
+    INFERENCE_QUEUE_SIZE = 32  # Jumlah slot frame shared memory
+    INFERENCE_MAX_FRAME_BYTES = 1920 * 1080 * 3
+    INFERENCE_TIMEOUT = 10  # Detik
+    INFERENCE_RESTART_BACKOFF = 5  # Detik minimal antar restart proses inference yang mati
+    
+    # Location Tracking Configuration
+    LOCATION_FLUSH_SIZE = 500  # Ping per flush ke database
+    LOCATION_FLUSH_INTERVAL = 1.0  # Detik
+    LOCATION_REFRESH_INTERVAL = 2.0  # Detik, sinkronisasi posisi dari worker lain
+    LOCATION_REFRESH_MARGIN = 30  # Detik overlap watermark untuk ping yang di-flush terlambat
+    LOCATION_CLOCK_SKEW = 300  # Detik jam perangkat boleh tertinggal; batas bawah created_at saat sinkronisasi
+    LOCATION_STALE_AFTER = 3600  # Detik, posisi lebih lama tidak ditampilkan di peta
+    
+    # Spatial Index Configuration
+    SPATIAL_CELL_DEGREES = 0.01  # Ukuran sel grid (~1.1 km)
+    SPATIAL_REFRESH_INTERVAL = 30  # Detik, muat ulang kamera/insiden/assignment aktif
+    SPATIAL_MAX_RADIUS_KM = 50  # Radius default sekaligus batas atas query kedekatan
+    
+    # Camera Health Check Configuration
+    HEALTH_CHECK_INTERVAL = int(os.environ.get('HEALTH_CHECK_INTERVAL', 30))  # Detik antar probe per kamera
+    HEALTH_CHECK_JITTER = 0.2  # Interval diacak +-20%
+    HEALTH_CHECK_TIMEOUT = 3.0  # Detik per probe
+    HEALTH_CHECK_CONCURRENCY = int(os.environ.get('HEALTH_CHECK_CONCURRENCY', 256))  # Probe bersamaan
+    HEALTH_CHECK_PER_HOST = 4  # Probe bersamaan ke satu host/NVR
+    HEALTH_CHECK_FAILURES = 2  # Kegagalan berturut-turut sebelum dianggap OFFLINE
+    HEALTH_CHECK_FLUSH_INTERVAL = 1.0  # Detik, tulis perubahan status ke database
+    HEALTH_CHECK_REFRESH_INTERVAL = 60  # Detik, muat ulang daftar kamera
+    
+    # Event Stream (SSE) Configuration
+    EVENTS_QUEUE_SIZE = 100  # Event tertunda per koneksi sebelum client dianggap terlalu lambat
+    EVENTS_HEARTBEAT = 15  # Detik, keepalive untuk koneksi idle
+    EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL') or CACHE_REDIS_URL  # Sebar event antar proses
+    EVENTS_STREAM = os.environ.get('EVENTS_STREAM', '1') == '1'  # Daftarkan /api/events; 0 di worker API gthread
+    EVENTS_TOKEN_EXPIRES = 60  # Detik, masa berlaku token stream di ?jwt=
+    
+    # Partition & Retention Configuration (flask retention run, dijadwalkan harian)
+    RETENTION_POLICIES = {
+        'locations': {'interval': 'day', 'retention_days': int(os.environ.get('LOCATION_RETENTION_DAYS', 30))},
+        'notifications': {'interval': 'month', 'retention_days': int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 180))},
+        # Timeline adalah jejak audit laporan: partisi lama diarsipkan, bukan dihapus
+        'timeline_events': {'interval': 'month', 'retention_days': 730, 'archive': True},
+    }
+    PARTITION_PREMAKE = 3  # Partisi yang dibuat di muka
+    RETENTION_DELETE_BATCH = 5000  # Baris per DELETE untuk tabel yang belum dipartisi
+    RETENTION_ARCHIVE_SCHEMA = 'archive'
     
     # Notification Configuration
-    NOTIFICATION_RETRY_ATTEMPTS = 3
-    NOTIFICATION_QUEUE_SIZE = 1000
\ No newline at end of file
+    NOTIFICATION_RETRY_ATTEMPTS = 3  # Percobaan total per request Pusher, termasuk yang pertama
+    NOTIFICATION_QUEUE_SIZE = 1000
+    NOTIFICATION_RETRY_BACKOFF = 0.5  # Detik, dikali 2 setiap percobaan
+    NOTIFICATION_BATCH_SIZE = 50
+    NOTIFICATION_BATCH_TIMEOUT = 0.02  # Detik menunggu batch terisi
+    NOTIFICATION_CONCURRENCY = 8  # Batch yang dikirim bersamaan / koneksi HTTP
+    NOTIFICATION_HTTP_TIMEOUT = 5
+    NOTIFICATION_PERSIST = True  # Simpan baris Notification
@@ -0,0 +1,24 @@
+# Dimuat otomatis oleh gunicorn dari direktori kerja
+import os
+import shutil
+
+# Hanya proses gunicorn yang memakai mode multiprocess; CLI (flask detection run,
+# benchmark) tetap memakai registry biasa. Direktori dibuat di sini, sebelum
+# --preload memuat app dan prometheus_client membuka file nilai. File dari
+# proses sebelumnya dibersihkan.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Import dan create_app dijalankan sekali di master lalu dibagi copy-on-write ke
+# worker. Pool DB, thread log dan client lazy dibuat ulang per worker (app.utils.lazy).
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# SSE dilayani gunicorn.events.conf.py; worker gthread tidak mendaftarkan /api/events
+raw_env = ['EVENTS_STREAM=0']
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
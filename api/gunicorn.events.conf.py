@@ -0,0 +1,31 @@
+# Gateway SSE (/api/events/stream) di proses terpisah dengan worker gevent:
+#   gunicorn -c gunicorn.events.conf.py run:app
+# Satu worker gevent menahan ribuan koneksi idle; worker sync/gthread di
+# gunicorn.conf.py tetap melayani API biasa. Arahkan /api/events ke port ini
+# di reverse proxy dan isi EVENTS_REDIS_URL agar event dari worker API ikut sampai.
+import os
+import shutil
+
+# Direktori sendiri agar start ulang gateway tidak menghapus file metrik worker API
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-events')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+bind = f"0.0.0.0:{os.environ.get('EVENTS_PORT', '3001')}"
+worker_class = 'gevent'
+workers = int(os.environ.get('EVENTS_WORKERS', 1))
+worker_connections = int(os.environ.get('EVENTS_WORKER_CONNECTIONS', 10000))
+keepalive = 75
+raw_env = ['EVENTS_STREAM=1']
+
+
+def post_fork(server, worker):
+    # Tanpa wait callback, query psycopg2 memblokir seluruh event loop gevent
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db
+from app.utils.query_stats import QueryBudgetExceeded, query_budget
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'budget.db'}",
+        'LOG_DIRECTORY': str(tmp_path / 'logs'),
+    })
+
+    @query_budget(1)
+    def within_budget():
+        db.session.execute(text('SELECT 1'))
+        return {'ok': True}
+
+    @query_budget(1)
+    def over_budget():
+        db.session.execute(text('SELECT 1'))
+        db.session.execute(text('SELECT 2'))
+        return {'ok': True}
+
+    def failing_statement():
+        try:
+            db.session.execute(text('SELECT * FROM missing_table'))
+        except Exception:
+            db.session.rollback()
+        return {'pending': len(db.session.connection().info.get('query_started', []))}
+
+    app.add_url_rule('/_test/within', 'within_budget', within_budget)
+    app.add_url_rule('/_test/over', 'over_budget', over_budget)
+    app.add_url_rule('/_test/failing', 'failing_statement', failing_statement)
+    return app
+
+
+def test_request_within_budget_passes(app):
+    response = app.test_client().get('/_test/within')
+    assert response.status_code == 200
+    assert '1 queries' in response.headers['Server-Timing']
+
+
+def test_request_over_budget_raises_in_testing(app):
+    with pytest.raises(QueryBudgetExceeded):
+        app.test_client().get('/_test/over')
+
+
+def test_failed_statement_does_not_leave_start_time(app):
+    assert app.test_client().get('/_test/failing').get_json() == {'pending': 0}
@@ -0,0 +1,44 @@
+import random
+import time
+
+from app.services.spatial import GridIndex, haversine_km
+
+
+def _jakarta_index(count=10000, seed=1):
+    rng = random.Random(seed)
+    index = GridIndex(0.01)
+    for i in range(count):
+        index.upsert(i, rng.uniform(-6.4, -6.1), rng.uniform(106.7, 107.0))
+    return index
+
+
+def test_nearest_far_from_all_points_is_fast():
+    index = _jakarta_index()
+    started = time.perf_counter()
+    results = index.nearest(0, 0, 5)
+    assert time.perf_counter() - started < 1.0
+    assert len(results) == 5
+    expected = sorted(haversine_km(0, 0, *index.get(key)) for key in range(len(index)))[:5]
+    assert [round(d, 6) for d, _ in results] == [round(d, 6) for d in expected]
+
+
+def test_nearest_far_with_radius_returns_nothing():
+    index = _jakarta_index()
+    assert index.nearest(0, 0, 5, max_km=50) == []
+
+
+def test_nearest_matches_linear_scan():
+    index = _jakarta_index(2000)
+    rng = random.Random(2)
+    for _ in range(50):
+        lat, lon = rng.uniform(-6.5, -6.0), rng.uniform(106.6, 107.1)
+        expected = sorted((haversine_km(lat, lon, *index.get(key)), key) for key in range(len(index)))[:5]
+        assert index.nearest(lat, lon, 5) == expected
+
+
+def test_bounds_follow_removals():
+    index = GridIndex(0.01)
+    index.upsert('a', -6.2, 106.8)
+    index.upsert('b', 10.0, 10.0)
+    index.remove('b')
+    assert [key for _, key in index.nearest(0, 0, 5)] == ['a']